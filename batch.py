@@ -0,0 +1,245 @@
+import argparse
+import csv
+import functools
+import json
+import multiprocessing
+import os
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from compact_game import CompactSolitaireGame
+from dead_ends import DeadEndDetector
+from instrument import print_progress
+from move_policy import MovePolicy
+from solitaire_game import ALL_ACTIONS, action_code
+from solver import SolveStatus, solve
+
+CSV_FIELDS = [
+    "seed",
+    "n_draw",
+    "status",
+    "moves",
+    "nodes_expanded",
+    "states_seen",
+    "elapsed",
+]
+
+
+@dataclass(frozen=True, slots=True)
+class BatchConfig:
+    n_draw: int = 3
+    max_nodes: int = 200_000
+    time_limit: float | None = 60.0
+    # Search with a MovePolicy, which only prunes moves a win never needs
+    use_policy: bool = True
+    # Have the policy drop unproductive moves too. That can miss wins, so a
+    # deal it runs out of moves on is "exhausted", not "unsolvable"
+    drop_unproductive: bool = False
+    # Prune positions that dead_ends.DeadEndDetector finds lost
+    dead_ends: bool = True
+    # If set, workers print the progress of each solve to stderr this often
+    # (in seconds)
+    progress_interval: float | None = None
+
+
+# What a worker sends back for one deal: (seed, status, winning line as
+# action codes, nodes expanded, states seen, seconds)
+type DealResult = tuple[int, SolveStatus, bytes, int, int, float]
+
+# Set in each worker process by _init_worker
+_worker_config = BatchConfig()
+_worker_game: CompactSolitaireGame | None = None
+# Shared by the deals a worker solves, as it does not depend on the deal
+_worker_detector: DeadEndDetector | None = None
+
+
+def _init_worker(config: BatchConfig) -> None:
+    global _worker_config, _worker_game, _worker_detector
+    _worker_config = config
+    _worker_game = CompactSolitaireGame(config.n_draw, track_hash=True)
+    _worker_detector = DeadEndDetector() if config.dead_ends else None
+
+
+def solve_deal(task: tuple[int, bytes]) -> DealResult:
+    """
+    Solves one deal given as (seed, initial get_game_state bytes), using the
+    worker's BatchConfig. Runs in the pool workers, but can be called directly.
+    """
+    seed, state = task
+    config = _worker_config
+    game = _worker_game or CompactSolitaireGame(config.n_draw, track_hash=True)
+    game.set_game_state(state)
+    detector = _worker_detector
+    if config.dead_ends and detector is None:
+        detector = DeadEndDetector()
+    progress = None
+    if config.progress_interval is not None:
+        progress = functools.partial(print_progress, label=f"seed {seed}: ")
+    result = solve(
+        game,
+        max_nodes=config.max_nodes,
+        time_limit=config.time_limit,
+        dedup="hash",
+        policy=(
+            MovePolicy(drop_unproductive=config.drop_unproductive)
+            if config.use_policy
+            else None
+        ),
+        dead_ends=detector,
+        progress=progress,
+        progress_interval=config.progress_interval or 1.0,
+    )
+    return (
+        seed,
+        result.status,
+        bytes(action_code(action) for action in result.moves),
+        result.nodes_expanded,
+        result.states_seen,
+        result.elapsed,
+    )
+
+
+def _deal_tasks(seeds: Iterable[int], n_draw: int) -> Iterator[tuple[int, bytes]]:
+    # Deals are shipped to the workers as their initial state bytes
+    for seed in seeds:
+        yield seed, CompactSolitaireGame(n_draw, seed=seed).get_game_state()
+
+
+def _to_record(result: DealResult, n_draw: int) -> dict:
+    seed, status, codes, nodes_expanded, states_seen, elapsed = result
+    return {
+        "seed": seed,
+        "n_draw": n_draw,
+        "status": status,
+        "moves": [ALL_ACTIONS[code] for code in codes],
+        "nodes_expanded": nodes_expanded,
+        "states_seen": states_seen,
+        "elapsed": round(elapsed, 4),
+    }
+
+
+def _is_csv(path: Path) -> bool:
+    return path.suffix.lower() == ".csv"
+
+
+def finished_deals(path: str | os.PathLike) -> set[tuple[int, int]]:
+    """
+    Returns the (seed, n_draw) of the deals that already have a result in
+    the output file. A partly written last line (from a killed run) is cut
+    off so that appending continues cleanly.
+    """
+    path = Path(path)
+    if not path.exists():
+        return set()
+
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[: data.rfind(b"\n") + 1]
+
+    lines = data.decode().splitlines()
+    if _is_csv(path):
+        records: Iterable[dict] = csv.DictReader(lines)
+    else:
+        records = (json.loads(line) for line in lines if line.strip())
+    return {(int(record["seed"]), int(record["n_draw"])) for record in records}
+
+
+def run_batch(
+    seeds: Iterable[int],
+    output: str | os.PathLike,
+    config: BatchConfig | None = None,
+    workers: int | None = None,
+    resume: bool = True,
+) -> Iterator[dict]:
+    """
+    Solves the deals for `seeds` across a pool of `workers` processes (all
+    cores by default) and appends one record per deal to `output` as soon as
+    it is solved, as JSON lines, or CSV if the file name ends in .csv.
+
+    With resume, deals that already have a record in `output` for the same
+    n_draw are skipped, so a killed run can simply be started again, and runs
+    with another n_draw can share the file. Yields each new record.
+    """
+    if config is None:
+        config = BatchConfig()
+    output = Path(output)
+    done = finished_deals(output) if resume else set()
+    if not resume:
+        output.unlink(missing_ok=True)
+    pending = (seed for seed in seeds if (seed, config.n_draw) not in done)
+    write_header = _is_csv(output) and (
+        not output.exists() or output.stat().st_size == 0
+    )
+
+    with (
+        open(output, "a", newline="") as f,
+        multiprocessing.Pool(workers, _init_worker, (config,)) as pool,
+    ):
+        writer = csv.DictWriter(f, CSV_FIELDS) if _is_csv(output) else None
+        if writer and write_header:
+            writer.writeheader()
+        for result in pool.imap_unordered(
+            solve_deal, _deal_tasks(pending, config.n_draw)
+        ):
+            record = _to_record(result, config.n_draw)
+            if writer:
+                writer.writerow({**record, "moves": json.dumps(record["moves"])})
+            else:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            yield record
+
+
+def main():
+    defaults = BatchConfig()
+    parser = argparse.ArgumentParser(description="Solve a range of seeded deals")
+    parser.add_argument("output", help="results file (.jsonl or .csv)")
+    parser.add_argument("--start", type=int, default=0, help="first seed")
+    parser.add_argument("--count", type=int, default=1000, help="number of deals")
+    parser.add_argument(
+        "--draw", type=int, default=defaults.n_draw, help="cards per draw"
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-nodes", type=int, default=defaults.max_nodes)
+    parser.add_argument("--time-limit", type=float, default=defaults.time_limit)
+    parser.add_argument("--no-policy", action="store_true", help="expand every move")
+    parser.add_argument(
+        "--drop-unproductive",
+        action="store_true",
+        help="also prune unproductive moves (faster, but can miss wins)",
+    )
+    parser.add_argument(
+        "--no-dead-ends", action="store_true", help="do not prune lost positions"
+    )
+    parser.add_argument("--restart", action="store_true", help="ignore old results")
+    parser.add_argument(
+        "--progress",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="print the progress of each solve this often",
+    )
+    args = parser.parse_args()
+
+    config = BatchConfig(
+        n_draw=args.draw,
+        max_nodes=args.max_nodes,
+        time_limit=args.time_limit,
+        use_policy=not args.no_policy,
+        drop_unproductive=args.drop_unproductive,
+        dead_ends=not args.no_dead_ends,
+        progress_interval=args.progress,
+    )
+    seeds = range(args.start, args.start + args.count)
+    solved = 0
+    records = run_batch(seeds, args.output, config, args.workers, not args.restart)
+    for total, record in enumerate(records, 1):
+        solved += record["status"] == "solved"
+        print(f"seed {record['seed']}: {record['status']} ({solved}/{total} solved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,598 @@
+import argparse
+import functools
+import gc
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+
+from compact_game import CompactSolitaireGame
+from game_pool import GamePool
+from move_policy import MovePolicy
+from rollout import greedy_policy, rollouts
+from solitaire_game import GameAction, SolitaireGame
+from solver import Heuristic, cards_remaining, default_heuristic, solve
+
+type GameClass = type[SolitaireGame | CompactSolitaireGame]
+
+# Results files are only compared if they have the same format version
+FORMAT_VERSION = 1
+
+
+def sample_positions(count: int = 200, seed: int = 42) -> list[bytes]:
+    """
+    Returns a fixed set of game states: deal i is the deal for seed i, played
+    for a random number of random moves.
+    """
+    rng = random.Random(seed)
+    positions: list[bytes] = []
+    for i in range(count):
+        game = SolitaireGame(seed=i)
+        for _ in range(rng.randrange(80)):
+            moves = game.get_valid_moves()
+            if not moves:
+                break
+            game.make_move(rng.choice(moves))
+        positions.append(game.get_game_state())
+    return positions
+
+
+@dataclass(slots=True)
+class BenchResult:
+    name: str
+    # Operations per timed round, and per second in the median round (in
+    # total for the solver, whose deals vary too much for a median)
+    ops: int
+    ops_per_sec: float
+    # Seconds per operation in the 50th, 90th and 99th percentile rounds
+    p50: float
+    p90: float
+    p99: float
+    # Bytes allocated at the peak of one round, and still allocated after it
+    # (tracemalloc, measured in a separate untimed round)
+    peak_bytes: int
+    retained_bytes: int
+    # Other rates and counts, e.g. moves generated per second
+    extra: dict[str, float] = field(default_factory=dict)
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    # Nearest-rank percentile of sorted values
+    rank = max(1, min(len(values), math.ceil(percent / 100 * len(values))))
+    return values[rank - 1]
+
+
+def measure(
+    name: str, run: Callable[[], object], ops: int, rounds: int = 30
+) -> BenchResult:
+    """
+    Times `rounds` calls of `run`, which makes `ops` operations, after one
+    warm-up call. The garbage collector is off while timing, as with timeit.
+    """
+    run()
+    times: list[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            run()
+            times.append((time.perf_counter() - start) / ops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    times.sort()
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        run()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return BenchResult(
+        name=name,
+        ops=ops,
+        ops_per_sec=1 / _percentile(times, 50),
+        p50=_percentile(times, 50),
+        p90=_percentile(times, 90),
+        p99=_percentile(times, 99),
+        peak_bytes=peak - before,
+        retained_bytes=current - before,
+    )
+
+
+def _games(positions: list[bytes], game_class: GameClass) -> list:
+    games = []
+    for state in positions:
+        game = game_class()
+        game.set_game_state(state)
+        games.append(game)
+    return games
+
+
+def bench_game(
+    positions: list[bytes], game_class: GameClass = SolitaireGame, rounds: int = 30
+) -> list[BenchResult]:
+    # The game engine methods, on the sample positions
+    prefix = game_class.__name__
+    seeds = range(len(positions))
+    results = [
+        measure(
+            f"{prefix}.__init__",
+            lambda: [game_class(seed=seed) for seed in seeds],
+            len(seeds),
+            rounds,
+        )
+    ]
+
+    game = game_class()
+
+    def reset_games() -> None:
+        for seed in seeds:
+            game.reset_game(seed)
+
+    results.append(measure(f"{prefix}.reset_game", reset_games, len(seeds), rounds))
+
+    games = _games(positions, game_class)
+    moves = [game.get_valid_moves() for game in games]
+    move_count = sum(map(len, moves))
+
+    def valid_moves() -> None:
+        for game in games:
+            game.get_valid_moves()
+
+    result = measure(f"{prefix}.get_valid_moves", valid_moves, len(games), rounds)
+    result.extra["moves_per_sec"] = result.ops_per_sec * move_count / len(games)
+    results.append(result)
+
+    def make_moves() -> None:
+        for game, game_moves in zip(games, moves):
+            for action in game_moves:
+                game.unmake_move(game.make_move(action))
+
+    results.append(
+        measure(f"{prefix}.make_move+unmake_move", make_moves, move_count, rounds)
+    )
+
+    def get_states() -> None:
+        for game in games:
+            game.get_game_state()
+
+    results.append(measure(f"{prefix}.get_game_state", get_states, len(games), rounds))
+
+    def set_states() -> None:
+        for state in positions:
+            game.set_game_state(state)
+
+    results.append(
+        measure(f"{prefix}.set_game_state", set_states, len(positions), rounds)
+    )
+
+    def read_states() -> None:
+        for state in positions:
+            game.read_game_state(state)
+
+    results.append(
+        measure(f"{prefix}.read_game_state", read_states, len(positions), rounds)
+    )
+    return results
+
+
+def reference_valid_moves(game: SolitaireGame) -> list[GameAction]:
+    """
+    The move generator that get_valid_moves replaced, kept to measure it
+    against: every face-up run of every pile is checked against every other
+    pile, so a tableau move is listed once for each run length that fits
+    (without the card count), and foundation moves are checked per pile.
+    """
+    moves: list[GameAction] = []
+    tableau = game.tableau
+    foundation = game.foundation
+    if game.waste:
+        card = game.waste[-1]
+        f_pile = foundation[card.suit - 1]
+        if (not f_pile and card.rank == 1) or (
+            f_pile and card.rank == f_pile[-1].rank + 1
+        ):
+            moves.append(("wf", ()))
+        for i in range(7):
+            if game.is_valid_tableau_move(card, i):
+                moves.append(("wt", (i,)))
+    for i in range(7):
+        if tableau[i]:
+            card, _ = tableau[i][-1]
+            f_pile = foundation[card.suit - 1]
+            if (not f_pile and card.rank == 1) or (
+                f_pile and card.rank == f_pile[-1].rank + 1
+            ):
+                moves.append(("tf", (i,)))
+    for from_idx in range(7):
+        for to_idx in range(7):
+            if from_idx != to_idx:
+                for n in range(1, len(tableau[from_idx]) + 1):
+                    moving_cards = tableau[from_idx][-n:]
+                    if not moving_cards[0][1]:
+                        break
+                    if game.is_valid_tableau_move(moving_cards[0][0], to_idx):
+                        moves.append(("tt", (from_idx, to_idx)))
+    for f_idx in range(4):
+        if foundation[f_idx]:
+            card = foundation[f_idx][-1]
+            for t_idx in range(7):
+                if game.is_valid_tableau_move(card, t_idx):
+                    moves.append(("ft", (f_idx, t_idx)))
+    if game.stock or game.waste:
+        moves.append(("s", ()))
+    return moves
+
+
+def bench_move_generator(positions: list[bytes], rounds: int = 30) -> list[BenchResult]:
+    """
+    get_valid_moves of both game classes against reference_valid_moves on
+    the sample positions, after checking that they find the same moves. The
+    speedup over the reference is in extra.
+    """
+    reference_games = _games(positions, SolitaireGame)
+    for game in reference_games:
+        expected = {(kind, args) for kind, args in reference_valid_moves(game)}
+        if {(kind, args[:2]) for kind, args in game.get_valid_moves()} != expected:
+            raise AssertionError("get_valid_moves disagrees with the reference")
+
+    def reference() -> None:
+        for game in reference_games:
+            reference_valid_moves(game)
+
+    baseline = measure("get_valid_moves[reference]", reference, len(positions), rounds)
+    results = [baseline]
+    for game_class in (SolitaireGame, CompactSolitaireGame):
+        games = _games(positions, game_class)
+
+        def valid_moves(games: list = games) -> None:
+            for game in games:
+                game.get_valid_moves()
+
+        result = measure(
+            f"get_valid_moves[{game_class.__name__}]",
+            valid_moves,
+            len(positions),
+            rounds,
+        )
+        result.extra["speedup"] = result.ops_per_sec / baseline.ops_per_sec
+        results.append(result)
+    return results
+
+
+def bench_clone(
+    positions: list[bytes], game_class: GameClass = SolitaireGame, rounds: int = 30
+) -> list[BenchResult]:
+    """
+    Ways of making a game in each of the sample positions, as searches and
+    rollouts do to fork a position. Each round keeps all its games until it
+    ends, so peak_bytes is the memory of that many live games. The pool's
+    games are made before timing starts, so its rounds should not allocate.
+    """
+    prefix = game_class.__name__
+    games = _games(positions, game_class)
+    results = [
+        measure(
+            f"{prefix}()+set_game_state",
+            lambda: _games(positions, game_class),
+            len(positions),
+            rounds,
+        ),
+        measure(
+            f"{prefix}.from_state",
+            lambda: [game_class.from_state(state) for state in positions],
+            len(positions),
+            rounds,
+        ),
+        measure(
+            f"{prefix}.clone",
+            lambda: [game.clone() for game in games],
+            len(positions),
+            rounds,
+        ),
+    ]
+
+    pool = GamePool(size=len(positions), game_class=game_class)
+
+    def pool_acquire() -> None:
+        forks = [pool.acquire(state) for state in positions]
+        for fork in forks:
+            pool.release(fork)
+
+    def pool_clone() -> None:
+        forks = [pool.clone(game) for game in games]
+        for fork in forks:
+            pool.release(fork)
+
+    results.append(
+        measure(f"{prefix} GamePool.acquire", pool_acquire, len(positions), rounds)
+    )
+    results.append(
+        measure(f"{prefix} GamePool.clone", pool_clone, len(positions), rounds)
+    )
+    return results
+
+
+def bench_rollouts(
+    deals: int = 10, playouts: int = 20, rounds: int = 5
+) -> list[BenchResult]:
+    """
+    rollouts with greedy_policy from the first position of the deals for
+    seeds 0..deals-1, for draw 1 and draw 3. Each playout is an operation,
+    so ops/s is playouts per second on one core; moves per second and the
+    win rate are in extra.
+    """
+    results = []
+    for n_draw in (1, 3):
+        states = [
+            SolitaireGame(n_draw, seed=seed).get_game_state() for seed in range(deals)
+        ]
+        game = SolitaireGame.from_state(states[0], n_draw)
+        totals = {"moves": 0, "wins": 0}
+
+        def run(
+            states: list[bytes] = states,
+            game: SolitaireGame = game,
+            totals: dict[str, int] = totals,
+            n_draw: int = n_draw,
+        ) -> None:
+            for seed, state in enumerate(states):
+                stats = rollouts(
+                    state,
+                    playouts,
+                    n_draw=n_draw,
+                    policy=greedy_policy,
+                    seed=seed,
+                    game=game,
+                )
+                totals["moves"] += stats.total_depth
+                totals["wins"] += stats.wins
+
+        result = measure(f"rollouts[draw {n_draw}]", run, deals * playouts, rounds)
+        # run was called rounds + 2 times: warm-up, timing and tracemalloc
+        total_playouts = (rounds + 2) * deals * playouts
+        result.extra["moves_per_sec"] = (
+            result.ops_per_sec * totals["moves"] / total_playouts
+        )
+        result.extra["win_rate"] = totals["wins"] / total_playouts
+        results.append(result)
+    return results
+
+
+@functools.cache
+def _reader() -> SolitaireGame:
+    # The game whose read_game_state decodes the states, dealt on first use
+    return SolitaireGame()
+
+
+def read_state_cards_remaining(state: bytes) -> float:
+    # cards_remaining computed by decoding the state with read_game_state
+    _, _, foundation, _ = _reader().read_game_state(state)
+    return 52 - sum(len(f_pile) for f_pile in foundation)
+
+
+def read_state_default_heuristic(state: bytes) -> float:
+    # default_heuristic computed by decoding the state with read_game_state
+    stock, waste, foundation, tableau = _reader().read_game_state(state)
+    score = 52 - sum(len(f_pile) for f_pile in foundation)
+    for t_pile in tableau:
+        lowest_rank = [14] * 4
+        for card, is_face_up in t_pile:
+            if not is_face_up:
+                score += 2
+            if card.rank > lowest_rank[card.suit - 1]:
+                score += 1
+            else:
+                lowest_rank[card.suit - 1] = card.rank
+    return score + (len(stock) + len(waste)) * 0.5
+
+
+HEURISTICS: list[tuple[str, Heuristic, Heuristic]] = [
+    ("cards_remaining", cards_remaining, read_state_cards_remaining),
+    ("default_heuristic", default_heuristic, read_state_default_heuristic),
+]
+
+
+def bench_heuristics(positions: list[bytes], rounds: int = 30) -> list[BenchResult]:
+    # Each heuristic with StateView and with read_game_state, checked to agree
+    results = []
+    for name, heuristic, reference in HEURISTICS:
+        for state in positions:
+            if heuristic(state) != reference(state):
+                raise AssertionError(f"{name} disagrees with read_game_state")
+        for label, func in (("view", heuristic), ("read_game_state", reference)):
+
+            def evaluate(func: Heuristic = func) -> None:
+                for state in positions:
+                    func(state)
+
+            results.append(
+                measure(f"{name}[{label}]", evaluate, len(positions), rounds)
+            )
+    return results
+
+
+def bench_solver(
+    deals: int = 20, n_draw: int = 3, max_nodes: int = 20_000
+) -> BenchResult:
+    """
+    solve on the deals for seeds 0..deals-1 with a MovePolicy that also drops
+    unproductive moves, as results were always measured. Each deal is one
+    operation, so the percentiles are of seconds per deal; the solved
+    count and nodes expanded per second are in extra.
+    """
+    games = [
+        CompactSolitaireGame(n_draw, seed=seed, track_hash=True)
+        for seed in range(deals)
+    ]
+    policy = MovePolicy(drop_unproductive=True)
+    times: list[float] = []
+    nodes = solved = 0
+    for game in games:
+        result = solve(game, max_nodes=max_nodes, dedup="hash", policy=policy)
+        times.append(result.elapsed)
+        nodes += result.nodes_expanded
+        solved += result.solved
+    times.sort()
+    total = sum(times)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        solve(games[0], max_nodes=max_nodes, dedup="hash", policy=policy)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return BenchResult(
+        name=f"solve[draw {n_draw}]",
+        ops=deals,
+        ops_per_sec=deals / total,
+        p50=_percentile(times, 50),
+        p90=_percentile(times, 90),
+        p99=_percentile(times, 99),
+        peak_bytes=peak - before,
+        retained_bytes=current - before,
+        extra={"nodes_per_sec": nodes / total, "solved": solved},
+    )
+
+
+def run_suite(
+    only: str | None = None,
+    rounds: int = 30,
+    deals: int = 20,
+    max_nodes: int = 20_000,
+) -> list[BenchResult]:
+    # Runs every benchmark whose group name contains `only` (all by default)
+    positions = sample_positions()
+    groups: list[tuple[str, Callable[[], list[BenchResult]]]] = [
+        ("SolitaireGame", lambda: bench_game(positions, SolitaireGame, rounds)),
+        (
+            "CompactSolitaireGame",
+            lambda: bench_game(positions, CompactSolitaireGame, rounds),
+        ),
+        (
+            "clone",
+            lambda: [
+                result
+                for game_class in (SolitaireGame, CompactSolitaireGame)
+                for result in bench_clone(positions, game_class, rounds)
+            ],
+        ),
+        ("moves", lambda: bench_move_generator(positions, rounds)),
+        ("heuristics", lambda: bench_heuristics(positions, rounds)),
+        (
+            "solve",
+            lambda: [bench_solver(deals, n_draw, max_nodes) for n_draw in (1, 3)],
+        ),
+        ("rollouts", lambda: bench_rollouts(rounds=max(1, rounds // 6))),
+    ]
+    results = []
+    for group, run in groups:
+        if only is None or only in group:
+            results.extend(run())
+    return results
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g}{unit}"
+    return f"{seconds / 1e-9:.3g}ns"
+
+
+def print_results(results: list[BenchResult]) -> None:
+    width = max(len(result.name) for result in results)
+    print(
+        f"{'benchmark':<{width}}  {'ops/s':>12}  {'p50':>8}  {'p90':>8}  "
+        f"{'p99':>8}  {'peak KiB':>9}  {'kept KiB':>9}"
+    )
+    for result in results:
+        extra = ", ".join(
+            f"{key} {value:,.0f}" if value >= 100 else f"{key} {value:.3g}"
+            for key, value in result.extra.items()
+        )
+        print(
+            f"{result.name:<{width}}  {result.ops_per_sec:>12,.0f}  "
+            f"{_format_time(result.p50):>8}  {_format_time(result.p90):>8}  "
+            f"{_format_time(result.p99):>8}  {result.peak_bytes / 1024:>9,.1f}  "
+            f"{result.retained_bytes / 1024:>9,.1f}" + (f"  ({extra})" if extra else "")
+        )
+
+
+def to_json(results: list[BenchResult]) -> dict:
+    return {
+        "format": FORMAT_VERSION,
+        "python": sys.version,
+        "platform": platform.platform(),
+        "results": [asdict(result) for result in results],
+    }
+
+
+def compare(
+    results: list[BenchResult], baseline: dict, threshold: float = 0.1
+) -> list[str]:
+    """
+    Prints the change in ops/s from a baseline written by --json, and returns
+    the names of the benchmarks that got slower by more than `threshold`.
+    """
+    if baseline.get("format") != FORMAT_VERSION:
+        raise ValueError("Baseline was written by a different version of bench")
+    old_rates = {
+        result["name"]: result["ops_per_sec"] for result in baseline["results"]
+    }
+    regressions = []
+    for result in results:
+        old_rate = old_rates.get(result.name)
+        if not old_rate:
+            continue
+        ratio = result.ops_per_sec / old_rate
+        slower = ratio < 1 - threshold
+        if slower:
+            regressions.append(result.name)
+        print(f"{result.name}: {ratio - 1:+.1%}" + ("  REGRESSION" if slower else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the game engine, heuristics and solver"
+    )
+    parser.add_argument("--only", help="only run groups whose name contains this")
+    parser.add_argument("--rounds", type=int, default=30, help="timed rounds")
+    parser.add_argument("--deals", type=int, default=20, help="deals to solve")
+    parser.add_argument("--max-nodes", type=int, default=20_000)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results file from an earlier --json run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="slowdown that counts as a regression with --compare",
+    )
+    args = parser.parse_args()
+
+    results = run_suite(args.only, args.rounds, args.deals, args.max_nodes)
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(to_json(results), f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,621 @@
+from typing import Self
+
+from deck import CARD_FROM_CODE, Card, is_valid_deal, shuffled_deal
+from solitaire_game import (
+    _Z_FOUNDATION,
+    _Z_STOCK,
+    _Z_TABLEAU,
+    _Z_WASTE,
+    GameAction,
+    MoveRecord,
+    SolitaireGame,
+    _auto_finish,
+    _canonical_pile_key,
+    _card_code,
+)
+
+# Cards are stored as the same 6-bit codes used by get_game_state:
+# bits 0-3 are the rank (0-12), bits 4-5 the suit (0-3), and in the tableau
+# bit 6 is set if the card is face up
+_FACE_UP = 0x40
+_CARD_MASK = 0x3F
+
+# Maps a tableau code to 1 if it is face up, for finding the first face-up card
+_FACE_UP_FLAGS = bytes(int(code >= _FACE_UP) for code in range(256))
+
+# Lookup keys used by get_valid_moves, indexed by tableau code (with or
+# without the face-up bit): (rank << 1 | is_red) of the card itself, and of
+# the card that can be placed on it
+_CARD_KEY = [(((code & 0xF) + 1) << 1) | (not code & 0x10) for code in range(128)]
+_ACCEPTS_KEY = [((code & 0xF) << 1) | bool(code & 0x10) for code in range(128)]
+
+
+def _fits_on(code: int, dest_code: int) -> bool:
+    # Alternating colours (suit bit 4 differs) and one rank lower
+    return bool((code ^ dest_code) & 0x10) and (code & 0xF) + 1 == dest_code & 0xF
+
+
+class CompactSolitaireGame:
+    """
+    A SolitaireGame backed by byte arrays instead of lists of Card objects.
+
+    The stock, waste and each tableau pile are bytearrays of card codes, the
+    foundations are four counts and the number of face-down cards in each pile
+    is kept alongside, which makes a live game several times smaller and
+    get_game_state/set_game_state little more than byte copies.
+
+    It has the same public methods and state encoding as SolitaireGame, so the
+    two can be used interchangeably. The stock, waste, foundation and tableau
+    attributes are available as read-only properties that build the usual
+    lists of Cards, for display and for code that inspects the piles.
+    """
+
+    __slots__ = (
+        "_face_down",
+        "_foundation_counts",
+        "_hash",
+        "_piles",
+        "_stock",
+        "_track_hash",
+        "_waste",
+        "deal",
+        "n_draw",
+    )
+
+    def __init__(
+        self,
+        n_draw: int = 3,
+        track_hash: bool = False,
+        seed: int | None = None,
+        deal: bytes | None = None,
+    ) -> None:
+        # number of cards to draw from the stock at a time
+        self.n_draw = n_draw
+        # when set, a Zobrist hash of the state is kept up to date by every move
+        self._track_hash = track_hash
+        self._hash = 0
+
+        self._stock = bytearray()
+        self._waste = bytearray()
+        self._foundation_counts = bytearray(4)
+        self._piles = [bytearray() for _ in range(7)]
+        self._face_down = bytearray(7)
+        # the deal this game was dealt from (see deck.shuffled_deal)
+        self.deal = b""
+
+        if seed is not None and deal is not None:
+            raise ValueError("Give either a seed or a deal, not both")
+        self.setup_game(shuffled_deal(seed) if deal is None else deal)
+
+    @classmethod
+    def from_state(
+        cls, state: bytes, n_draw: int = 3, track_hash: bool = False
+    ) -> Self:
+        # See SolitaireGame.from_state
+        game = cls.__new__(cls)
+        game.n_draw = n_draw
+        game._track_hash = track_hash
+        game._hash = 0
+        game._stock = bytearray()
+        game._waste = bytearray()
+        game._foundation_counts = bytearray(4)
+        game._piles = [bytearray() for _ in range(7)]
+        game._face_down = bytearray(7)
+        game.deal = b""
+        game.set_game_state(state)
+        return game
+
+    def clone(self) -> Self:
+        # A copy of the game in the same position, made by copying the arrays
+        game = self.__class__.__new__(self.__class__)
+        game.n_draw = self.n_draw
+        game._track_hash = self._track_hash
+        game._hash = self._hash
+        game._stock = self._stock[:]
+        game._waste = self._waste[:]
+        game._foundation_counts = self._foundation_counts[:]
+        game._piles = [pile[:] for pile in self._piles]
+        game._face_down = self._face_down[:]
+        game.deal = self.deal
+        return game
+
+    def copy_from(self, other: Self) -> None:
+        # Puts this game in the position of `other`, reusing its own arrays
+        self.n_draw = other.n_draw
+        self._track_hash = other._track_hash
+        self._hash = other._hash
+        self._stock[:] = other._stock
+        self._waste[:] = other._waste
+        self._foundation_counts[:] = other._foundation_counts
+        for pile, other_pile in zip(self._piles, other._piles):
+            pile[:] = other_pile
+        self._face_down[:] = other._face_down
+        self.deal = other.deal
+
+    def setup_game(self, deal: bytes | None = None) -> None:
+        # Deals the given deal onto an empty board, or a random one if not given
+        if deal is None:
+            deal = shuffled_deal()
+        elif not is_valid_deal(deal):
+            raise ValueError("A deal must contain each of the 52 card codes once")
+        self.deal = bytes(deal)
+
+        # Cards are dealt from the end of the deck, one round at a time
+        idx = 51
+        for i in range(7):
+            for j in range(i, 7):
+                # only the top card is face up
+                self._piles[j].append(deal[idx] | _FACE_UP if i == j else deal[idx])
+                idx -= 1
+        self._face_down[:] = bytes(range(7))
+
+        # The remaining cards go into the stock, the first card of the deck on top
+        self._stock[:] = deal[23::-1]
+
+        if self._track_hash:
+            self._hash = self._compute_hash()
+
+    __str__ = SolitaireGame.__str__
+
+    # Read-only views of the piles in the SolitaireGame representation
+
+    @property
+    def stock(self) -> list[Card]:
+        return [CARD_FROM_CODE[code] for code in self._stock]
+
+    @property
+    def waste(self) -> list[Card]:
+        return [CARD_FROM_CODE[code] for code in self._waste]
+
+    @property
+    def foundation(self) -> list[list[Card]]:
+        return [
+            [CARD_FROM_CODE[(suit << 4) | rank] for rank in range(count)]
+            for suit, count in enumerate(self._foundation_counts)
+        ]
+
+    @property
+    def tableau(self) -> list[list[tuple[Card, bool]]]:
+        return [
+            [(CARD_FROM_CODE[code & _CARD_MASK], code >= _FACE_UP) for code in pile]
+            for pile in self._piles
+        ]
+
+    # Game logic and movement methods:
+
+    def move_tableau_to_foundation(self, tableau_index: int) -> bool:
+        # Returns whether a face-down card was turned face up
+        pile = self._piles[tableau_index]
+        if not pile:
+            raise ValueError("No cards in the selected tableau pile")
+        code = pile[-1] & _CARD_MASK
+        suit = code >> 4
+        if self._foundation_counts[suit] != code & 0xF:
+            raise ValueError("Invalid move to foundation")
+
+        pile.pop()
+        self._foundation_counts[suit] += 1
+        if self._track_hash:
+            z_found = _Z_FOUNDATION[suit]
+            self._hash ^= (
+                _Z_TABLEAU[tableau_index][len(pile)][code | _FACE_UP]
+                ^ z_found[code & 0xF]
+                ^ z_found[(code & 0xF) + 1]
+            )
+        return self._turn_up_top(tableau_index)
+
+    def move_tableau_to_tableau(
+        self, from_index: int, to_index: int, num_cards: int | None = None
+    ) -> tuple[int, bool]:
+        # Moves the top num_cards cards, or if not given, the deepest face-up
+        # card that can be moved to to_index and everything on top of it.
+        # Returns the number of cards moved and whether a face-down card was turned face up
+        source_pile = self._piles[from_index]
+        if not source_pile:
+            raise ValueError("No cards in the selected tableau pile")
+
+        if num_cards is None:
+            # Find the deepest face-up card that can be moved to to_index
+            for i in range(self._face_down[from_index], len(source_pile)):
+                if self._can_place(source_pile[i] & _CARD_MASK, to_index):
+                    break
+            else:
+                raise ValueError("Invalid move to tableau")
+            num_cards = len(source_pile) - i
+        else:
+            i = len(source_pile) - num_cards
+            if not (
+                self._face_down[from_index] <= i < len(source_pile)
+                and self._can_place(source_pile[i] & _CARD_MASK, to_index)
+            ):
+                raise ValueError("Invalid move to tableau")
+
+        dest_pile = self._piles[to_index]
+        if self._track_hash:
+            z_from = _Z_TABLEAU[from_index]
+            z_to = _Z_TABLEAU[to_index]
+            to_pos = len(dest_pile)
+            for offset in range(num_cards):
+                code = source_pile[i + offset]
+                self._hash ^= z_from[i + offset][code] ^ z_to[to_pos + offset][code]
+        dest_pile += source_pile[i:]
+        del source_pile[i:]
+        return num_cards, self._turn_up_top(from_index)
+
+    def draw_from_stock(self) -> tuple[int, bool]:
+        # Returns the number of cards drawn and whether the waste was recycled
+        stock = self._stock
+        waste = self._waste
+        recycled = False
+        if not stock:
+            # recycle waste into stock
+            if self._track_hash:
+                self._hash ^= self._recycle_key()
+            waste.reverse()
+            stock += waste
+            waste.clear()
+            recycled = True
+
+        drawn = min(self.n_draw, len(stock))
+        if self._track_hash:
+            for _ in range(drawn):
+                code = stock.pop()
+                self._hash ^= _Z_STOCK[len(stock)][code] ^ _Z_WASTE[len(waste)][code]
+                waste.append(code)
+        else:
+            for _ in range(drawn):
+                waste.append(stock.pop())
+        return drawn, recycled
+
+    def move_waste_to_foundation(self) -> None:
+        if not self._waste:
+            raise ValueError("No cards in the waste pile")
+        code = self._waste[-1]
+        suit = code >> 4
+        if self._foundation_counts[suit] != code & 0xF:
+            raise ValueError("Invalid move to foundation")
+
+        self._waste.pop()
+        self._foundation_counts[suit] += 1
+        if self._track_hash:
+            z_found = _Z_FOUNDATION[suit]
+            self._hash ^= (
+                _Z_WASTE[len(self._waste)][code]
+                ^ z_found[code & 0xF]
+                ^ z_found[(code & 0xF) + 1]
+            )
+
+    def move_waste_to_tableau(self, tableau_index: int) -> None:
+        if not self._waste:
+            raise ValueError("No cards in the waste pile")
+        code = self._waste[-1]
+        if not self._can_place(code, tableau_index):
+            raise ValueError("Invalid move to tableau")
+
+        self._waste.pop()
+        pile = self._piles[tableau_index]
+        if self._track_hash:
+            self._hash ^= (
+                _Z_WASTE[len(self._waste)][code]
+                ^ _Z_TABLEAU[tableau_index][len(pile)][code | _FACE_UP]
+            )
+        pile.append(code | _FACE_UP)
+
+    def foundation_to_tableau(self, foundation_index: int, tableau_index: int) -> None:
+        count = self._foundation_counts[foundation_index]
+        if not count:
+            raise ValueError("No cards in the selected foundation pile")
+        code = (foundation_index << 4) | (count - 1)
+        if not self._can_place(code, tableau_index):
+            raise ValueError("Invalid move to tableau")
+
+        self._foundation_counts[foundation_index] -= 1
+        pile = self._piles[tableau_index]
+        if self._track_hash:
+            z_found = _Z_FOUNDATION[foundation_index]
+            self._hash ^= (
+                z_found[count]
+                ^ z_found[count - 1]
+                ^ _Z_TABLEAU[tableau_index][len(pile)][code | _FACE_UP]
+            )
+        pile.append(code | _FACE_UP)
+
+    def _turn_up_top(self, tableau_index: int) -> bool:
+        # Turns the top card of a pile face up after cards were taken off it,
+        # returning whether it was face down
+        pile = self._piles[tableau_index]
+        if not pile or pile[-1] & _FACE_UP:
+            return False
+        pile[-1] |= _FACE_UP
+        self._face_down[tableau_index] -= 1
+        if self._track_hash:
+            z_pos = _Z_TABLEAU[tableau_index][len(pile) - 1]
+            self._hash ^= z_pos[pile[-1]] ^ z_pos[pile[-1] & _CARD_MASK]
+        return True
+
+    def _can_place(self, code: int, to_index: int) -> bool:
+        pile = self._piles[to_index]
+        if not pile:
+            return code & 0xF == 12  # Only Kings can be placed on empty tableau piles
+        return _fits_on(code, pile[-1])
+
+    def is_valid_tableau_move(self, card: Card, to_index: int) -> bool:
+        return self._can_place(_card_code(card), to_index)
+
+    def _recycle_key(self) -> int:
+        # hash change when the waste is turned over into the stock
+        value = 0
+        n_cards = len(self._waste)
+        for pos, code in enumerate(self._waste):
+            value ^= _Z_WASTE[pos][code] ^ _Z_STOCK[n_cards - 1 - pos][code]
+        return value
+
+    def _compute_hash(self) -> int:
+        value = 0
+        for pos, code in enumerate(self._stock):
+            value ^= _Z_STOCK[pos][code]
+        for pos, code in enumerate(self._waste):
+            value ^= _Z_WASTE[pos][code]
+        for f_idx, count in enumerate(self._foundation_counts):
+            value ^= _Z_FOUNDATION[f_idx][count]
+        for t_idx, pile in enumerate(self._piles):
+            z_pile = _Z_TABLEAU[t_idx]
+            for pos, code in enumerate(pile):
+                value ^= z_pile[pos][code]
+        return value
+
+    @property
+    def track_hash(self) -> bool:
+        return self._track_hash
+
+    @track_hash.setter
+    def track_hash(self, value: bool) -> None:
+        self._track_hash = value
+        self._hash = self._compute_hash() if value else 0
+
+    @property
+    def state_hash(self) -> int:
+        # Same hash as SolitaireGame.state_hash for the same state
+        if self._track_hash:
+            return self._hash
+        return self._compute_hash()
+
+    def is_game_won(self) -> bool:
+        return sum(self._foundation_counts) == 52 or self.can_be_auto_solved()
+
+    def can_be_auto_solved(self) -> bool:
+        # Same rule as SolitaireGame: no face-down cards and at most one card
+        # left in the stock/waste
+        return not any(self._face_down) and len(self._stock) + len(self._waste) <= 1
+
+    def is_auto_solvable(self) -> bool:
+        return self.auto_finish_moves() is not None
+
+    def auto_finish_moves(self) -> list[GameAction] | None:
+        # See SolitaireGame.auto_finish_moves
+        return _auto_finish(
+            self._piles,
+            self._foundation_counts,
+            self._stock,
+            self._waste,
+            self.n_draw,
+        )
+
+    def reset_game(self, seed: int | None = None) -> None:
+        self._stock.clear()
+        self._waste.clear()
+        self._foundation_counts[:] = bytes(4)
+        for pile in self._piles:
+            pile.clear()
+        self.setup_game(None if seed is None else shuffled_deal(seed))
+
+    def get_game_state(self, canonical: bool = False) -> bytes:
+        # Same format as SolitaireGame.get_game_state
+        data = bytearray((len(self._stock),))
+        data += self._stock
+        data.append(len(self._waste))
+        data += self._waste
+        data += self._foundation_counts
+        if canonical:
+            for pile_data in sorted(
+                (bytes((len(pile),)) + pile for pile in self._piles),
+                key=_canonical_pile_key,
+            ):
+                data += pile_data
+        else:
+            for pile in self._piles:
+                data.append(len(pile))
+                data += pile
+        return bytes(data)
+
+    def canonical_pile_order(self) -> list[int]:
+        pile_keys = [
+            _canonical_pile_key(bytes((len(pile),)) + pile) for pile in self._piles
+        ]
+        return sorted(range(7), key=pile_keys.__getitem__)
+
+    def set_game_state(self, state: bytes) -> None:
+        idx = 0
+
+        # Stock
+        stock_len = state[idx]
+        idx += 1
+        self._stock[:] = state[idx : idx + stock_len]
+        idx += stock_len
+
+        # Waste
+        waste_len = state[idx]
+        idx += 1
+        self._waste[:] = state[idx : idx + waste_len]
+        idx += waste_len
+
+        # Foundation
+        self._foundation_counts[:] = state[idx : idx + 4]
+        idx += 4
+
+        # Tableau
+        for t_idx, pile in enumerate(self._piles):
+            pile_len = state[idx]
+            idx += 1
+            pile[:] = state[idx : idx + pile_len]
+            idx += pile_len
+            face_down = pile.translate(_FACE_UP_FLAGS).find(1)
+            self._face_down[t_idx] = pile_len if face_down < 0 else face_down
+
+        if self._track_hash:
+            self._hash = self._compute_hash()
+
+    def read_game_state(
+        self, state: bytes
+    ) -> tuple[list[Card], list[Card], list[list[Card]], list[list[tuple[Card, bool]]]]:
+        # Decodes state bytes into the SolitaireGame representation of the piles
+        stock_len = state[0]
+        idx = 1 + stock_len
+        stock = [CARD_FROM_CODE[code] for code in state[1:idx]]
+
+        waste_len = state[idx]
+        idx += 1
+        waste = [CARD_FROM_CODE[code] for code in state[idx : idx + waste_len]]
+        idx += waste_len
+
+        foundation = [
+            [CARD_FROM_CODE[(suit << 4) | rank] for rank in range(count)]
+            for suit, count in enumerate(state[idx : idx + 4])
+        ]
+        idx += 4
+
+        tableau: list[list[tuple[Card, bool]]] = []
+        for _ in range(7):
+            pile_len = state[idx]
+            idx += 1
+            tableau.append(
+                [
+                    (CARD_FROM_CODE[code & _CARD_MASK], code >= _FACE_UP)
+                    for code in state[idx : idx + pile_len]
+                ]
+            )
+            idx += pile_len
+
+        return stock, waste, foundation, tableau
+
+    def get_valid_moves(self) -> list[GameAction]:
+        # Same moves in the same order as SolitaireGame.get_valid_moves, using
+        # the per-code lookup tables
+        moves: list[GameAction] = []
+        piles = self._piles
+        counts = self._foundation_counts
+
+        accepts: dict[int, list[int]] = {}
+        empty_piles: list[int] = []
+        for t_idx, pile in enumerate(piles):
+            if pile:
+                key = _ACCEPTS_KEY[pile[-1]]
+                if key in accepts:
+                    accepts[key].append(t_idx)
+                else:
+                    accepts[key] = [t_idx]
+            else:
+                empty_piles.append(t_idx)
+        if empty_piles:
+            accepts[13 << 1] = accepts[(13 << 1) | 1] = empty_piles
+
+        # Check waste to foundation and waste to tableau
+        if self._waste:
+            code = self._waste[-1]
+            if counts[code >> 4] == code & 0xF:
+                moves.append(("wf", ()))
+            for t_idx in accepts.get(_CARD_KEY[code], ()):
+                moves.append(("wt", (t_idx,)))
+
+        # Check tableau to foundation
+        for t_idx, pile in enumerate(piles):
+            if pile:
+                code = pile[-1] & _CARD_MASK
+                if counts[code >> 4] == code & 0xF:
+                    moves.append(("tf", (t_idx,)))
+
+        # Check tableau to tableau
+        for from_idx, pile in enumerate(piles):
+            pile_len = len(pile)
+            for i in range(pile_len - 1, self._face_down[from_idx] - 1, -1):
+                for to_idx in accepts.get(_CARD_KEY[pile[i]], ()):
+                    moves.append(("tt", (from_idx, to_idx, pile_len - i)))
+
+        # Check foundation to tableau
+        for f_idx, count in enumerate(counts):
+            if count:
+                for t_idx in accepts.get(_CARD_KEY[(f_idx << 4) | (count - 1)], ()):
+                    moves.append(("ft", (f_idx, t_idx)))
+
+        # Check draw from stock
+        if self._stock or self._waste:
+            moves.append(("s", ()))
+
+        return moves
+
+    def make_move(self, action: GameAction) -> MoveRecord:
+        # Returns a record that unmake_move can use to take the move back
+        prior_hash = self._hash
+        if action[0] == "s":
+            drawn, recycled = self.draw_from_stock()
+            return action, drawn, recycled, prior_hash
+        elif action[0] == "wf":
+            f_idx = self._waste[-1] >> 4 if self._waste else 0
+            self.move_waste_to_foundation()
+            return action, f_idx, False, prior_hash
+        elif action[0] == "wt":
+            self.move_waste_to_tableau(action[1][0])  # ty: ignore[index-out-of-bounds]
+        elif action[0] == "tf":
+            pile = self._piles[action[1][0]]  # ty: ignore[index-out-of-bounds]
+            f_idx = (pile[-1] & _CARD_MASK) >> 4 if pile else 0
+            flipped = self.move_tableau_to_foundation(action[1][0])  # ty: ignore[index-out-of-bounds]
+            return action, f_idx, flipped, prior_hash
+        elif action[0] == "ft":
+            self.foundation_to_tableau(action[1][0], action[1][1])  # ty: ignore[index-out-of-bounds]
+        elif action[0] == "tt":
+            num_cards, flipped = self.move_tableau_to_tableau(*action[1])  # ty: ignore[invalid-argument-type]
+            return action, num_cards, flipped, prior_hash
+        return action, 0, False, prior_hash
+
+    def unmake_move(self, record: MoveRecord) -> None:
+        # See SolitaireGame.unmake_move
+        action, count, flag, prior_hash = record
+        if action[0] == "s":
+            stock = self._stock
+            waste = self._waste
+            for _ in range(count):
+                stock.append(waste.pop())
+            if flag:
+                # undo the recycle of the waste into the stock
+                stock.reverse()
+                waste += stock
+                stock.clear()
+        elif action[0] == "wf":
+            self._foundation_counts[count] -= 1
+            self._waste.append((count << 4) | self._foundation_counts[count])
+        elif action[0] == "wt":
+            self._waste.append(self._piles[action[1][0]].pop() & _CARD_MASK)  # ty: ignore[index-out-of-bounds]
+        elif action[0] == "tf":
+            t_idx = action[1][0]  # ty: ignore[index-out-of-bounds]
+            if flag:
+                self._turn_down_top(t_idx)
+            self._foundation_counts[count] -= 1
+            code = (count << 4) | self._foundation_counts[count]
+            self._piles[t_idx].append(code | _FACE_UP)
+        elif action[0] == "ft":
+            self._piles[action[1][1]].pop()  # ty: ignore[index-out-of-bounds]
+            self._foundation_counts[action[1][0]] += 1  # ty: ignore[index-out-of-bounds]
+        elif action[0] == "tt":
+            from_idx, to_idx = action[1][:2]  # ty: ignore[index-out-of-bounds]
+            if flag:
+                self._turn_down_top(from_idx)
+            to_pile = self._piles[to_idx]
+            self._piles[from_idx] += to_pile[-count:]
+            del to_pile[-count:]
+        self._hash = prior_hash
+
+    def _turn_down_top(self, tableau_index: int) -> None:
+        self._piles[tableau_index][-1] &= _CARD_MASK
+        self._face_down[tableau_index] += 1
+
+    list_valid_moves = SolitaireGame.list_valid_moves
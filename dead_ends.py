@@ -0,0 +1,265 @@
+"""
+Detection of positions that can no longer be won, so that searches can
+prune them instead of exploring everything below them.
+
+A winning line has to free every card (uncover it, or bring it to the top
+of the waste) so that it can go to the foundations. The detector works out
+an over-approximation of which cards can ever be freed, from the cards that
+have to move out of the way first:
+
+- A face-down card, or the lowest face-up card of a pile, is the bottom of
+  whatever moves off it, so it can only leave its pile for its foundation
+  (once every lower card of its suit is free), onto one of the two
+  opposite-colour cards one rank higher (once one of them is free and in
+  the tableau), or, if it is a King, into an empty column (once some other
+  pile can be cleared).
+- A card can only be freed once every such card above it has left.
+- Cards that are face up above the lowest face-up card of their pile, or on
+  the foundations, are free. With n_draw=1 every card in the stock and waste
+  comes round to the top of the waste; with a larger draw, only the cards
+  that the draw cycle turns up are free, and the others only once one of
+  those can be played, which changes the cycle.
+- A card that is not in the tableau can only be moved onto, once it can be
+  put in the tableau itself, onto a card one rank higher or (a King) into
+  an empty column.
+
+If some card can never be freed under these rules, it never will be in a
+real game either, and the position is lost. DeadEndRule says which pattern
+was found:
+
+- "self_block": a pile blocks itself, e.g. a card lies above a lower card
+  of its suit and both cards it could move onto.
+- "stock_block": some stock cards never come up with this n_draw, and no
+  card that does come up can ever be played.
+- "cross_block": piles block each other, or are blocked by the stock.
+"""
+
+from typing import Literal
+
+type DeadEndRule = Literal["self_block", "stock_block", "cross_block"]
+
+_FACE_UP = 0x40
+# bytes.translate tables: face-up codes to 1 (others to 0), and the codes
+# to delete to leave only the face-up cards (pile lengths are below 0x40 too)
+_IS_FACE_UP = bytes(code >= _FACE_UP for code in range(256))
+_FACE_DOWN = bytes(range(_FACE_UP))
+_KING = 12
+# Suit codes (suit - 1) of the opposite colour
+_OPPOSITE_SUITS = ((1, 3), (0, 2), (1, 3), (0, 2))
+
+# Bit masks, indexed by card code: every card, the cards one rank higher of
+# the opposite colour, and the lower cards of the same suit
+_ALL_CARDS = sum(1 << (suit << 4 | rank) for suit in range(4) for rank in range(13))
+_TARGETS = tuple(
+    0
+    if code & 0xF >= _KING
+    else sum(
+        1 << (other << 4 | (code & 0xF) + 1) for other in _OPPOSITE_SUITS[code >> 4 & 3]
+    )
+    for code in range(64)
+)
+_LOWER = tuple(((1 << (code & 0xF)) - 1) << (code & 0x30) for code in range(64))
+# Card codes, Kings first
+_BY_RANK = sorted(
+    (suit << 4 | rank for suit in range(4) for rank in range(13)),
+    key=lambda code: -(code & 0xF),
+)
+
+
+def _structure_key(tableau: bytes) -> tuple[bytes, bytes]:
+    """
+    Takes the tableau part of a state and returns the face-down cards and
+    lowest face-up card of each pile, which decide which tableau cards can
+    be freed, and the face-up cards sorted by code, which moves between
+    piles do not change.
+    """
+    is_face_up = tableau.translate(_IS_FACE_UP)
+    parts = []
+    idx = 0
+    for _ in range(7):
+        end = idx + 1 + tableau[idx]
+        lowest_up = is_face_up.find(1, idx + 1, end)
+        parts.append(tableau[idx + 1 : lowest_up + 1 if lowest_up >= 0 else end])
+        idx = end
+    face_up = bytes(sorted(tableau.translate(None, _FACE_DOWN)))
+    return b"\xff".join(parts), face_up
+
+
+def _stock_masks(stock: bytes, waste: bytes, n_draw: int) -> tuple[int, int]:
+    """
+    Returns bit masks (bit = card code) of the stock and waste cards that
+    drawing brings to the top of the waste, including the current top, and
+    of those it never does, as in macro_moves.waste_cycle.
+    """
+    all_cards = 0
+    for code in stock + waste:
+        all_cards |= 1 << code
+    reached = 1 << waste[-1] if waste else 0
+    stock_list = list(stock)
+    waste_list = list(waste)
+    start = len(stock_list), len(waste_list)
+    recycles = 0
+    while stock_list or waste_list:
+        if not stock_list:
+            recycles += 1
+            if recycles == 2:
+                break
+            stock_list = waste_list[::-1]
+            waste_list = []
+        for _ in range(n_draw):
+            if stock_list:
+                waste_list.append(stock_list.pop())
+        if (len(stock_list), len(waste_list)) == start:
+            break
+        reached |= 1 << waste_list[-1]
+    return reached, all_cards & ~reached
+
+
+def _find_dead_end(
+    key: bytes, face_up_codes: bytes, reached: int, unreached: int
+) -> DeadEndRule | None:
+    """
+    Runs the rules of the module docstring on a _structure_key. `reached`
+    and `unreached` are _stock_masks, or both 0 if every stock card comes up.
+    """
+    piles = [[code & 0x3F for code in part] for part in key.split(b"\xff")]
+    base = 0
+    for pile in piles:
+        for code in pile:
+            base |= 1 << code
+    face_up = 0
+    for code in face_up_codes:
+        face_up |= 1 << (code & 0x3F)
+    face_up &= ~base
+    # Every card of a pile from this position up is free; -1 once the pile
+    # can be cleared
+    free_from = [len(pile) - 1 for pile in piles]
+    # The cards that can be freed so far (a bit mask), and the cards outside
+    # the tableau, Kings first
+    free = _ALL_CARDS & ~base & ~unreached
+    for pile in piles:
+        if pile:
+            free |= 1 << pile[-1]
+    others = [code for code in _BY_RANK if (base | face_up) >> code & 1 == 0]
+    # Whether a card from the stock can be played, freeing the unreached cards
+    stock_open = not unreached
+    reached_codes = [code for code in _BY_RANK if reached >> code & 1]
+
+    changed = True
+    while changed:
+        changed = False
+        cleared = min(free_from) < 0
+        # Cards that others can be moved onto
+        takes = face_up | free & base
+        for code in others:
+            if takes & _TARGETS[code] or (code & 0xF == _KING and cleared):
+                takes |= 1 << code
+
+        for t_idx, pile in enumerate(piles):
+            t_pos = free_from[t_idx]
+            while t_pos >= 0:
+                code = pile[t_pos]
+                lower = _LOWER[code]
+                if not (
+                    free & lower == lower
+                    or takes & _TARGETS[code]
+                    or (code & 0xF == _KING and cleared)
+                ):
+                    break
+                t_pos -= 1
+                if t_pos >= 0:
+                    free |= 1 << pile[t_pos]
+                    takes |= 1 << pile[t_pos]
+                changed = True
+            free_from[t_idx] = t_pos
+
+        if not stock_open:
+            for code in reached_codes:
+                lower = _LOWER[code]
+                if (
+                    free & lower == lower
+                    or takes & _TARGETS[code]
+                    or (code & 0xF == _KING and cleared)
+                ):
+                    stock_open = changed = True
+                    free |= unreached
+                    break
+
+    stuck = [t_idx for t_idx in range(7) if free_from[t_idx] > 0]
+    for t_idx in stuck:
+        code = piles[t_idx][free_from[t_idx]]
+        suit, rank = code >> 4, code & 0xF
+        below = piles[t_idx][: free_from[t_idx]]
+        if (
+            rank != _KING
+            and any(lower >> 4 == suit and lower & 0xF < rank for lower in below)
+            and all(other << 4 | rank + 1 in below for other in _OPPOSITE_SUITS[suit])
+        ):
+            return "self_block"
+    if not stock_open:
+        return "stock_block"
+    if stuck:
+        return "cross_block"
+    return None
+
+
+class DeadEndDetector:
+    """
+    Checks game states (as returned by get_game_state) for dead ends; see
+    the module docstring for the rules. It is meant to be called on every
+    node of a search, so results are memoised on which stock cards come up
+    and on the tableau bytes, which draws and foundation moves leave alone,
+    and behind that on the face-down structure of the tableau, which few
+    moves change. Most checks cost a slice and a dictionary lookup or two.
+    None of this depends on the deal, so one detector can be shared by many
+    solves.
+
+    Each memo is emptied when it reaches max_entries results.
+    """
+
+    def __init__(self, max_entries: int = 200_000) -> None:
+        self.max_entries = max_entries
+        self._tableau_memo: dict[tuple[bytes, int, int], DeadEndRule | None] = {}
+        self._memo: dict[tuple[bytes, bytes, int, int], DeadEndRule | None] = {}
+        self._stock_memo: dict[bytes, tuple[int, int]] = {}
+
+    def check(self, state: bytes, n_draw: int) -> DeadEndRule | None:
+        # The rule that shows the position is lost, or None if none does
+        reached = unreached = 0
+        stock_len = state[0]
+        tableau_start = stock_len + state[stock_len + 1] + 6
+        if n_draw > 1 and tableau_start > 7:
+            stock_key = state[: tableau_start - 4] + bytes((n_draw,))
+            masks = self._stock_memo.get(stock_key)
+            if masks is None:
+                stock = state[1 : stock_len + 1]
+                waste = stock_key[stock_len + 2 : -1]
+                masks = _stock_masks(stock, waste, n_draw)
+                self._remember(self._stock_memo, stock_key, masks)
+            if masks[1]:
+                reached, unreached = masks
+
+        tableau = state[tableau_start:]
+        tableau_key = tableau, reached, unreached
+        try:
+            return self._tableau_memo[tableau_key]
+        except KeyError:
+            pass
+        key = *_structure_key(tableau), reached, unreached
+        try:
+            rule = self._memo[key]
+        except KeyError:
+            rule = _find_dead_end(*key)
+            self._remember(self._memo, key, rule)
+        self._remember(self._tableau_memo, tableau_key, rule)
+        return rule
+
+    def _remember(self, memo: dict, key, value) -> None:
+        if len(memo) >= self.max_entries:
+            memo.clear()
+        memo[key] = value
+
+    def clear(self) -> None:
+        self._tableau_memo.clear()
+        self._memo.clear()
+        self._stock_memo.clear()
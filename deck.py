@@ -1,7 +1,8 @@
 import random
+from collections.abc import Iterator, Sequence
 from dataclasses import dataclass
 from itertools import product
-from typing import Literal
+from typing import Literal, Self
 
 type Suit = Literal[1, 2, 3, 4]
 type Rank = Literal[1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13]
@@ -29,11 +30,21 @@ RANK_MAP: dict[Rank, tuple[str, str]] = {
 }
 
 
-@dataclass(frozen=True, slots=True)
+@dataclass(frozen=True, slots=True, eq=False, init=False)
 class Card:
+    # Cards are interned: Card(rank, suit) always returns the same one of the 52
+    # objects in CARDS, so cards can be compared (and hashed) by identity
     rank: Rank
     suit: Suit
 
+    def __new__(cls, rank: Rank, suit: Suit) -> Self:
+        if not (1 <= rank <= 13 and 1 <= suit <= 4):
+            raise ValueError(f"Invalid card: rank {rank}, suit {suit}")
+        return CARDS[(suit - 1) * 13 + rank - 1]
+
+    def __reduce__(self) -> tuple[type[Self], tuple[Rank, Suit]]:
+        return Card, (self.rank, self.suit)
+
     def __repr__(self) -> str:
         return f"Card({self.rank}, {self.suit})"
 
@@ -59,11 +70,91 @@ class BlankCard:
 BLANK = BlankCard()
 
 
+def _make_card(rank: Rank, suit: Suit) -> Card:
+    card = object.__new__(Card)
+    object.__setattr__(card, "rank", rank)
+    object.__setattr__(card, "suit", suit)
+    return card
+
+
+# The 52 interned cards, in the order of a new Deck (by suit, then rank)
+CARDS: tuple[Card, ...] = tuple(
+    _make_card(rank, suit) for suit, rank in product(SUITS_MAP, RANK_MAP)
+)
+
+# Card codes, as used in deals and game states: bits 0-3 are the rank (0-12)
+# and bits 4-5 the suit (0-3). In the tableau, bit 6 is set if the card is face up.
+CARD_CODES: dict[Card, int] = {
+    card: ((card.suit - 1) << 4) | (card.rank - 1) for card in CARDS
+}
+# Card for each code. The unused codes 13-15 of each suit map to None, which
+# is left out of the type as valid codes never look them up.
+CARD_FROM_CODE: tuple[Card, ...] = tuple(  # ty: ignore[invalid-assignment]
+    CARDS[(code >> 4) * 13 + (code & 0xF)] if code & 0xF < 13 else None
+    for code in range(64)
+)
+# (Card, is_face_up) for each tableau code
+TABLEAU_ENTRY_FROM_CODE: tuple[tuple[Card, bool], ...] = tuple(
+    (CARD_FROM_CODE[code & 0x3F], code >= 0x40) for code in range(128)
+)
+
+# A deal is the 52 card codes of a shuffled deck, in Deck.cards order (cards
+# are dealt from the end)
+_UNSHUFFLED_DEAL = bytes(CARD_CODES[card] for card in CARDS)
+_DEAL_CODES = frozenset(_UNSHUFFLED_DEAL)
+
+
+def is_valid_deal(deal: bytes) -> bool:
+    return len(deal) == 52 and set(deal) == _DEAL_CODES
+
+
+def shuffled_deal(seed: int | None = None) -> bytes:
+    """
+    Returns a shuffled deal. The same seed always gives the same deal, and
+    without a seed the global random module is used, exactly like Deck.shuffle.
+    """
+    deal = bytearray(_UNSHUFFLED_DEAL)
+    if seed is None:
+        random.shuffle(deal)
+    else:
+        random.Random(seed).shuffle(deal)
+    return bytes(deal)
+
+
+def generate_deals(count: int, start_seed: int = 0) -> Iterator[bytes]:
+    """
+    Yields the deals for seeds start_seed, start_seed + 1, ... as raw 52-byte
+    permutations, without creating Card or Deck objects. Deal i is the same as
+    shuffled_deal(start_seed + i).
+    """
+    rng = random.Random()
+    for seed in range(start_seed, start_seed + count):
+        rng.seed(seed)
+        deal = bytearray(_UNSHUFFLED_DEAL)
+        rng.shuffle(deal)
+        yield bytes(deal)
+
+
 class Deck:
     def __init__(self) -> None:
-        self.cards: list[Card] = [
-            Card(r, s) for s, r in product(SUITS_MAP.keys(), RANK_MAP.keys())
-        ]
+        self.cards: list[Card] = list(CARDS)
+
+    @classmethod
+    def from_permutation(cls, deal: bytes | Sequence[int]) -> Self:
+        # Builds the deck for a deal (see shuffled_deal)
+        if not is_valid_deal(bytes(deal)):
+            raise ValueError("A deal must contain each of the 52 card codes once")
+        deck = cls.__new__(cls)
+        deck.cards = [CARD_FROM_CODE[code] for code in deal]
+        return deck
+
+    @classmethod
+    def from_seed(cls, seed: int) -> Self:
+        return cls.from_permutation(shuffled_deal(seed))
+
+    def deal_id(self) -> bytes:
+        # The deck as a deal: one card code per card, in order
+        return bytes(map(CARD_CODES.__getitem__, self.cards))
 
     def __repr__(self) -> str:
         return f"Deck({self.cards})"
@@ -71,8 +162,8 @@ class Deck:
     def __str__(self) -> str:
         return "[" + ", ".join(str(card) for card in self.cards) + "]"
 
-    def shuffle(self) -> None:
-        random.shuffle(self.cards)
+    def shuffle(self, rng: random.Random | None = None) -> None:
+        (rng or random).shuffle(self.cards)
 
     def peek(self) -> Card:
         if self.is_empty():
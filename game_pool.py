@@ -0,0 +1,95 @@
+"""
+A pool of game objects for search and rollout code that forks positions
+often, so that games are recycled instead of allocated for every fork.
+
+    pool = GamePool(n_draw=3, size=64)
+    game = pool.acquire(state)        # or pool.clone(other_game)
+    ...
+    pool.release(game)
+
+A new game is never dealt: games are made with from_state, which only
+copies the given position, and a recycled CompactSolitaireGame is refilled
+in place, without allocating anything.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from compact_game import CompactSolitaireGame
+from solitaire_game import EMPTY_STATE, SolitaireGame
+
+type PooledGame = SolitaireGame | CompactSolitaireGame
+
+
+class GamePool:
+    """
+    Games of one class, n_draw and track_hash setting, handed out by acquire
+    and clone and given back with release. `size` games are made up front;
+    more are made when the pool runs out, and at most max_free games are
+    kept once they are given back.
+    """
+
+    def __init__(
+        self,
+        n_draw: int = 3,
+        *,
+        size: int = 0,
+        max_free: int = 1024,
+        track_hash: bool = False,
+        game_class: type[PooledGame] = CompactSolitaireGame,
+    ) -> None:
+        self.n_draw = n_draw
+        self.max_free = max_free
+        self.track_hash = track_hash
+        self.game_class = game_class
+        # Games made, and games handed out again after being given back
+        self.created = 0
+        self.reused = 0
+        self._free: list[PooledGame] = [self._new(EMPTY_STATE) for _ in range(size)]
+
+    def __len__(self) -> int:
+        # Games ready to be handed out
+        return len(self._free)
+
+    def _new(self, state: bytes) -> PooledGame:
+        self.created += 1
+        return self.game_class.from_state(state, self.n_draw, self.track_hash)
+
+    def acquire(self, state: bytes = EMPTY_STATE) -> PooledGame:
+        # A game in the position given as get_game_state bytes
+        if not self._free:
+            return self._new(state)
+        self.reused += 1
+        game = self._free.pop()
+        game.n_draw = self.n_draw
+        if game.track_hash != self.track_hash:
+            game.track_hash = self.track_hash
+        game.set_game_state(state)
+        return game
+
+    def clone(self, game: PooledGame) -> PooledGame:
+        """
+        A game in the same position as `game`, which must be of the pool's
+        game class; it also takes the n_draw and track_hash of `game`.
+        """
+        if not self._free:
+            self.created += 1
+            return game.clone()
+        self.reused += 1
+        copy = self._free.pop()
+        copy.copy_from(game)  # ty: ignore[invalid-argument-type]
+        return copy
+
+    def release(self, game: PooledGame) -> None:
+        # Gives a game back; it must not be used again by the caller
+        if len(self._free) < self.max_free:
+            self._free.append(game)
+
+    @contextmanager
+    def borrowed(self, state: bytes = EMPTY_STATE) -> Iterator[PooledGame]:
+        # acquire and release around a with block
+        game = self.acquire(state)
+        try:
+            yield game
+        finally:
+            self.release(game)
@@ -0,0 +1,212 @@
+"""
+Move hints for games in progress that reuse what earlier searches found,
+instead of solving every position from scratch.
+
+HintEngine remembers every position on the winning lines its searches find,
+by state_hash, together with the next move of the line. A hint for a
+remembered position is a dictionary lookup, so a player who follows the
+hints gets all but the first one in microseconds. For any other position
+the engine searches with the remembered positions as goals (see solve), so
+the search stops as soon as it joins a known line; a player who plays
+something else usually rejoins one within a few moves, which a short search
+finds. Positions that a search proves lost are remembered too.
+"""
+
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from dead_ends import DeadEndDetector
+from move_policy import MovePolicy
+from solitaire_game import ALL_ACTIONS, GameAction, SolitaireGame, action_code
+from solver import SolveStatus, solve
+
+
+@dataclass(slots=True)
+class Hint:
+    # The next move of a winning line, or None if none is known
+    action: GameAction | None
+    status: SolveStatus
+    # Whether the hint was answered from what the engine remembers, without
+    # searching
+    cached: bool
+    nodes_expanded: int
+    elapsed: float
+
+
+class HintEngine:
+    """
+    Hints for the games of one n_draw (state_hash does not include it). An
+    engine can be shared by any number of games, e.g. all the sessions of a
+    server, and the games it is given are left as they were.
+
+    Each search runs for at most time_budget seconds and max_nodes nodes.
+    Remembered positions are kept in two generations of up to
+    max_entries // 2 each: when the newer one is full it becomes the older
+    one, and the older one is dropped. A position found in the older
+    generation is copied to the newer one together with the rest of its
+    line, so a remembered line is never cut short and following the hints
+    always reaches a win.
+
+    Searches use `policy`, MovePolicy() by default (one with every rule
+    switched off expands every move), and by default prune with a
+    DeadEndDetector. A position is only remembered as lost when a search
+    proves it ("unsolvable"), not when a policy that can miss wins runs out
+    of moves ("exhausted").
+    """
+
+    def __init__(
+        self,
+        n_draw: int = 3,
+        *,
+        time_budget: float = 1.0,
+        max_nodes: int = 100_000,
+        max_entries: int = 1 << 18,
+        policy: MovePolicy | None = None,
+        dead_ends: bool = True,
+    ) -> None:
+        self.n_draw = n_draw
+        self.time_budget = time_budget
+        self.max_nodes = max_nodes
+        self.max_entries = max_entries
+        self.policy = MovePolicy() if policy is None else policy
+        self.detector = DeadEndDetector() if dead_ends else None
+        # Hints answered from the remembered positions, and searches run
+        self.hits = 0
+        self.searches = 0
+        # state_hash to the action code of the next move of a winning line,
+        # in the newer and the older generation
+        self._wins: dict[int, int] = {}
+        self._old_wins: dict[int, int] = {}
+        self._lost: set[int] = set()
+        self._old_lost: set[int] = set()
+
+    def __len__(self) -> int:
+        return (
+            len(self._wins)
+            + len(self._old_wins)
+            + len(self._lost)
+            + len(self._old_lost)
+        )
+
+    def __contains__(self, key: object) -> bool:
+        # Whether the position with this state_hash is known to be winnable
+        return key in self._wins or key in self._old_wins
+
+    def lookup(self, game: SolitaireGame) -> Hint | None:
+        # The hint for a remembered position, or None if it needs a search
+        start = time.perf_counter()
+        if game.n_draw != self.n_draw:
+            raise ValueError(f"This engine is for n_draw={self.n_draw}")
+        key = game.state_hash
+        code = self._next_code(game, key)
+        if code is not None:
+            self.hits += 1
+            return Hint(
+                ALL_ACTIONS[code], "solved", True, 0, time.perf_counter() - start
+            )
+        if key in self._lost or key in self._old_lost:
+            self.hits += 1
+            return Hint(None, "unsolvable", True, 0, time.perf_counter() - start)
+        return None
+
+    def hint(self, game: SolitaireGame, time_budget: float | None = None) -> Hint:
+        """
+        The next move of a winning line from the current position of `game`,
+        searching for up to time_budget seconds (the engine's by default) if
+        the position is not remembered.
+        """
+        start = time.perf_counter()
+        cached = self.lookup(game)
+        if cached is not None:
+            return cached
+
+        self.searches += 1
+        result = solve(
+            game,
+            max_nodes=self.max_nodes,
+            time_limit=self.time_budget if time_budget is None else time_budget,
+            dedup="hash",
+            policy=self.policy,
+            dead_ends=self.detector,
+            goals=self,
+        )
+        if result.solved:
+            self.learn(game, result.moves)
+        elif result.status == "unsolvable":
+            if len(self._lost) >= self.max_entries // 2:
+                self._old_lost, self._lost = self._lost, set()
+            self._lost.add(game.state_hash)
+        return Hint(
+            result.moves[0] if result.moves else None,
+            result.status,
+            False,
+            result.nodes_expanded,
+            time.perf_counter() - start,
+        )
+
+    def line(self, game: SolitaireGame) -> list[GameAction] | None:
+        # The whole remembered winning line from the current position, or
+        # None if the position is not remembered as winnable
+        if self._next_code(game, game.state_hash) is None:
+            return None
+        return [ALL_ACTIONS[code] for code in self._follow(game, ()).values()]
+
+    def learn(self, game: SolitaireGame, moves: Sequence[GameAction]) -> None:
+        """
+        Remembers a winning line from the current position of `game`, e.g.
+        one found by a solve elsewhere. It may stop at a remembered position,
+        which the rest of its line is then copied from.
+        """
+        line = self._follow(game, moves)
+        if len(self._wins) + len(line) > self.max_entries // 2:
+            self._old_wins, self._wins = self._wins, {}
+        self._wins.update(line)
+
+    def clear(self) -> None:
+        self._wins.clear()
+        self._old_wins.clear()
+        self._lost.clear()
+        self._old_lost.clear()
+        if self.detector is not None:
+            self.detector.clear()
+
+    def _next_code(self, game: SolitaireGame, key: int) -> int | None:
+        # The remembered next move for the current position, moving its line
+        # into the newer generation if it is in the older one
+        code = self._wins.get(key)
+        if code is None and key in self._old_wins:
+            self.learn(game, ())
+            code = self._wins.get(key)
+        return code
+
+    def _follow(
+        self, game: SolitaireGame, moves: Sequence[GameAction]
+    ) -> dict[int, int]:
+        """
+        Plays `moves` and then the remembered line they lead to, and returns
+        the state_hash of each position on the way with the action code of
+        the move played from it. The game is put back at the end.
+        """
+        was_tracking_hash = game.track_hash
+        if not was_tracking_hash:
+            game.track_hash = True
+        line: dict[int, int] = {}
+        records = []
+        for action in moves:
+            line[game.state_hash] = action_code(action)
+            records.append(game.make_move(action))
+        while True:
+            key = game.state_hash
+            code = self._wins.get(key)
+            if code is None:
+                code = self._old_wins.get(key)
+            if code is None or key in line:
+                break
+            line[key] = code
+            records.append(game.make_move(ALL_ACTIONS[code]))
+        for record in reversed(records):
+            game.unmake_move(record)
+        if not was_tracking_hash:
+            game.track_hash = False
+        return line
@@ -0,0 +1,145 @@
+"""
+Opt-in instrumentation for finding out where the time of a solve goes.
+
+Nothing here is on the normal code path: the solvers only wrap the game,
+heuristic and transposition table lookups when given an Instruments, so
+there is no cost when it is not used. The wrappers count calls and add up
+the time spent in them with time.perf_counter, which costs a fraction of a
+microsecond per call, so timings of the cheapest calls are inflated a
+little.
+"""
+
+import sys
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from solitaire_game import GameAction, MoveRecord, SolitaireGame
+
+
+@dataclass(frozen=True, slots=True)
+class Progress:
+    # What a solver reports to its progress callback
+    nodes_expanded: int
+    states_seen: int
+    # Nodes waiting to be searched: the frontier of best-first search, the
+    # current line of a depth-first search, or a beam layer
+    frontier: int
+    tt_lookups: int
+    tt_hits: int
+    elapsed: float
+
+    @property
+    def nodes_per_sec(self) -> float:
+        return self.nodes_expanded / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_lookups if self.tt_lookups else 0.0
+
+
+type ProgressCallback = Callable[[Progress], None]
+
+
+def print_progress(progress: Progress, label: str = "") -> None:
+    # A ProgressCallback that prints one line to stderr, after `label`
+    print(
+        f"{label}{progress.elapsed:7.1f}s  {progress.nodes_expanded:,} nodes "
+        f"({progress.nodes_per_sec:,.0f}/s), {progress.states_seen:,} states, "
+        f"frontier {progress.frontier:,}, TT hit rate {progress.tt_hit_rate:.1%}",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+class Instruments:
+    """
+    Call counts and cumulative times, by name, for the functions wrapped
+    with timed, and the number of moves made of each kind ("s", "wf", ...)
+    by games wrapped with game.
+    """
+
+    def __init__(self) -> None:
+        self.calls: Counter[str] = Counter()
+        self.seconds: dict[str, float] = {}
+        self.move_kinds: Counter[str] = Counter()
+
+    def timed[**P, R](self, name: str, func: Callable[P, R]) -> Callable[P, R]:
+        # func, counting its calls and time under `name`
+        calls = self.calls
+        seconds = self.seconds
+        seconds.setdefault(name, 0.0)
+        perf_counter = time.perf_counter
+
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds[name] += perf_counter() - start
+                calls[name] += 1
+
+        return wrapper
+
+    def game(self, game: SolitaireGame) -> SolitaireGame:
+        # An InstrumentedGame, typed as the game it stands in for so that
+        # callers can use it in its place
+        return InstrumentedGame(game, self)  # ty: ignore[invalid-return-type]
+
+    def reset(self) -> None:
+        self.calls.clear()
+        self.seconds.clear()
+        self.move_kinds.clear()
+
+    def report(self) -> str:
+        # A table of the timings, most time first, then the move counts
+        lines = [f"{'':<16} {'calls':>12} {'seconds':>10} {'us/call':>9}"]
+        for name, seconds in sorted(self.seconds.items(), key=lambda kv: -kv[1]):
+            calls = self.calls[name]
+            per_call = seconds / calls * 1e6 if calls else 0.0
+            lines.append(f"{name:<16} {calls:>12,} {seconds:>10.3f} {per_call:>9.2f}")
+        if self.move_kinds:
+            lines.append(
+                "moves: "
+                + ", ".join(
+                    f"{kind} {n:,}" for kind, n in self.move_kinds.most_common()
+                )
+            )
+        return "\n".join(lines)
+
+
+class InstrumentedGame:
+    """
+    Stands in for a game, timing its hot methods. Everything else, including
+    setting attributes such as track_hash, goes straight to the game.
+    """
+
+    _TIMED = (
+        "get_valid_moves",
+        "unmake_move",
+        "get_game_state",
+        "set_game_state",
+        "is_auto_solvable",
+    )
+
+    def __init__(self, game: SolitaireGame, instruments: Instruments) -> None:
+        set_own = object.__setattr__
+        set_own(self, "game", game)
+        for name in self._TIMED:
+            set_own(self, name, instruments.timed(name, getattr(game, name)))
+
+        timed_make_move = instruments.timed("make_move", game.make_move)
+        move_kinds = instruments.move_kinds
+
+        def make_move(action: GameAction) -> MoveRecord:
+            move_kinds[action[0]] += 1
+            return timed_make_move(action)
+
+        set_own(self, "make_move", make_move)
+
+    def __getattr__(self, name: str):
+        return getattr(self.game, name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self.game, name, value)
@@ -0,0 +1,191 @@
+"""
+Load generator for server.py.
+
+Opens a number of connections, each holding its share of the sessions, and
+plays every session with random valid moves, one move per session in turn,
+so that sessions keep being saved and loaded when there are more than the
+server's live games. A fraction of the turns ask for a hint and play it
+instead. At the end it prints the request rate and the latency of each kind
+of request as seen by the client, and the server's own figures.
+
+Usage:
+    python server.py &
+    python load_client.py --sessions 5000 --connections 100 --moves 50
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from server import DEFAULT_PORT, LatencyStats
+
+
+class _Connection:
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        latency: LatencyStats,
+    ) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.latency = latency
+        self.errors = 0
+
+    async def request(self, op: str, **fields) -> dict:
+        start = time.perf_counter()
+        self.writer.write(json.dumps({"op": op} | fields).encode() + b"\n")
+        response = json.loads(await self.reader.readline())
+        self.latency.record(op, time.perf_counter() - start)
+        if not response["ok"]:
+            self.errors += 1
+        return response
+
+
+async def _open(
+    host: str, port: int, unix_path: str | None
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if unix_path is not None:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+
+async def _play(
+    connection: _Connection,
+    sessions: int,
+    moves: int,
+    hint_rate: float,
+    n_draw: int,
+    rng: random.Random,
+) -> None:
+    ids = []
+    for _ in range(sessions):
+        response = await connection.request(
+            "new", n_draw=n_draw, seed=rng.randrange(1 << 32)
+        )
+        ids.append(response["session"])
+
+    playing = list(ids)
+    for _ in range(moves):
+        still_playing = []
+        for session in playing:
+            command = None
+            if rng.random() < hint_rate:
+                response = await connection.request("hint", session=session)
+                command = response.get("hint")
+            if command is None:
+                valid = (await connection.request("moves", session=session))["moves"]
+                if not valid:
+                    continue
+                command = rng.choice(valid)
+            response = await connection.request(
+                "move", session=session, command=command
+            )
+            if not response.get("won"):
+                still_playing.append(session)
+        playing = still_playing
+
+    for session in ids:
+        await connection.request("close", session=session)
+
+
+async def run_load(
+    sessions: int = 1000,
+    connections: int = 20,
+    moves: int = 50,
+    hint_rate: float = 0.0,
+    n_draw: int = 3,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    unix_path: str | None = None,
+    seed: int = 0,
+) -> tuple[LatencyStats, int, float, dict]:
+    """
+    Runs the load and returns the client-side latencies, the number of
+    error responses, the seconds it took and the server's stats.
+    """
+    latency = LatencyStats()
+    rng = random.Random(seed)
+    opened = [
+        _Connection(*await _open(host, port, unix_path), latency)
+        for _ in range(connections)
+    ]
+    shares = [
+        sessions // connections + (i < sessions % connections)
+        for i in range(connections)
+    ]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _play(
+                connection, share, moves, hint_rate, n_draw, random.Random(rng.random())
+            )
+            for connection, share in zip(opened, shares)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    server_stats = await opened[0].request("stats")
+    for connection in opened:
+        connection.writer.close()
+        await connection.writer.wait_closed()
+    return (
+        latency,
+        sum(connection.errors for connection in opened),
+        elapsed,
+        server_stats,
+    )
+
+
+def _print_latency(title: str, summary: dict) -> None:
+    print(title)
+    print(f"  {'op':<8} {'count':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    for op, row in summary.items():
+        print(
+            f"  {op:<8} {row['count']:>9,} {row['p50_ms']:>9.3f} "
+            f"{row['p90_ms']:>9.3f} {row['p99_ms']:>9.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="connect to this Unix socket instead")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--moves", type=int, default=50, help="moves per session")
+    parser.add_argument(
+        "--hint-rate", type=float, default=0.0, help="fraction of turns with a hint"
+    )
+    parser.add_argument("--draw", type=int, default=3, help="cards per draw")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    latency, errors, elapsed, server_stats = asyncio.run(
+        run_load(
+            args.sessions,
+            args.connections,
+            args.moves,
+            args.hint_rate,
+            args.draw,
+            args.host,
+            args.port,
+            args.unix,
+            args.seed,
+        )
+    )
+    requests = sum(latency.counts.values())
+    print(
+        f"{requests:,} requests in {elapsed:.2f}s ({requests / elapsed:,.0f}/s), "
+        f"{errors} errors"
+    )
+    _print_latency("client latency", latency.summary())
+    _print_latency("server latency", server_stats["latency"])
+    hints = server_stats["hints"]
+    print(f"hints: {hints['cached']:,} cached, {hints['searched']:,} searched")
+
+
+if __name__ == "__main__":
+    main()
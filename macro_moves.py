@@ -0,0 +1,108 @@
+from deck import Card
+from solitaire_game import GameAction, MoveRecord, SolitaireGame
+
+# A move preceded by some number of draws from the stock: (draws, action)
+type MacroMove = tuple[int, GameAction]
+
+DRAW: GameAction = ("s", ())
+
+
+def waste_cycle(
+    stock: list[Card], waste: list[Card], n_draw: int
+) -> list[tuple[int, Card]]:
+    """
+    Returns (draws, card) for every card that some number of draws brings to
+    the top of the waste, with the fewest draws that do, in order of draws.
+    The current top of the waste is left out.
+
+    After the first recycle, drawing goes round the same sequence of
+    positions from a full stock, so it stops when it gets back to where it
+    started or at the second recycle, whichever comes first.
+    """
+    stock = stock.copy()
+    waste = waste.copy()
+    start = len(stock), len(waste)
+    reachable: list[tuple[int, Card]] = []
+    seen = {waste[-1]} if waste else set()
+    draws = recycles = 0
+    while stock or waste:
+        if not stock:
+            recycles += 1
+            if recycles == 2:
+                break
+            stock = waste[::-1]
+            waste.clear()
+        for _ in range(n_draw):
+            if stock:
+                waste.append(stock.pop())
+        draws += 1
+        if (len(stock), len(waste)) == start:
+            break
+        top = waste[-1]
+        if top not in seen:
+            seen.add(top)
+            reachable.append((draws, top))
+    return reachable
+
+
+def macro_moves(
+    game: SolitaireGame, moves: list[GameAction] | None = None
+) -> list[MacroMove]:
+    """
+    The moves of the current position with drawing from the stock replaced
+    by macro moves: "draw k times, then play the waste card" for every card
+    that drawing can bring to the top of the waste, to every foundation or
+    tableau pile that takes it. Every other move is kept, with 0 draws.
+
+    Draws on their own only matter for the waste card they lead to, and
+    tableau moves do not depend on the stock, so no position is lost. Pass
+    `moves` (e.g. from a MovePolicy) to start from those instead of
+    get_valid_moves; the stock is only searched if they include a draw.
+    """
+    if moves is None:
+        moves = game.get_valid_moves()
+    macros: list[MacroMove] = [(0, action) for action in moves if action[0] != "s"]
+    if len(macros) == len(moves):
+        return macros
+
+    foundation_counts = [len(f_pile) for f_pile in game.foundation]
+    tableau = game.tableau
+    for draws, card in waste_cycle(game.stock, game.waste, game.n_draw):
+        if foundation_counts[card.suit - 1] == card.rank - 1:
+            macros.append((draws, ("wf", ())))
+        is_red = card.suit in (1, 3)
+        for t_idx, t_pile in enumerate(tableau):
+            if not t_pile:
+                fits = card.rank == 13
+            else:
+                top, is_face_up = t_pile[-1]
+                fits = (
+                    is_face_up
+                    and top.rank == card.rank + 1
+                    and (top.suit in (1, 3)) != is_red
+                )
+            if fits:
+                macros.append((draws, ("wt", (t_idx,))))
+    return macros
+
+
+def make_macro(game: SolitaireGame, macro: MacroMove) -> list[MoveRecord]:
+    # Makes the draws and the move, returning the records to unmake them with
+    draws, action = macro
+    records = [game.make_move(DRAW) for _ in range(draws)]
+    records.append(game.make_move(action))
+    return records
+
+
+def unmake_macro(game: SolitaireGame, records: list[MoveRecord]) -> None:
+    for record in reversed(records):
+        game.unmake_move(record)
+
+
+def expand_macros(macros: list[MacroMove]) -> list[GameAction]:
+    # The plain moves that a list of macro moves stands for
+    actions: list[GameAction] = []
+    for draws, action in macros:
+        actions.extend([DRAW] * draws)
+        actions.append(action)
+    return actions
@@ -0,0 +1,174 @@
+from dataclasses import dataclass
+
+from deck import Card
+from solitaire_game import GameAction, SolitaireGame
+
+# Suit (as in Card.suit) of the other suit of the same colour
+_SAME_COLOUR_SUIT = (0, 3, 4, 1, 2)
+# Suits of the opposite colour
+_OPPOSITE_SUITS = ((), (2, 4), (1, 3), (2, 4), (1, 3))
+
+
+def is_safe_to_foundation(card: Card, foundation_counts: list[int]) -> bool:
+    """
+    Whether playing `card` to its foundation can never make the game harder.
+
+    In the tableau a card only serves as a base for the two opposite-colour
+    cards one rank lower. Once both are on the foundations, the only reason
+    to bring one back down would be to hold a same-colour card two ranks
+    lower, so the card is safe when both of those are on the foundations too.
+    Aces and twos are always safe. foundation_counts is indexed by suit - 1.
+    """
+    rank = card.rank
+    if rank <= 2:
+        return True
+    opposite_1, opposite_2 = _OPPOSITE_SUITS[card.suit]
+    return (
+        foundation_counts[opposite_1 - 1] >= rank - 1
+        and foundation_counts[opposite_2 - 1] >= rank - 1
+        and foundation_counts[_SAME_COLOUR_SUIT[card.suit] - 1] >= rank - 2
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class MovePolicy:
+    """
+    Chooses which of get_valid_moves a search should try, and in what order.
+
+    - auto_moves: if a card can be played to the foundations safely (see
+      is_safe_to_foundation), that is the only move returned. Waste cards are
+      only auto-played with n_draw=1, as with a larger draw taking a card out
+      of the waste changes which cards later draws turn up.
+    - drop_dominated: drops moves that can never be better than another
+      move: foundation-to-tableau moves of cards that are safe on the
+      foundations, moving a King-based pile from one empty column to another,
+      and moves to a second empty column (all empty columns are equivalent).
+    - drop_unproductive: drops tableau-to-tableau moves that neither turn a
+      card face up, empty a column, nor free the card underneath to go to the
+      foundations or to receive the waste card or another tableau run. This is
+      a heuristic: a search using it can miss wins, so it is off unless asked
+      for.
+    - order: sorts the remaining moves, most promising first: foundation
+      moves, moves that turn up the most face-down cards, moves that empty a
+      column, waste to tableau, other tableau moves, drawing and finally
+      foundation-to-tableau moves.
+
+    The default policy never drops a move that a win needs. Every rule can be
+    switched off to compare against the plain generator.
+    """
+
+    auto_moves: bool = True
+    drop_dominated: bool = True
+    drop_unproductive: bool = False
+    order: bool = True
+
+    def moves(self, game: SolitaireGame) -> list[GameAction]:
+        moves = game.get_valid_moves()
+        if not (
+            self.auto_moves
+            or self.drop_dominated
+            or self.drop_unproductive
+            or self.order
+        ):
+            return moves
+
+        tableau = game.tableau
+        foundation_counts = [len(f_pile) for f_pile in game.foundation]
+        waste = game.waste
+
+        if self.auto_moves:
+            for action in moves:
+                if action[0] == "tf":
+                    card = tableau[action[1][0]][-1][0]  # ty: ignore[index-out-of-bounds]
+                elif action[0] == "wf" and game.n_draw == 1:
+                    card = waste[-1]
+                else:
+                    continue
+                if is_safe_to_foundation(card, foundation_counts):
+                    return [action]
+
+        if self.drop_dominated or self.drop_unproductive:
+            moves = [
+                action
+                for action in moves
+                if not self._is_pruned(action, tableau, foundation_counts, waste)
+            ]
+
+        if self.order:
+            face_down = [
+                sum(1 for _, is_face_up in t_pile if not is_face_up)
+                for t_pile in tableau
+            ]
+            moves.sort(key=lambda action: _move_rank(action, tableau, face_down))
+        return moves
+
+    def _is_pruned(
+        self,
+        action: GameAction,
+        tableau: list[list[tuple[Card, bool]]],
+        foundation_counts: list[int],
+        waste: list[Card],
+    ) -> bool:
+        kind = action[0]
+        if kind in ("wt", "ft", "tt") and self.drop_dominated:
+            to_idx = action[1][0] if kind == "wt" else action[1][1]  # ty: ignore[index-out-of-bounds]
+            if not tableau[to_idx]:
+                first_empty = next(i for i, t_pile in enumerate(tableau) if not t_pile)
+                if to_idx != first_empty:
+                    return True
+
+        if kind == "ft":
+            f_idx = action[1][0]  # ty: ignore[index-out-of-bounds]
+            card = Card(foundation_counts[f_idx], f_idx + 1)  # type: ignore
+            return self.drop_dominated and is_safe_to_foundation(
+                card, foundation_counts
+            )
+
+        if kind != "tt":
+            return False
+
+        from_idx, _, num_cards = action[1]  # ty: ignore[not-iterable]
+        source_pile = tableau[from_idx]
+        if num_cards == len(source_pile):
+            # Moving a whole pile: only useful if it empties a column for a King
+            return self.drop_dominated and source_pile[0][0].rank == 13
+        if not self.drop_unproductive:
+            return False
+
+        exposed, is_face_up = source_pile[-num_cards - 1]
+        if not is_face_up:
+            return False  # turns a card face up
+        if foundation_counts[exposed.suit - 1] == exposed.rank - 1:
+            return False
+        # Could the exposed card take the waste card or a run from another pile?
+        candidates = [waste[-1]] if waste else []
+        for t_idx, t_pile in enumerate(tableau):
+            if t_idx != from_idx:
+                candidates.extend(card for card, up in t_pile if up)
+        return not any(
+            card.rank == exposed.rank - 1
+            and (card.suit in (1, 3)) != (exposed.suit in (1, 3))
+            for card in candidates
+        )
+
+
+def _move_rank(
+    action: GameAction, tableau: list[list[tuple[Card, bool]]], face_down: list[int]
+) -> tuple[int, int]:
+    # Sort key for MovePolicy.order, lowest first
+    kind = action[0]
+    if kind in ("wf", "tf"):
+        return 0, 0
+    if kind == "tt":
+        from_idx, _, num_cards = action[1]  # ty: ignore[not-iterable]
+        remaining = len(tableau[from_idx]) - num_cards
+        if remaining and remaining == face_down[from_idx]:
+            return 1, -face_down[from_idx]
+        if not remaining:
+            return 2, 0
+        return 4, 0
+    if kind == "wt":
+        return 3, 0
+    if kind == "s":
+        return 5, 0
+    return 6, 0
@@ -0,0 +1,348 @@
+"""
+Compact binary files of deals and their move lists.
+
+A replay file is the magic bytes, then one record per deal:
+
+    flags       1 byte   bit 0 set if the deal is stored, otherwise its seed;
+                         bits 4-6 the status (index in STATUSES)
+    n_draw      1 byte
+    moves       2 bytes  number of moves, little-endian
+    seed/deal   8 bytes (seed, little-endian) or 52 bytes (deck.shuffled_deal)
+    moves       1 byte per move, its index in ALL_ACTIONS (see action_code)
+
+so a solved deal takes 12 bytes plus one per move, against a kilobyte or
+more as JSON. A writer that is closed properly appends an index of the
+record offsets and a trailer, which gives random access to the records;
+files without one (e.g. from a killed writer) are scanned instead, up to the
+last complete record.
+
+Usage:
+    python replay.py pack results.jsonl results.rply
+    python replay.py verify results.rply
+    python replay.py show results.rply 17
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Self
+
+from compact_game import CompactSolitaireGame
+from deck import is_valid_deal, shuffled_deal
+from solitaire_game import ALL_ACTIONS, GameAction, action_code
+from solver import SolveStatus
+
+MAGIC = b"SOLRPLY\x01"
+_TRAILER_MAGIC = b"SOLRIDX\x01"
+_HEAD = struct.Struct("<BBH")
+_SEED = struct.Struct("<Q")
+# Trailer: number of records, offset of the index, magic
+_TRAILER = struct.Struct("<QQ8s")
+_HAS_DEAL = 0x01
+
+# New statuses go at the end, so that older files keep their meaning
+STATUSES: tuple[SolveStatus, ...] = (
+    "solved",
+    "unsolvable",
+    "node_limit",
+    "time_limit",
+    "exhausted",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class ReplayRecord:
+    # Seed the deal was shuffled with, or None if the deal itself was stored
+    seed: int | None
+    # The stored deal, or None if the seed was stored
+    stored_deal: bytes | None
+    n_draw: int
+    status: SolveStatus
+    # One action code per move
+    codes: bytes
+
+    @property
+    def deal(self) -> bytes:
+        # Shuffled from the seed when asked for, as that is slower than
+        # reading the rest of the record
+        if self.stored_deal is not None:
+            return self.stored_deal
+        return shuffled_deal(self.seed)
+
+    @property
+    def moves(self) -> list[GameAction]:
+        return [ALL_ACTIONS[code] for code in self.codes]
+
+    def new_game(self) -> CompactSolitaireGame:
+        # A game at the start of the deal
+        return CompactSolitaireGame(self.n_draw, deal=self.deal)
+
+
+def encode_record(
+    moves: Sequence[GameAction] | bytes,
+    n_draw: int,
+    *,
+    seed: int | None = None,
+    deal: bytes | None = None,
+    status: SolveStatus = "solved",
+) -> bytes:
+    # Moves can be given as actions or as action codes
+    codes = moves if isinstance(moves, bytes) else bytes(map(action_code, moves))
+    if len(codes) > 0xFFFF:
+        raise ValueError("Too many moves for one record")
+    flags = STATUSES.index(status) << 4
+    if deal is not None:
+        if seed is not None:
+            raise ValueError("Give either a seed or a deal, not both")
+        if not is_valid_deal(deal):
+            raise ValueError("Not a valid deal")
+        return _HEAD.pack(flags | _HAS_DEAL, n_draw, len(codes)) + deal + codes
+    if seed is None or seed < 0:
+        raise ValueError("A seed (0 or more) or a deal is needed")
+    return _HEAD.pack(flags, n_draw, len(codes)) + _SEED.pack(seed) + codes
+
+
+def _record_size(data: bytes | memoryview | mmap.mmap, offset: int) -> int:
+    flags, _, move_count = _HEAD.unpack_from(data, offset)
+    return _HEAD.size + (52 if flags & _HAS_DEAL else _SEED.size) + move_count
+
+
+def decode_record(data: bytes | memoryview | mmap.mmap, offset: int) -> ReplayRecord:
+    flags, n_draw, move_count = _HEAD.unpack_from(data, offset)
+    offset += _HEAD.size
+    if flags & _HAS_DEAL:
+        seed = None
+        deal = bytes(data[offset : offset + 52])
+        offset += 52
+    else:
+        (seed,) = _SEED.unpack_from(data, offset)
+        deal = None
+        offset += _SEED.size
+    status = flags >> 4 & 0x7
+    if status >= len(STATUSES):
+        raise ValueError(f"Unknown status code {status}")
+    return ReplayRecord(
+        seed=seed,
+        stored_deal=deal,
+        n_draw=n_draw,
+        status=STATUSES[status],
+        codes=bytes(data[offset : offset + move_count]),
+    )
+
+
+def _scan(data: bytes | memoryview | mmap.mmap, start: int, end: int) -> list[int]:
+    # Offsets of the complete records between start and end
+    offsets: list[int] = []
+    offset = start
+    while offset + _HEAD.size <= end:
+        size = _record_size(data, offset)
+        if offset + size > end:
+            break
+        offsets.append(offset)
+        offset += size
+    return offsets
+
+
+def _read_index(data: bytes | memoryview | mmap.mmap) -> tuple[list[int], int]:
+    """
+    Returns the record offsets and the end of the records, from the index if
+    the file has one, otherwise by scanning up to the last complete record.
+    """
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError("Not a replay file")
+    size = len(data)
+    if size >= len(MAGIC) + _TRAILER.size:
+        count, index_start, magic = _TRAILER.unpack_from(data, size - _TRAILER.size)
+        if magic == _TRAILER_MAGIC and index_start + 8 * count + _TRAILER.size == size:
+            return list(
+                struct.unpack_from(f"<{count}Q", data, index_start)
+            ), index_start
+    offsets = _scan(data, len(MAGIC), size)
+    end = offsets[-1] + _record_size(data, offsets[-1]) if offsets else len(MAGIC)
+    return offsets, end
+
+
+class ReplayWriter:
+    """
+    Writes records one at a time. close (or leaving the with block) writes
+    the index. With append=True an existing file is continued: its index is
+    read (or rebuilt) and then removed, to be written again on close.
+    """
+
+    def __init__(self, path: str | os.PathLike, append: bool = False) -> None:
+        self.path = Path(path)
+        self.offsets: list[int] = []
+        with ExitStack() as stack:
+            # The file is closed again if its records cannot be read
+            if append and self.path.exists():
+                file = stack.enter_context(open(self.path, "r+b"))
+                self.offsets, end = _read_index(file.read())
+                file.truncate(end)
+                file.seek(end)
+            else:
+                file = stack.enter_context(open(self.path, "wb"))
+                file.write(MAGIC)
+            stack.pop_all()
+        self._file = file
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def write(
+        self,
+        moves: Sequence[GameAction] | bytes,
+        n_draw: int,
+        *,
+        seed: int | None = None,
+        deal: bytes | None = None,
+        status: SolveStatus = "solved",
+    ) -> int:
+        # Appends a record (see encode_record) and returns its index
+        record = encode_record(moves, n_draw, seed=seed, deal=deal, status=status)
+        self.offsets.append(self._file.tell())
+        self._file.write(record)
+        return len(self.offsets) - 1
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        index_start = self._file.tell()
+        offsets = struct.pack(f"<{len(self.offsets)}Q", *self.offsets)
+        self._file.write(offsets)
+        self._file.write(_TRAILER.pack(len(self.offsets), index_start, _TRAILER_MAGIC))
+        self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class ReplayReader:
+    """
+    Reads a replay file through a memory map. Records are decoded when they
+    are read, by position (reader[i]) or in order (iterating the reader).
+    """
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = Path(path)
+        with ExitStack() as stack:
+            # The file and map are closed again if it is not a replay file
+            file = stack.enter_context(open(self.path, "rb"))
+            self._map = stack.enter_context(
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            )
+            self.offsets, _ = _read_index(self._map)
+            stack.pop_all()
+        self._file = file
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> ReplayRecord:
+        return decode_record(self._map, self.offsets[index])
+
+    def __iter__(self) -> Iterator[ReplayRecord]:
+        for offset in self.offsets:
+            yield decode_record(self._map, offset)
+
+    def close(self) -> None:
+        if not self._map.closed:
+            self._map.close()
+            self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def verify_record(record: ReplayRecord) -> bool:
+    """
+    Replays the moves with make_move from the start of the deal. A solved
+    record must end with every card on the foundations; any other record
+    must at least be made of legal moves.
+    """
+    if max(record.codes, default=0) >= len(ALL_ACTIONS):
+        return False
+    game = record.new_game()
+    try:
+        for action in record.moves:
+            game.make_move(action)
+    except ValueError:
+        return False
+    if record.status == "solved":
+        return all(len(f_pile) == 13 for f_pile in game.foundation)
+    return True
+
+
+def verify_file(path: str | os.PathLike) -> list[int]:
+    # Returns the indexes of the records that fail verify_record
+    with ReplayReader(path) as reader:
+        return [i for i, record in enumerate(reader) if not verify_record(record)]
+
+
+def pack_records(records: Iterable[dict], path: str | os.PathLike) -> int:
+    """
+    Writes batch.py result records (with seed, n_draw, status and moves) to
+    a replay file and returns how many were written.
+    """
+    with ReplayWriter(path) as writer:
+        for record in records:
+            writer.write(
+                [(kind, tuple(args)) for kind, args in record["moves"]],
+                record["n_draw"],
+                seed=record["seed"],
+                status=record["status"],
+            )
+        return len(writer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack, check and show replay files")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="convert batch.py JSON lines results")
+    pack.add_argument("results")
+    pack.add_argument("output")
+    verify = commands.add_parser("verify", help="replay every record")
+    verify.add_argument("replay")
+    show = commands.add_parser("show", help="print one record")
+    show.add_argument("replay")
+    show.add_argument("index", type=int)
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        with open(args.results) as f:
+            count = pack_records(
+                (json.loads(line) for line in f if line.strip()), args.output
+            )
+        print(f"{count} records, {os.path.getsize(args.output):,} bytes")
+    elif args.command == "verify":
+        bad = verify_file(args.replay)
+        for index in bad:
+            print(f"record {index} does not replay")
+        if bad:
+            sys.exit(1)
+        print("all records replay")
+    else:
+        with ReplayReader(args.replay) as reader:
+            record = reader[args.index]
+        source = "deal" if record.seed is None else f"seed {record.seed}"
+        print(f"{source}, draw {record.n_draw}, {record.status}")
+        game = record.new_game()
+        print(game)
+        for action in record.moves:
+            print(action)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Monte Carlo playouts: games played out from a position with random or
+greedy moves, to estimate how likely it is to be won.
+
+This engine falls well short of the tens of thousands of playouts per second
+per core that Monte Carlo search usually relies on. On one core it manages
+about 300 playouts/s for draw 1 and 700-2,000 for draw 3, some 35k moves/s
+(see python bench.py --only rollouts), and most of that time goes in
+get_valid_moves. parallel_rollouts spreads the playouts over all cores.
+"""
+
+import multiprocessing
+import random
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Self
+
+from move_policy import MovePolicy
+from solitaire_game import GameAction, SolitaireGame
+
+# Picks the next move of a playout, or None if there is no move to make
+type RolloutPolicy = Callable[[SolitaireGame, random.Random], GameAction | None]
+
+# A playout is a guess anyway, so it also drops the unproductive moves
+_ORDERED = MovePolicy(drop_unproductive=True)
+
+
+def random_policy(game: SolitaireGame, rng: random.Random) -> GameAction | None:
+    # Any valid move, uniformly at random
+    moves = game.get_valid_moves()
+    return rng.choice(moves) if moves else None
+
+
+def greedy_policy(game: SolitaireGame, rng: random.Random) -> GameAction | None:
+    """
+    A random move from MovePolicy's pruned and ordered moves, strongly biased
+    towards the front of the list: safe foundation moves are always played,
+    otherwise the best move is picked about half of the time.
+    """
+    moves = _ORDERED.moves(game)
+    if not moves:
+        return None
+    return moves[int(len(moves) * rng.random() ** 3)]
+
+
+@dataclass(slots=True)
+class RolloutStats:
+    playouts: int = 0
+    wins: int = 0
+    # Moves played, over all playouts
+    total_depth: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.playouts if self.playouts else 0.0
+
+    @property
+    def average_depth(self) -> float:
+        return self.total_depth / self.playouts if self.playouts else 0.0
+
+    @property
+    def playouts_per_second(self) -> float:
+        return self.playouts / self.elapsed if self.elapsed else 0.0
+
+    def merge(self, other: Self) -> None:
+        # Adds the playouts of `other`, which ran alongside these ones
+        self.playouts += other.playouts
+        self.wins += other.wins
+        self.total_depth += other.total_depth
+        self.elapsed = max(self.elapsed, other.elapsed)
+
+
+def playout(
+    game: SolitaireGame,
+    policy: RolloutPolicy = greedy_policy,
+    rng: random.Random | None = None,
+    max_moves: int = 1000,
+    max_idle: int = 30,
+) -> tuple[bool, int]:
+    """
+    Plays moves chosen by `policy` from the current position until the game
+    is won or stalls, and returns (won, moves played). The game is left in
+    the final position.
+
+    Each move only checks whether all 52 cards are on the foundations. The
+    exact is_auto_solvable search runs once, when the playout stalls, so a
+    playout that stops short in a position that finishes by itself still
+    counts as won.
+
+    A playout has stalled when it has no moves, when the waste is recycled
+    into the stock without any progress since the last recycle (so drawing
+    would only go round the same cards), after max_idle moves other than
+    draws in a row without progress, or after max_moves moves. Progress means
+    a new best for the playout in one of: cards on the foundations, cards
+    left in the stock and waste, or face-down cards, so moving a card down
+    from the foundations and back up again is not progress.
+    """
+    rng = rng or random.Random()
+    to_win = 52 - sum(map(len, game.foundation))
+    # Changes since the start of the playout, and the best reached so far
+    foundation = best_foundation = 0
+    stock_waste = best_stock_waste = 0
+    face_down = best_face_down = 0
+    progress = True
+    idle = 0
+    for depth in range(max_moves):
+        if foundation == to_win:
+            return True, depth
+        action = policy(game, rng)
+        if action is None:
+            return game.is_auto_solvable(), depth
+
+        _, _, flag, _ = game.make_move(action)
+        kind = action[0]
+        if kind == "s":
+            if flag:
+                # the waste was recycled
+                if not progress:
+                    return game.is_auto_solvable(), depth + 1
+                progress = False
+            continue
+
+        if kind == "wf":
+            foundation += 1
+            stock_waste -= 1
+        elif kind == "wt":
+            stock_waste -= 1
+        elif kind == "tf":
+            foundation += 1
+        elif kind == "ft":
+            foundation -= 1
+        if kind in ("tf", "tt") and flag:
+            face_down -= 1
+
+        if (
+            foundation > best_foundation
+            or stock_waste < best_stock_waste
+            or face_down < best_face_down
+        ):
+            best_foundation = max(best_foundation, foundation)
+            best_stock_waste = min(best_stock_waste, stock_waste)
+            best_face_down = min(best_face_down, face_down)
+            progress = True
+            idle = 0
+        else:
+            idle += 1
+            if idle > max_idle:
+                return game.is_auto_solvable(), depth + 1
+    return game.is_auto_solvable(), max_moves
+
+
+def rollouts(
+    state: bytes,
+    count: int,
+    *,
+    n_draw: int = 3,
+    policy: RolloutPolicy = greedy_policy,
+    seed: int | None = None,
+    max_moves: int = 1000,
+    game: SolitaireGame | None = None,
+) -> RolloutStats:
+    """
+    Runs `count` playouts from a position given as get_game_state bytes. One
+    game is reused for all of them, reset to the position with
+    set_game_state before each playout, so nothing is copied per playout.
+    A `game` passed in must be dealt with the same n_draw.
+    """
+    if game is not None and game.n_draw != n_draw:
+        raise ValueError(f"game draws {game.n_draw} cards but n_draw is {n_draw}")
+    start_time = time.perf_counter()
+    game = game or SolitaireGame.from_state(state, n_draw)
+    rng = random.Random(seed)
+    stats = RolloutStats()
+    for _ in range(count):
+        game.set_game_state(state)
+        won, depth = playout(game, policy, rng, max_moves)
+        stats.playouts += 1
+        stats.wins += won
+        stats.total_depth += depth
+    stats.elapsed = time.perf_counter() - start_time
+    return stats
+
+
+def _rollouts_task(
+    task: tuple[bytes, int, int, RolloutPolicy, int | None, int],
+) -> RolloutStats:
+    state, count, n_draw, policy, seed, max_moves = task
+    return rollouts(
+        state, count, n_draw=n_draw, policy=policy, seed=seed, max_moves=max_moves
+    )
+
+
+def parallel_rollouts(
+    state: bytes,
+    count: int,
+    *,
+    n_draw: int = 3,
+    policy: RolloutPolicy = greedy_policy,
+    seed: int | None = None,
+    max_moves: int = 1000,
+    workers: int | None = None,
+) -> RolloutStats:
+    """
+    rollouts split across a pool of `workers` processes (all cores by
+    default). Each worker gets its own seed derived from `seed`, so a seeded
+    run is repeatable for a given number of workers. The policy must be a
+    module-level function so that it can be sent to the workers.
+    """
+    start_time = time.perf_counter()
+    workers = workers or multiprocessing.cpu_count()
+    seeds = random.Random(seed).sample(range(1 << 30), workers)
+    tasks = [
+        (state, count // workers + (i < count % workers), n_draw, policy, s, max_moves)
+        for i, s in enumerate(seeds)
+    ]
+    stats = RolloutStats()
+    with multiprocessing.Pool(workers) as pool:
+        for worker_stats in pool.imap_unordered(_rollouts_task, tasks):
+            stats.merge(worker_stats)
+    stats.elapsed = time.perf_counter() - start_time
+    return stats
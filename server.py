@@ -0,0 +1,475 @@
+"""
+Asyncio server that hosts many solitaire games in one process.
+
+Clients talk to it over TCP or a Unix socket, one JSON object per line each
+way. Every request has an "op" and may have an "id", which is copied into
+the response; responses have "ok", and "error" when it is false:
+
+    {"op": "new", "n_draw": 3, "seed": 7}         -> {"session": 1, "board": ...}
+    {"op": "move", "session": 1, "command": "tt 2 5"}    -> {"won": false}
+    {"op": "moves", "session": 1}                 -> {"moves": ["tt 2 5", "s"]}
+    {"op": "show", "session": 1}                  -> {"board": ..., "state": hex}
+    {"op": "hint", "session": 1}                  -> {"hint": "tt 2 5", ...}
+    {"op": "solve", "session": 1}                 -> {"status": ..., "moves": [...]}
+    {"op": "close", "session": 1}
+    {"op": "stats"}                               -> sessions, latency percentiles
+
+Commands are those of solitaire_game.main: s, wf, wt <T>, tf <T>, ft <F> <T>
+and tt <F> <T>, with piles numbered from 1. n_draw is 1, 2 or 3, and a
+request line longer than the stream limit (64 KiB) is skipped and answered
+with an error.
+
+Only up to max_live_games sessions have a SolitaireGame at a time. The
+games are pooled: when another session needs one, the least recently used
+game is saved as its get_game_state bytes and loaded with the other
+session's state, so an idle session costs only its state. Hints and solves
+run in a process pool, so a long solve never holds up other requests. The
+winning lines they find are remembered by a hints.HintEngine for each
+n_draw, shared by all sessions, so most hints and solves during a game are
+answered from it without searching ("cached" in the response).
+
+Usage:
+    python server.py --port 7531
+    python server.py --unix /tmp/solitaire.sock
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from compact_game import CompactSolitaireGame
+from hints import HintEngine
+from solitaire_game import (
+    ALL_ACTIONS,
+    EMPTY_STATE,
+    GameAction,
+    SolitaireGame,
+    action_code,
+)
+from solver import SolveStatus
+
+DEFAULT_PORT = 7531
+
+# Number of pile numbers each command takes
+_ARG_COUNTS = {"s": 0, "wf": 0, "wt": 1, "tf": 1, "ft": 2, "tt": 2}
+_USAGE = {
+    "wt": "wt <tableau_index>",
+    "tf": "tf <tableau_index>",
+    "ft": "ft <foundation_index> <tableau_index>",
+    "tt": "tt <from_index> <to_index>",
+}
+
+
+def parse_command(command: str) -> GameAction:
+    # A command as typed in solitaire_game.main, e.g. "wt 3", as an action
+    # (for "tt", without the number of cards). Anything but a string is an
+    # unknown command.
+    parts = command.strip().lower().split() if isinstance(command, str) else []
+    if not parts or parts[0] not in _ARG_COUNTS:
+        raise ValueError("Unknown command")
+    kind, args = parts[0], parts[1:]
+    if len(args) != _ARG_COUNTS[kind]:
+        raise ValueError(f"Usage: {_USAGE[kind]}")
+    return kind, tuple(int(arg) - 1 for arg in args)
+
+
+def format_action(action: GameAction) -> str:
+    kind, args = action
+    if kind == "tt":
+        args = args[:2]
+    return " ".join([kind, *(str(arg + 1) for arg in args)])
+
+
+def percentile(values: list[float], percent: float) -> float:
+    # Nearest-rank percentile of sorted values
+    rank = max(1, min(len(values), math.ceil(percent / 100 * len(values))))
+    return values[rank - 1]
+
+
+async def _read_request(reader: asyncio.StreamReader) -> bytes | None:
+    """
+    The next line from `reader` (b"" at the end of the stream), or None if
+    it is longer than the reader's limit, in which case the whole line is
+    skipped.
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    while True:
+        try:
+            await reader.readexactly(consumed)
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+
+
+class LatencyStats:
+    """
+    Time taken by each kind of request, keeping the last `samples` of each.
+    """
+
+    def __init__(self, samples: int = 10_000) -> None:
+        self.samples = samples
+        self.counts: dict[str, int] = {}
+        self._times: dict[str, deque[float]] = {}
+
+    def record(self, op: str, seconds: float) -> None:
+        if op not in self._times:
+            self._times[op] = deque(maxlen=self.samples)
+            self.counts[op] = 0
+        self._times[op].append(seconds)
+        self.counts[op] += 1
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        # Request count and p50/p90/p99 latency in milliseconds, by op
+        result = {}
+        for op, times in self._times.items():
+            ordered = sorted(times)
+            result[op] = {"count": self.counts[op]} | {
+                f"p{percent}_ms": round(percentile(ordered, percent) * 1e3, 3)
+                for percent in (50, 90, 99)
+            }
+        return result
+
+
+class SessionStore:
+    """
+    Sessions by id, each either live (holding one of at most max_live
+    pooled games) or saved as its state bytes.
+    """
+
+    def __init__(self, max_live: int = 1000, max_sessions: int = 1_000_000) -> None:
+        self.max_live = max_live
+        self.max_sessions = max_sessions
+        self.n_draws: dict[int, int] = {}
+        self._saved: dict[int, bytes] = {}
+        # Live sessions, least recently used first
+        self._live: OrderedDict[int, SolitaireGame] = OrderedDict()
+        self._free: list[SolitaireGame] = []
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self.n_draws)
+
+    @property
+    def live(self) -> int:
+        return len(self._live)
+
+    def _take_game(self) -> SolitaireGame:
+        # A game to load a session into: a free one, a new one while there
+        # are fewer than max_live, or the least recently used one, saved
+        if self._free:
+            return self._free.pop()
+        if len(self._live) < self.max_live:
+            return SolitaireGame.from_state(EMPTY_STATE)
+        session, game = self._live.popitem(last=False)
+        self._saved[session] = game.get_game_state()
+        return game
+
+    def create(self, n_draw: int = 3, seed: int | None = None) -> int:
+        if len(self.n_draws) >= self.max_sessions:
+            raise ValueError("Too many sessions")
+        game = self._take_game()
+        game.n_draw = n_draw
+        game.reset_game(seed)
+        session = self._next_id
+        self._next_id += 1
+        self.n_draws[session] = n_draw
+        self._live[session] = game
+        return session
+
+    def game(self, session: int) -> SolitaireGame:
+        # The session's game, loaded into a pooled game if it was saved
+        game = self._live.get(session)
+        if game is not None:
+            self._live.move_to_end(session)
+            return game
+        if session not in self._saved:
+            raise ValueError("No such session")
+        game = self._take_game()
+        game.n_draw = self.n_draws[session]
+        game.set_game_state(self._saved.pop(session))
+        self._live[session] = game
+        return game
+
+    def state(self, session: int) -> bytes:
+        # The session's state, without loading it
+        if session in self._saved:
+            return self._saved[session]
+        return self.game(session).get_game_state()
+
+    def close(self, session: int) -> None:
+        if session not in self.n_draws:
+            raise ValueError("No such session")
+        del self.n_draws[session]
+        if session in self._saved:
+            del self._saved[session]
+        else:
+            self._free.append(self._live.pop(session))
+
+
+@dataclass(frozen=True, slots=True)
+class ServerConfig:
+    max_live_games: int = 1000
+    max_sessions: int = 1_000_000
+    # Processes for hints and solves (all cores by default)
+    solver_workers: int | None = None
+    max_nodes: int = 200_000
+    hint_time_limit: float = 2.0
+    solve_time_limit: float = 30.0
+    latency_samples: int = 10_000
+
+
+# Set up in each solver process on first use
+_worker_game: CompactSolitaireGame | None = None
+_worker_engines: dict[int, HintEngine] = {}
+
+
+def _solve_state(
+    state: bytes, n_draw: int, max_nodes: int, time_limit: float
+) -> tuple[SolveStatus, bytes]:
+    # Runs in the process pool: returns the status and the winning line as
+    # action codes
+    global _worker_game
+    if _worker_game is None:
+        _worker_game = CompactSolitaireGame(n_draw, track_hash=True)
+    engine = _worker_engines.get(n_draw)
+    if engine is None:
+        engine = _worker_engines[n_draw] = HintEngine(n_draw, max_nodes=max_nodes)
+    game = _worker_game
+    game.n_draw = n_draw
+    game.set_game_state(state)
+    hint = engine.hint(game, time_limit)
+    moves = (engine.line(game) or []) if hint.status == "solved" else []
+    return hint.status, bytes(map(action_code, moves))
+
+
+class GameServer:
+    """
+    Serves the protocol of the module docstring. Requests on one connection
+    are answered in order; each connection waits for its own hints and
+    solves, while other connections carry on.
+    """
+
+    def __init__(self, config: ServerConfig | None = None) -> None:
+        if config is None:
+            config = ServerConfig()
+        self.config = config
+        self.sessions = SessionStore(config.max_live_games, config.max_sessions)
+        self.latency = LatencyStats(config.latency_samples)
+        self.pool = ProcessPoolExecutor(config.solver_workers)
+        # Remember the lines found in the pool; they are learned on
+        # _scratch, so that the session games are not touched
+        self.hints: dict[int, HintEngine] = {}
+        self.hint_searches = 0
+        self._scratch = CompactSolitaireGame(track_hash=True)
+        self._ops = {
+            "new": self._new,
+            "move": self._move,
+            "moves": self._moves,
+            "show": self._show,
+            "hint": self._hint,
+            "solve": self._solve,
+            "close": self._close,
+            "stats": self._stats,
+        }
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while (line := await _read_request(reader)) != b"":
+                start = time.perf_counter()
+                if line is None:
+                    response, op = {"ok": False, "error": "Request too long"}, "invalid"
+                else:
+                    response, op = await self._respond(line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+                self.latency.record(op, time.perf_counter() - start)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, line: bytes) -> tuple[dict, str]:
+        # The response to one request line, and its op for the latency stats
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = None
+        if not isinstance(request, dict) or "op" not in request:
+            return {"ok": False, "error": "Not a valid request"}, "invalid"
+        op = request["op"]
+        response = {"id": request["id"]} if "id" in request else {}
+        # Requests with a bad op are counted together in the latency stats
+        name = op if isinstance(op, str) and op in self._ops else "invalid"
+        try:
+            if name == "invalid":
+                raise ValueError(f"Unknown op {op!r}")
+            return response | {"ok": True} | await self._ops[op](request), op
+        except (ValueError, TypeError) as e:
+            return response | {"ok": False, "error": str(e)}, name
+        except KeyError as e:
+            return response | {"ok": False, "error": f"Missing {e}"}, name
+
+    async def _new(self, request: dict) -> dict:
+        n_draw = int(request.get("n_draw", 3))
+        if not 1 <= n_draw <= 3:
+            raise ValueError("n_draw must be 1, 2 or 3")
+        seed = request.get("seed")
+        session = self.sessions.create(n_draw, None if seed is None else int(seed))
+        return {"session": session, "board": str(self.sessions.game(session))}
+
+    async def _move(self, request: dict) -> dict:
+        game = self.sessions.game(request["session"])
+        kind, args = parse_command(request["command"])
+        for action in game.get_valid_moves():
+            if action[0] == kind and action[1][:2] == args:
+                game.make_move(action)
+                return {"won": game.is_game_won()}
+        raise ValueError("Not a valid move")
+
+    async def _moves(self, request: dict) -> dict:
+        game = self.sessions.game(request["session"])
+        return {"moves": [format_action(action) for action in game.get_valid_moves()]}
+
+    async def _show(self, request: dict) -> dict:
+        game = self.sessions.game(request["session"])
+        return {"board": str(game), "state": game.get_game_state().hex()}
+
+    def _engine(self, session: int) -> HintEngine:
+        n_draw = self.sessions.n_draws[session]
+        engine = self.hints.get(n_draw)
+        if engine is None:
+            engine = self.hints[n_draw] = HintEngine(n_draw, dead_ends=False)
+        return engine
+
+    async def _run_solver(
+        self, session: int, time_limit: float
+    ) -> tuple[SolveStatus, list[GameAction]]:
+        # Searches in the pool, and remembers the winning line it finds
+        state = self.sessions.state(session)
+        n_draw = self.sessions.n_draws[session]
+        self.hint_searches += 1
+        status, codes = await asyncio.get_running_loop().run_in_executor(
+            self.pool, _solve_state, state, n_draw, self.config.max_nodes, time_limit
+        )
+        moves = [ALL_ACTIONS[code] for code in codes]
+        if moves:
+            self._scratch.n_draw = n_draw
+            self._scratch.set_game_state(state)
+            self.hints[n_draw].learn(self._scratch, moves)
+        return status, moves
+
+    async def _hint(self, request: dict) -> dict:
+        # The first move of a winning line, or None if none was found
+        session = request["session"]
+        game = self.sessions.game(session)
+        hint = self._engine(session).lookup(game)
+        if hint is not None:
+            action = None if hint.action is None else format_action(hint.action)
+            return {"hint": action, "status": hint.status, "cached": True}
+        status, moves = await self._run_solver(session, self.config.hint_time_limit)
+        hint = format_action(moves[0]) if moves else None
+        return {"hint": hint, "status": status, "cached": False}
+
+    async def _solve(self, request: dict) -> dict:
+        session = request["session"]
+        game = self.sessions.game(session)
+        moves = self._engine(session).line(game)
+        if moves is not None:
+            status, cached = "solved", True
+        else:
+            status, moves = await self._run_solver(
+                session, self.config.solve_time_limit
+            )
+            cached = False
+        return {
+            "status": status,
+            "moves": [format_action(action) for action in moves],
+            "cached": cached,
+        }
+
+    async def _close(self, request: dict) -> dict:
+        self.sessions.close(request["session"])
+        return {}
+
+    async def _stats(self, request: dict) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "live_games": self.sessions.live,
+            "hints": {
+                "cached": sum(engine.hits for engine in self.hints.values()),
+                "searched": self.hint_searches,
+            },
+            "latency": self.latency.summary(),
+        }
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(cancel_futures=True)
+
+
+async def serve(
+    server: GameServer,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    unix_path: str | None = None,
+) -> None:
+    # Serves until cancelled, on the Unix socket if unix_path is given
+    if unix_path is not None:
+        listener = await asyncio.start_unix_server(server.handle, unix_path)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    defaults = ServerConfig()
+    parser = argparse.ArgumentParser(
+        description="Serve solitaire games over JSON lines"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="listen on this Unix socket instead")
+    parser.add_argument("--live-games", type=int, default=defaults.max_live_games)
+    parser.add_argument("--workers", type=int, default=None, help="solver processes")
+    parser.add_argument("--max-nodes", type=int, default=defaults.max_nodes)
+    args = parser.parse_args()
+
+    server = GameServer(
+        ServerConfig(
+            max_live_games=args.live_games,
+            solver_workers=args.workers,
+            max_nodes=args.max_nodes,
+        )
+    )
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"serving on {where}", file=sys.stderr)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+        print(json.dumps(server.latency.summary(), indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
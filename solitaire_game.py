@@ -1,6 +1,19 @@
-from typing import Literal
-
-from deck import BLANK, Card, Deck
+import random
+from collections.abc import Sequence
+from typing import Literal, Self
+from warnings import deprecated
+
+from deck import (
+    BLANK,
+    CARD_CODES,
+    CARD_FROM_CODE,
+    CARDS,
+    TABLEAU_ENTRY_FROM_CODE,
+    Card,
+    Deck,
+    is_valid_deal,
+    shuffled_deal,
+)
 
 type GameAction = (
     tuple[Literal["s"], tuple[()]]
@@ -9,35 +22,328 @@ type GameAction = (
     | tuple[Literal["tf"], tuple[int]]
     | tuple[Literal["ft"], tuple[int, int]]
     | tuple[Literal["tt"], tuple[int, int]]
+    # get_valid_moves also gives the number of cards a tableau move takes
+    | tuple[Literal["tt"], tuple[int, int, int]]
 )
 
+# Every distinct action in a fixed order, so that an action can be stored as a
+# single byte (its index in this list) instead of a tuple
+ALL_ACTIONS: list[GameAction] = [
+    ("s", ()),
+    ("wf", ()),
+    *[("wt", (t_idx,)) for t_idx in range(7)],
+    *[("tf", (t_idx,)) for t_idx in range(7)],
+    *[("ft", (f_idx, t_idx)) for f_idx in range(4) for t_idx in range(7)],
+    *[
+        ("tt", (from_idx, to_idx))
+        for from_idx in range(7)
+        for to_idx in range(7)
+        if from_idx != to_idx
+    ],
+]
+ACTION_CODES: dict[GameAction, int] = {
+    action: code for code, action in enumerate(ALL_ACTIONS)
+}
+
+
+def action_code(action: GameAction) -> int:
+    # The number of cards in a "tt" action is implied by the position, so it
+    # is dropped; decoding gives the equivalent ("tt", (from, to)) action
+    if action[0] == "tt":
+        return ACTION_CODES[("tt", action[1][:2])]  # ty: ignore[index-out-of-bounds]
+    return ACTION_CODES[action]
+
+
+# The state of a board without any cards, for games that are set up later
+EMPTY_STATE = bytes(13)
+
+# What make_move needs to remember so that unmake_move can take the move back:
+# (action, count, flag), where count/flag are
+# - "s": number of cards drawn, whether the waste was recycled into the stock
+# - "wf" / "tf": foundation index the card went to, whether a tableau card was
+#   flipped face up ("tf" only)
+# - "tt": number of cards moved, whether a tableau card was flipped face up
+# - "wt" / "ft": unused (0, False)
+# followed by the state hash from before the move (0 if hashes are not tracked)
+type MoveRecord = tuple[GameAction, int, bool, int]
+
+# Whether each suit is red, indexed by Card.suit
+_IS_RED = (False, True, False, True, False)
+
+# Zobrist keys: one random 64-bit key per (pile, position, card code), XORed
+# together to give the state hash. The generator is seeded so that hashes are
+# stable between runs.
+_zobrist_rng = random.Random(0x501174)
+
+
+def _zobrist_keys(positions: int, codes: int) -> list[list[int]]:
+    return [
+        [_zobrist_rng.getrandbits(64) for _ in range(codes)] for _ in range(positions)
+    ]
+
+
+_Z_STOCK = _zobrist_keys(24, 64)
+_Z_WASTE = _zobrist_keys(24, 64)
+_Z_FOUNDATION = _zobrist_keys(4, 14)
+# A tableau pile holds at most 6 face-down cards plus a King-to-Ace run
+_Z_TABLEAU = [_zobrist_keys(19, 128) for _ in range(7)]
+
+
+# The code of a card (see deck.CARD_CODES)
+_card_code = CARD_CODES.__getitem__
+
+
+def _canonical_pile_key(pile_data: bytes) -> tuple[bool, bytes]:
+    # Non-empty piles in byte order, then all the empty piles
+    return pile_data[0] == 0, pile_data
+
+
+def map_action_piles(action: GameAction, pile_order: list[int]) -> GameAction:
+    """
+    Translates an action on the canonical board (see canonical_pile_order) to
+    the same action on the real board, where canonical tableau pile i is real
+    pile pile_order[i].
+    """
+    if action[0] == "wt":
+        return "wt", (pile_order[action[1][0]],)  # ty: ignore[index-out-of-bounds]
+    elif action[0] == "tf":
+        return "tf", (pile_order[action[1][0]],)  # ty: ignore[index-out-of-bounds]
+    elif action[0] == "ft":
+        return "ft", (action[1][0], pile_order[action[1][1]])  # ty: ignore[index-out-of-bounds]
+    elif action[0] == "tt":
+        from_idx, to_idx, *num_cards = action[1]  # ty: ignore[not-iterable]
+        return "tt", (pile_order[from_idx], pile_order[to_idx], *num_cards)  # ty: ignore[invalid-return-type]
+    return action
+
+
+def _piles_in_order(piles: Sequence[Sequence[int]]) -> bool:
+    # Every suit has to come off each pile lowest rank first, so a card on
+    # top of a lower card of its own suit can never be played. Within a suit
+    # a lower code is a lower rank. The last piles have the most cards, so
+    # they are checked first.
+    for pile in reversed(piles):
+        lowest = [0x0F, 0x1F, 0x2F, 0x3F]
+        for code in pile:
+            code &= 0x3F
+            if code > lowest[code >> 4]:
+                return False
+            lowest[code >> 4] = code
+    return True
+
+
+def _auto_finish(
+    piles: Sequence[Sequence[int]],
+    foundation_counts: Sequence[int],
+    stock: Sequence[int],
+    waste: Sequence[int],
+    n_draw: int,
+) -> list[GameAction] | None:
+    """
+    The moves that play every remaining card to the foundations using only
+    "tf", "wf" and "s" moves, or None if there are none. Cards are given as
+    codes (tableau codes may have the face-up bit set), piles bottom card
+    first.
+
+    Playing a tableau card to the foundations never gets in the way of
+    anything else, so those are always made first. Playing from the waste
+    changes which cards later draws turn up, so that is searched both ways.
+    Once the tableau is in order, a position is fixed by the foundation
+    counts and the size of the waste, so each is only searched once.
+    """
+    if not _piles_in_order(piles):
+        return None
+
+    moves: list[GameAction] = []
+    if _finish(
+        [[code & 0x3F for code in pile] for pile in piles],
+        [len(pile) for pile in piles],
+        list(foundation_counts),
+        list(stock),
+        list(waste),
+        n_draw,
+        moves,
+        set(),
+    ):
+        return moves
+    return None
+
+
+def _finish(
+    piles: list[list[int]],
+    heights: list[int],
+    counts: list[int],
+    stock: list[int],
+    waste: list[int],
+    n_draw: int,
+    moves: list[GameAction],
+    seen: set[tuple[int, ...]],
+) -> bool:
+    # Depth-first search for _auto_finish. heights, counts, stock and waste
+    # are changed in place; on success the line is added to moves.
+    start = len(moves)
+    changed = True
+    while True:
+        played = True
+        while played:
+            played = False
+            for t_idx, pile in enumerate(piles):
+                height = heights[t_idx]
+                if height and pile[height - 1] & 0xF == counts[pile[height - 1] >> 4]:
+                    counts[pile[height - 1] >> 4] += 1
+                    heights[t_idx] = height - 1
+                    moves.append(("tf", (t_idx,)))
+                    played = changed = True
+        if not (stock or waste):
+            if sum(counts) == 52:
+                return True
+            break
+        if changed:
+            # Only drawing is left, which is no use unless a card the
+            # foundations take is somewhere in the stock or waste
+            changed = False
+            if not any(
+                suit << 4 | count in stock or suit << 4 | count in waste
+                for suit, count in enumerate(counts)
+            ):
+                break
+
+        key = (*counts, len(waste))
+        if key in seen:
+            break
+        seen.add(key)
+
+        card = waste[-1] if waste else -1
+        if waste and card & 0xF == counts[card >> 4]:
+            moves.append(("wf", ()))
+            after = counts.copy()
+            after[card >> 4] += 1
+            if _finish(
+                piles,
+                heights.copy(),
+                after,
+                stock.copy(),
+                waste[:-1],
+                n_draw,
+                moves,
+                seen,
+            ):
+                return True
+            moves.pop()
+
+        if not stock:
+            stock[:] = waste[::-1]
+            waste.clear()
+        for _ in range(n_draw):
+            if stock:
+                waste.append(stock.pop())
+        moves.append(("s", ()))
+
+    del moves[start:]
+    return False
+
 
 class SolitaireGame:
-    def __init__(self, n_draw: int = 3) -> None:
+    def __init__(
+        self,
+        n_draw: int = 3,
+        track_hash: bool = False,
+        seed: int | None = None,
+        deal: bytes | None = None,
+    ) -> None:
         # number of cards to draw from the stock at a time
         self.n_draw = n_draw
+        # when set, a Zobrist hash of the state is kept up to date by every move
+        self._track_hash = track_hash
+        self._hash = 0
 
-        self.deck = Deck()
         self.tableau: list[list[tuple[Card, bool]]] = [[] for _ in range(7)]
         self.foundation: list[list[Card]] = [[] for _ in range(4)]
         self.stock: list[Card] = []
         self.waste: list[Card] = []
+        # the deal this game was dealt from (see deck.shuffled_deal)
+        self.deal = b""
 
-        self.setup_game()
+        if seed is not None and deal is not None:
+            raise ValueError("Give either a seed or a deal, not both")
+        self.setup_game(shuffled_deal(seed) if deal is None else deal)
 
-    def setup_game(self) -> None:
-        self.deck.shuffle()
+    @classmethod
+    def from_state(
+        cls, state: bytes, n_draw: int = 3, track_hash: bool = False
+    ) -> Self:
+        """
+        A game in the position given as get_game_state bytes. Unlike creating
+        a game and calling set_game_state, nothing is dealt first. The deal
+        the position came from is not known, so deal is empty.
+        """
+        game = cls.__new__(cls)
+        game.n_draw = n_draw
+        game._track_hash = track_hash
+        game._hash = 0
+        game.deal = b""
+        game.set_game_state(state)
+        return game
+
+    def clone(self) -> Self:
+        # A copy of the game in the same position, made by copying the piles;
+        # the cards themselves are shared, as they never change
+        game = self.__class__.__new__(self.__class__)
+        game.n_draw = self.n_draw
+        game._track_hash = self._track_hash
+        game._hash = self._hash
+        game.tableau = [t_pile.copy() for t_pile in self.tableau]
+        game.foundation = [f_pile.copy() for f_pile in self.foundation]
+        game.stock = self.stock.copy()
+        game.waste = self.waste.copy()
+        game.deal = self.deal
+        return game
+
+    def copy_from(self, other: Self) -> None:
+        # Puts this game in the position of `other`, reusing its own piles
+        self.n_draw = other.n_draw
+        self._track_hash = other._track_hash
+        self._hash = other._hash
+        for t_pile, other_pile in zip(self.tableau, other.tableau):
+            t_pile[:] = other_pile
+        for f_pile, other_pile in zip(self.foundation, other.foundation):
+            f_pile[:] = other_pile
+        self.stock[:] = other.stock
+        self.waste[:] = other.waste
+        self.deal = other.deal
+
+    @property
+    @deprecated("SolitaireGame.deck is always empty; use deal instead")
+    def deck(self) -> Deck:
+        # The deck the cards were drawn from, which is empty once they are
+        # dealt, as the attribute of that name used to be. The deck they were
+        # dealt from is Deck.from_permutation(game.deal).
+        deck = Deck()
+        deck.cards.clear()
+        return deck
+
+    def setup_game(self, deal: bytes | None = None) -> None:
+        # Deals the given deal onto an empty board, or a random one if not given
+        if deal is None:
+            deal = shuffled_deal()
+        elif not is_valid_deal(deal):
+            raise ValueError("A deal must contain each of the 52 card codes once")
+        self.deal = bytes(deal)
+        cards = [CARD_FROM_CODE[code] for code in deal]
+
+        # Cards are dealt from the end of the deck, one round at a time
+        idx = 51
         for i in range(7):
             for j in range(i, 7):
-                card = self.deck.draw()
-                # self.tableau[j].append(card)
                 # we store a tuple of (Card, is_face_up)
                 is_face_up = i == j  # only the top card is face up
-                self.tableau[j].append((card, is_face_up))
+                self.tableau[j].append((cards[idx], is_face_up))
+                idx -= 1
+
+        # The remaining cards go into the stock, the first card of the deck on top
+        self.stock = cards[23::-1]
 
-        # Draw the remaining cards into the stock
-        while not self.deck.is_empty():
-            self.stock.append(self.deck.draw())
+        if self._track_hash:
+            self._hash = self._compute_hash()
 
     def __str__(self) -> str:
         result = "Tableau:\n"
@@ -65,7 +371,8 @@ class SolitaireGame:
 
     # Game logic and movement methods:
 
-    def move_tableau_to_foundation(self, tableau_index: int) -> None:
+    def move_tableau_to_foundation(self, tableau_index: int) -> bool:
+        # Returns whether a face-down card was turned face up
         if not self.tableau[tableau_index]:
             raise ValueError("No cards in the selected tableau pile")
         card, _ = self.tableau[tableau_index][-1]
@@ -73,53 +380,109 @@ class SolitaireGame:
         if (not foundation_pile and card.rank == 1) or (
             foundation_pile and card.rank == foundation_pile[-1].rank + 1
         ):
-            self.tableau[tableau_index].pop()
+            t_pile = self.tableau[tableau_index]
+            t_pile.pop()
             foundation_pile.append(card)
-            if self.tableau[tableau_index]:
-                new_top_card, _ = self.tableau[tableau_index][-1]
-                self.tableau[tableau_index][-1] = (new_top_card, True)
+            if self._track_hash:
+                code = _card_code(card)
+                z_found = _Z_FOUNDATION[card.suit - 1]
+                self._hash ^= (
+                    _Z_TABLEAU[tableau_index][len(t_pile)][code | 0x40]
+                    ^ z_found[card.rank - 1]
+                    ^ z_found[card.rank]
+                )
+            if t_pile:
+                new_top_card, was_face_up = t_pile[-1]
+                t_pile[-1] = (new_top_card, True)
+                if self._track_hash and not was_face_up:
+                    self._hash ^= self._flip_key(tableau_index, new_top_card)
+                return not was_face_up
+            return False
         else:
             raise ValueError("Invalid move to foundation")
 
-    def move_tableau_to_tableau(self, from_index: int, to_index: int) -> None:
+    def move_tableau_to_tableau(
+        self, from_index: int, to_index: int, num_cards: int | None = None
+    ) -> tuple[int, bool]:
+        # Moves the top num_cards cards, or if not given, the deepest face-up
+        # card that can be moved to to_index and everything on top of it.
+        # Returns the number of cards moved and whether a face-down card was turned face up
         if not self.tableau[from_index]:
             raise ValueError("No cards in the selected tableau pile")
 
-        # Find the deepest face-up card that can be moved to to_index
-        valid_num_cards = 0
-        found_move = False
         source_pile = self.tableau[from_index]
-
-        for i in range(len(source_pile)):
-            card, is_face_up = source_pile[i]
-            if is_face_up:
-                if self.is_valid_tableau_move(card, to_index):
+        if num_cards is None:
+            # Find the deepest face-up card that can be moved to to_index
+            valid_num_cards = 0
+            found_move = False
+
+            for i in range(len(source_pile)):
+                card, is_face_up = source_pile[i]
+                if is_face_up and self.is_valid_tableau_move(card, to_index):
                     valid_num_cards = len(source_pile) - i
                     found_move = True
                     break
 
-        if not found_move:
+            if not found_move:
+                raise ValueError("Invalid move to tableau")
+            num_cards = valid_num_cards
+        elif not (
+            0 < num_cards <= len(source_pile)
+            and source_pile[-num_cards][1]
+            and self.is_valid_tableau_move(source_pile[-num_cards][0], to_index)
+        ):
             raise ValueError("Invalid move to tableau")
 
-        num_cards = valid_num_cards
-        moving_cards = self.tableau[from_index][-num_cards:]
-
-        self.tableau[from_index] = self.tableau[from_index][:-num_cards]
-        self.tableau[to_index].extend(moving_cards)
-        if self.tableau[from_index]:
-            new_top_card, _ = self.tableau[from_index][-1]
-            self.tableau[from_index][-1] = (new_top_card, True)
-
-    def draw_from_stock(self) -> None:
+        dest_pile = self.tableau[to_index]
+        if self._track_hash:
+            z_from = _Z_TABLEAU[from_index]
+            z_to = _Z_TABLEAU[to_index]
+            from_pos = len(source_pile) - num_cards
+            to_pos = len(dest_pile)
+            for offset in range(num_cards):
+                code = _card_code(source_pile[from_pos + offset][0]) | 0x40
+                self._hash ^= (
+                    z_from[from_pos + offset][code] ^ z_to[to_pos + offset][code]
+                )
+        dest_pile.extend(source_pile[-num_cards:])
+        del source_pile[-num_cards:]
+        if source_pile:
+            new_top_card, was_face_up = source_pile[-1]
+            source_pile[-1] = (new_top_card, True)
+            if self._track_hash and not was_face_up:
+                self._hash ^= self._flip_key(from_index, new_top_card)
+            return num_cards, not was_face_up
+        return num_cards, False
+
+    def draw_from_stock(self) -> tuple[int, bool]:
+        # Returns the number of cards drawn and whether the waste was recycled
+        recycled = False
         if not self.stock:
             # recycle waste into stock
             self.stock = self.waste[::-1]
             self.waste.clear()
-
+            recycled = True
+            if self._track_hash:
+                for pos, card in enumerate(self.stock):
+                    code = _card_code(card)
+                    # the card at stock position pos was at waste position -pos - 1
+                    self._hash ^= (
+                        _Z_STOCK[pos][code] ^ _Z_WASTE[-pos - 1 + len(self.stock)][code]
+                    )
+
+        drawn = 0
         for _ in range(self.n_draw):
             if self.stock:
                 card = self.stock.pop()
+                if self._track_hash:
+                    code = _card_code(card)
+                    self._hash ^= (
+                        _Z_STOCK[len(self.stock)][code]
+                        ^ _Z_WASTE[len(self.waste)][code]
+                    )
                 self.waste.append(card)
+                drawn += 1
+        return drawn, recycled
 
     def move_waste_to_foundation(self) -> None:
         if not self.waste:
@@ -131,6 +494,13 @@ class SolitaireGame:
         ):
             self.waste.pop()
             foundation_pile.append(card)
+            if self._track_hash:
+                z_found = _Z_FOUNDATION[card.suit - 1]
+                self._hash ^= (
+                    _Z_WASTE[len(self.waste)][_card_code(card)]
+                    ^ z_found[card.rank - 1]
+                    ^ z_found[card.rank]
+                )
         else:
             raise ValueError("Invalid move to foundation")
 
@@ -140,6 +510,14 @@ class SolitaireGame:
         card = self.waste[-1]
         if self.is_valid_tableau_move(card, tableau_index):
             self.waste.pop()
+            if self._track_hash:
+                code = _card_code(card)
+                self._hash ^= (
+                    _Z_WASTE[len(self.waste)][code]
+                    ^ _Z_TABLEAU[tableau_index][len(self.tableau[tableau_index])][
+                        code | 0x40
+                    ]
+                )
             self.tableau[tableau_index].append((card, True))
         else:
             raise ValueError("Invalid move to tableau")
@@ -150,10 +528,62 @@ class SolitaireGame:
         card = self.foundation[foundation_index][-1]
         if self.is_valid_tableau_move(card, tableau_index):
             self.foundation[foundation_index].pop()
+            if self._track_hash:
+                z_found = _Z_FOUNDATION[foundation_index]
+                self._hash ^= (
+                    z_found[card.rank]
+                    ^ z_found[card.rank - 1]
+                    ^ _Z_TABLEAU[tableau_index][len(self.tableau[tableau_index])][
+                        _card_code(card) | 0x40
+                    ]
+                )
             self.tableau[tableau_index].append((card, True))
         else:
             raise ValueError("Invalid move to tableau")
 
+    def _flip_key(self, tableau_index: int, card: Card) -> int:
+        # hash change when the card on top of a tableau pile is turned face up
+        code = _card_code(card)
+        z_pos = _Z_TABLEAU[tableau_index][len(self.tableau[tableau_index]) - 1]
+        return z_pos[code] ^ z_pos[code | 0x40]
+
+    def _compute_hash(self) -> int:
+        value = 0
+        for pos, card in enumerate(self.stock):
+            value ^= _Z_STOCK[pos][_card_code(card)]
+        for pos, card in enumerate(self.waste):
+            value ^= _Z_WASTE[pos][_card_code(card)]
+        for f_idx, f_pile in enumerate(self.foundation):
+            value ^= _Z_FOUNDATION[f_idx][len(f_pile)]
+        for t_idx, t_pile in enumerate(self.tableau):
+            z_pile = _Z_TABLEAU[t_idx]
+            for pos, (card, is_face_up) in enumerate(t_pile):
+                value ^= z_pile[pos][_card_code(card) | (is_face_up << 6)]
+        return value
+
+    @property
+    def track_hash(self) -> bool:
+        return self._track_hash
+
+    @track_hash.setter
+    def track_hash(self, value: bool) -> None:
+        self._track_hash = value
+        self._hash = self._compute_hash() if value else 0
+
+    @property
+    def state_hash(self) -> int:
+        """
+        64-bit Zobrist hash of the current state.
+        Equal states (by get_game_state) always have equal hashes, so this can
+        be used as a cheap transposition-table key, with get_game_state kept for
+        verifying collisions. It is O(1) when track_hash is set, otherwise it is
+        computed from scratch. Note that the hash is only kept up to date by the
+        move methods, not by editing the piles directly.
+        """
+        if self._track_hash:
+            return self._hash
+        return self._compute_hash()
+
     def is_valid_tableau_move(self, card: Card, to_index: int) -> bool:
         if not self.tableau[to_index]:
             return card.rank == 13  # Only Kings can be placed on empty tableau piles
@@ -183,17 +613,50 @@ class SolitaireGame:
             return False
         return True
 
-    def reset_game(self) -> None:
-        self.deck = Deck()
+    def is_auto_solvable(self) -> bool:
+        # Exact version of can_be_auto_solved: whether auto_finish_moves can
+        # finish the game from here. It runs a search, so is_game_won keeps
+        # to the cheap check.
+        return self.auto_finish_moves() is not None
+
+    def auto_finish_moves(self) -> list[GameAction] | None:
+        """
+        Returns the moves that finish the game from here by only playing
+        cards to the foundations and drawing from the stock, taking the real
+        order of the stock (and face-down cards) and n_draw into account, or
+        None if the game can't be finished that way. An empty list means the
+        game is already finished.
+        """
+        # Quick version of _piles_in_order on the Cards, as most positions
+        # fail it and can then skip encoding the cards
+        for pile in reversed(self.tableau):
+            lowest = [14] * 5
+            for card, _ in pile:
+                if card.rank > lowest[card.suit]:
+                    return None
+                lowest[card.suit] = card.rank
+        return _auto_finish(
+            [[_card_code(card) for card, _ in pile] for pile in self.tableau],
+            [len(f_pile) for f_pile in self.foundation],
+            [_card_code(card) for card in self.stock],
+            [_card_code(card) for card in self.waste],
+            self.n_draw,
+        )
+
+    def reset_game(self, seed: int | None = None) -> None:
         self.tableau = [[] for _ in range(7)]
         self.foundation = [[] for _ in range(4)]
         self.stock = []
         self.waste = []
-        self.setup_game()
+        self.setup_game(None if seed is None else shuffled_deal(seed))
 
-    def get_game_state(self) -> bytes:
+    def get_game_state(self, canonical: bool = False) -> bytes:
         """
         Returns a hashable bytes representation of the current game state.
+        With canonical=True the tableau piles are written in canonical order
+        (see canonical_pile_order) instead of by position, so states that only
+        differ by which column holds which pile encode the same. Restoring a
+        canonical state gives a board with the piles in that order.
         Format:
         - Stock Length (1 byte)
         - Stock Cards (N bytes)
@@ -208,13 +671,11 @@ class SolitaireGame:
 
         # Stock
         data.append(len(self.stock))
-        for card in self.stock:
-            data.append(self._card_to_int(card))
+        data.extend(map(_card_code, self.stock))
 
         # Waste
         data.append(len(self.waste))
-        for card in self.waste:
-            data.append(self._card_to_int(card))
+        data.extend(map(_card_code, self.waste))
 
         # Foundation
         for f_pile in self.foundation:
@@ -224,192 +685,151 @@ class SolitaireGame:
         # Serialise each pile first so we can sort them to canonicalise the state
         tableau_piles_data: list[bytearray] = []
         for t_pile in self.tableau:
-            pile_data = bytearray()
-            pile_data.append(len(t_pile))
-            for card, is_face_up in t_pile:
-                pile_data.append(self._encode_tableau_card(card, is_face_up))
+            pile_data = bytearray([len(t_pile)])
+            pile_data.extend(
+                _card_code(card) | (is_face_up << 6) for card, is_face_up in t_pile
+            )
             tableau_piles_data.append(pile_data)
 
         # Sort the piles
-        # tableau_piles_data.sort()
+        if canonical:
+            tableau_piles_data.sort(key=_canonical_pile_key)
 
         for pile_data in tableau_piles_data:
             data.extend(pile_data)
 
         return bytes(data)
 
+    def canonical_pile_order(self) -> list[int]:
+        """
+        Returns the real tableau index of each pile in canonical order, i.e.
+        canonical pile i is self.tableau[order[i]]. Use map_action_piles to
+        replay actions found on a canonical board on this one.
+        """
+        pile_keys = [
+            _canonical_pile_key(
+                bytes([len(t_pile)])
+                + bytes(_card_code(card) | (up << 6) for card, up in t_pile)
+            )
+            for t_pile in self.tableau
+        ]
+        return sorted(range(7), key=pile_keys.__getitem__)
+
     def set_game_state(self, state: bytes) -> None:
         """
         Restores the game state from a bytes representation.
         """
-        data = memoryview(state)
-        idx = 0
-
-        # Stock
-        stock_len = data[idx]
-        idx += 1
-        self.stock = [self._int_to_card(data[i]) for i in range(idx, idx + stock_len)]
-        idx += stock_len
-
-        # Waste
-        waste_len = data[idx]
-        idx += 1
-        self.waste = [self._int_to_card(data[i]) for i in range(idx, idx + waste_len)]
-        idx += waste_len
+        self.stock, self.waste, self.foundation, self.tableau = self.read_game_state(
+            state
+        )
 
-        # Foundation
-        self.foundation = []
-        for suit_offset in range(4):
-            count = data[idx]
-            idx += 1
-            suit = suit_offset + 1
-            f_pile = [Card(rank, suit) for rank in range(1, count + 1)]  # type: ignore
-            self.foundation.append(f_pile)
-
-        # Tableau
-        self.tableau = []
-        for _ in range(7):
-            pile_len = data[idx]
-            idx += 1
-            t_pile = []
-            for i in range(idx, idx + pile_len):
-                t_pile.append(self._decode_tableau_card(data[i]))
-            self.tableau.append(t_pile)
-            idx += pile_len
+        if self._track_hash:
+            self._hash = self._compute_hash()
 
     def read_game_state(
         self, state: bytes
     ) -> tuple[list[Card], list[Card], list[list[Card]], list[list[tuple[Card, bool]]]]:
         # we want to convert a game state bytes object into a tuple of piles, etc. that can be used to calculate heuristics
-        data = memoryview(state)
+        # Every card comes from the interned lookup tables in deck, so this
+        # never creates a Card
         idx = 0
 
         # Stock
-        stock_len = data[idx]
+        stock_len = state[idx]
         idx += 1
         stock: list[Card] = [
-            self._int_to_card(data[i]) for i in range(idx, idx + stock_len)
+            CARD_FROM_CODE[code] for code in state[idx : idx + stock_len]
         ]
         idx += stock_len
 
         # Waste
-        waste_len = data[idx]
+        waste_len = state[idx]
         idx += 1
         waste: list[Card] = [
-            self._int_to_card(data[i]) for i in range(idx, idx + waste_len)
+            CARD_FROM_CODE[code] for code in state[idx : idx + waste_len]
         ]
         idx += waste_len
 
-        # Foundation
-        foundation: list[list[Card]] = []
-        for suit_offset in range(4):
-            count = data[idx]
-            idx += 1
-            suit = suit_offset + 1
-            f_pile: list[Card] = [Card(rank, suit) for rank in range(1, count + 1)]  # type: ignore
-            foundation.append(f_pile)
+        # Foundation: the CARDS of a suit are in rank order
+        foundation: list[list[Card]] = [
+            list(CARDS[suit * 13 : suit * 13 + state[idx + suit]]) for suit in range(4)
+        ]
+        idx += 4
 
         # Tableau
         tableau: list[list[tuple[Card, bool]]] = []
         for _ in range(7):
-            pile_len = data[idx]
+            pile_len = state[idx]
             idx += 1
-            t_pile: list[tuple[Card, bool]] = []
-            for i in range(idx, idx + pile_len):
-                t_pile.append(self._decode_tableau_card(data[i]))
-            tableau.append(t_pile)
+            tableau.append(
+                [TABLEAU_ENTRY_FROM_CODE[code] for code in state[idx : idx + pile_len]]
+            )
             idx += pile_len
 
         return stock, waste, foundation, tableau
 
-    def _card_to_int(self, card: Card) -> int:
-        # Bits 0-3: Rank (0-12)
-        # Bits 4-5: Suit (0-3)
-        return ((card.suit - 1) << 4) | (card.rank - 1)
-
-    _int_to_card_cache: dict[int, Card] = {}
-
-    def _int_to_card(self, value: int) -> Card:
-        if value in self._int_to_card_cache:
-            return self._int_to_card_cache[value]
-
-        # Mask 0xF (1111 binary) gets the first 4 bits
-        rank = (value & 0xF) + 1
-        # Shift right 4 and mask 0x3 (11 binary) gets the next 2 bits
-        suit = ((value >> 4) & 0x3) + 1
-        card = Card(rank, suit)  # type: ignore
-        self._int_to_card_cache[value] = card
-        return card
-
-    def _encode_tableau_card(self, card: Card, is_face_up: bool) -> int:
-        val = self._card_to_int(card)
-        if is_face_up:
-            # Set bit 6
-            val |= 1 << 6
-        return val
-
-    _decode_tableau_card_cache: dict[int, tuple[Card, bool]] = {}
-
-    def _decode_tableau_card(self, value: int) -> tuple[Card, bool]:
-        if value in self._decode_tableau_card_cache:
-            return self._decode_tableau_card_cache[value]
-
-        # Check bit 6
-        is_face_up = bool((value >> 6) & 1)
-        # Clear bit 6 to get the card value
-        card_val = value & ~(1 << 6)
-        result = self._int_to_card(card_val), is_face_up
-        self._decode_tableau_card_cache[value] = result
-        return result
-
     def get_valid_moves(self) -> list[GameAction]:
+        """
+        Returns every distinct legal move once. Tableau moves include the
+        number of cards they take, ("tt", (from, to, num_cards)).
+
+        Destinations are indexed by the card they accept, as (rank << 1 | is_red)
+        of the card that fits on their top card (empty piles accept Kings of
+        either colour), so each candidate card is matched with one lookup
+        instead of being checked against every pile.
+        """
         moves: list[GameAction] = []
+        tableau = self.tableau
+        # Next rank each foundation needs, indexed by suit
+        next_rank = [0] + [len(f_pile) + 1 for f_pile in self.foundation]
 
-        # Check waste to foundation
-        if self.waste:
-            card = self.waste[-1]
-            foundation_pile = self.foundation[card.suit - 1]
-            if (not foundation_pile and card.rank == 1) or (
-                foundation_pile and card.rank == foundation_pile[-1].rank + 1
-            ):
-                moves.append(("wf", ()))
+        accepts: dict[int, list[int]] = {}
+        empty_piles: list[int] = []
+        for t_idx, t_pile in enumerate(tableau):
+            if t_pile:
+                top = t_pile[-1][0]
+                key = ((top.rank - 1) << 1) | (not _IS_RED[top.suit])
+                if key in accepts:
+                    accepts[key].append(t_idx)
+                else:
+                    accepts[key] = [t_idx]
+            else:
+                empty_piles.append(t_idx)
+        if empty_piles:
+            accepts[13 << 1] = accepts[(13 << 1) | 1] = empty_piles
 
-        # Check waste to tableau
+        # Check waste to foundation and waste to tableau
         if self.waste:
             card = self.waste[-1]
-            for i in range(7):
-                if self.is_valid_tableau_move(card, i):
-                    moves.append(("wt", (i,)))
+            if card.rank == next_rank[card.suit]:
+                moves.append(("wf", ()))
+            for t_idx in accepts.get((card.rank << 1) | _IS_RED[card.suit], ()):
+                moves.append(("wt", (t_idx,)))
 
         # Check tableau to foundation
-        for i in range(7):
-            if self.tableau[i]:
-                card, _ = self.tableau[i][-1]
-                foundation_pile = self.foundation[card.suit - 1]
-                if (not foundation_pile and card.rank == 1) or (
-                    foundation_pile and card.rank == foundation_pile[-1].rank + 1
-                ):
-                    moves.append(("tf", (i,)))
-
-        # Check tableau to tableau
-        for from_idx in range(7):
-            for to_idx in range(7):
-                if from_idx != to_idx:
-                    for n in range(1, len(self.tableau[from_idx]) + 1):
-                        moving_cards = self.tableau[from_idx][-n:]
-                        # We can only move cards that are face up
-                        if not moving_cards[0][1]:
-                            break
-                        if self.is_valid_tableau_move(moving_cards[0][0], to_idx):
-                            moves.append(("tt", (from_idx, to_idx)))
+        for t_idx, t_pile in enumerate(tableau):
+            if t_pile:
+                card = t_pile[-1][0]
+                if card.rank == next_rank[card.suit]:
+                    moves.append(("tf", (t_idx,)))
+
+        # Check tableau to tableau: only face-up cards can be moved, taking
+        # everything on top of them along
+        for from_idx, t_pile in enumerate(tableau):
+            pile_len = len(t_pile)
+            i = pile_len - 1
+            while i >= 0 and t_pile[i][1]:
+                card = t_pile[i][0]
+                for to_idx in accepts.get((card.rank << 1) | _IS_RED[card.suit], ()):
+                    moves.append(("tt", (from_idx, to_idx, pile_len - i)))
+                i -= 1
 
         # Check foundation to tableau
-        for f_idx in range(4):
-            if self.foundation[f_idx]:
-                card = self.foundation[f_idx][-1]
-                for t_idx in range(7):
-                    if self.is_valid_tableau_move(card, t_idx):
-                        moves.append(("ft", (f_idx, t_idx)))
+        for f_idx, f_pile in enumerate(self.foundation):
+            if f_pile:
+                card = f_pile[-1]
+                for t_idx in accepts.get((card.rank << 1) | _IS_RED[card.suit], ()):
+                    moves.append(("ft", (f_idx, t_idx)))
 
         # Check draw from stock
         if self.stock or self.waste:
@@ -417,19 +837,66 @@ class SolitaireGame:
 
         return moves
 
-    def make_move(self, action: GameAction) -> None:
+    def make_move(self, action: GameAction) -> MoveRecord:
+        # Returns a record that unmake_move can use to take the move back
+        prior_hash = self._hash
         if action[0] == "s":
-            self.draw_from_stock()
+            drawn, recycled = self.draw_from_stock()
+            return action, drawn, recycled, prior_hash
         elif action[0] == "wf":
+            f_idx = self.waste[-1].suit - 1 if self.waste else 0
             self.move_waste_to_foundation()
+            return action, f_idx, False, prior_hash
         elif action[0] == "wt":
             self.move_waste_to_tableau(action[1][0])  # ty: ignore[index-out-of-bounds]
         elif action[0] == "tf":
-            self.move_tableau_to_foundation(action[1][0])  # ty: ignore[index-out-of-bounds]
+            t_pile = self.tableau[action[1][0]]  # ty: ignore[index-out-of-bounds]
+            f_idx = t_pile[-1][0].suit - 1 if t_pile else 0
+            flipped = self.move_tableau_to_foundation(action[1][0])  # ty: ignore[index-out-of-bounds]
+            return action, f_idx, flipped, prior_hash
         elif action[0] == "ft":
             self.foundation_to_tableau(action[1][0], action[1][1])  # ty: ignore[index-out-of-bounds]
         elif action[0] == "tt":
-            self.move_tableau_to_tableau(action[1][0], action[1][1])  # ty: ignore[index-out-of-bounds]
+            num_cards, flipped = self.move_tableau_to_tableau(*action[1])  # ty: ignore[invalid-argument-type]
+            return action, num_cards, flipped, prior_hash
+        return action, 0, False, prior_hash
+
+    def unmake_move(self, record: MoveRecord) -> None:
+        """
+        Takes back a move made with make_move, given the record it returned.
+        Moves must be taken back in reverse order. Only the cards that the
+        move touched are moved back, so this is O(cards moved), and the state
+        hash is restored from the record.
+        """
+        action, count, flag, prior_hash = record
+        if action[0] == "s":
+            for _ in range(count):
+                self.stock.append(self.waste.pop())
+            if flag:
+                # undo the recycle of the waste into the stock
+                self.waste.extend(reversed(self.stock))
+                self.stock.clear()
+        elif action[0] == "wf":
+            self.waste.append(self.foundation[count].pop())
+        elif action[0] == "wt":
+            card, _ = self.tableau[action[1][0]].pop()  # ty: ignore[index-out-of-bounds]
+            self.waste.append(card)
+        elif action[0] == "tf":
+            t_pile = self.tableau[action[1][0]]  # ty: ignore[index-out-of-bounds]
+            if flag:
+                t_pile[-1] = (t_pile[-1][0], False)
+            t_pile.append((self.foundation[count].pop(), True))
+        elif action[0] == "ft":
+            card, _ = self.tableau[action[1][1]].pop()  # ty: ignore[index-out-of-bounds]
+            self.foundation[action[1][0]].append(card)  # ty: ignore[index-out-of-bounds]
+        elif action[0] == "tt":
+            from_pile = self.tableau[action[1][0]]  # ty: ignore[index-out-of-bounds]
+            to_pile = self.tableau[action[1][1]]  # ty: ignore[index-out-of-bounds]
+            if flag:
+                from_pile[-1] = (from_pile[-1][0], False)
+            from_pile.extend(to_pile[-count:])
+            del to_pile[-count:]
+        self._hash = prior_hash
 
     def list_valid_moves(self) -> list[str]:
         # simply return string representations of the moves
@@ -0,0 +1,1008 @@
+import heapq
+import math
+import time
+from array import array
+from collections import Counter
+from collections.abc import Callable, Container, Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import Literal
+
+from dead_ends import DeadEndDetector, DeadEndRule
+from instrument import Instruments, Progress, ProgressCallback
+from macro_moves import DRAW, macro_moves, make_macro, unmake_macro
+from move_policy import MovePolicy
+from solitaire_game import (
+    ALL_ACTIONS,
+    GameAction,
+    MoveRecord,
+    SolitaireGame,
+    action_code,
+    map_action_piles,
+)
+from state_view import StateView
+from transposition import DiskTable, TranspositionTable
+
+# A heuristic scores a game state (as returned by get_game_state), lower is better
+type Heuristic = Callable[[bytes], float]
+# Scores a list of states in one call, e.g. state_array.batch_default_heuristic
+type BatchHeuristic = Callable[[Sequence[bytes]], Iterable[float]]
+# "unsolvable" is only returned when a search has proved that the position
+# cannot be won; "exhausted" means the search ran out of positions without
+# a proof, e.g. because a MovePolicy dropped moves or a beam dropped lines.
+type SolveStatus = Literal[
+    "solved", "unsolvable", "exhausted", "node_limit", "time_limit"
+]
+type DedupKey = Literal["bytes", "hash"]
+type DeadEndCheck = Callable[[bytes, int], DeadEndRule | None]
+
+# Reused by the heuristics below rather than creating a view per state
+_view = StateView()
+
+
+def cards_remaining(state: bytes) -> float:
+    """
+    Number of cards not yet on the foundations.
+    Every move places at most one card on a foundation, so this never
+    overestimates the number of moves left and is admissible for A*.
+    """
+    return 52 - _view.load(state).cards_on_foundations()
+
+
+def default_heuristic(state: bytes) -> float:
+    """
+    Cards not yet on the foundations, plus a penalty for every face-down card
+    and for every card that is buried above a lower card of the same suit.
+    """
+    view = _view.load(state)
+    score = 52 - view.cards_on_foundations()
+
+    for t_idx in range(7):
+        # lowest rank code (0-12) seen so far in the pile, per suit
+        lowest_rank = [13] * 4
+        for code in view.pile(t_idx):
+            if not code & 0x40:
+                score += 2
+            rank = code & 0xF
+            suit = (code >> 4) & 0x3
+            if rank > lowest_rank[suit]:
+                # this card cannot reach the foundation until it is moved off
+                score += 1
+            else:
+                lowest_rank[suit] = rank
+
+    return score + (view.stock_len + view.waste_len) * 0.5
+
+
+def _finishing_moves(game: SolitaireGame) -> list[GameAction]:
+    # The moves that play out a won position (see SolitaireGame.is_auto_solvable)
+    return game.auto_finish_moves() or []
+
+
+def _dead_end_check(
+    dead_ends: DeadEndDetector | None, instruments: Instruments | None
+) -> DeadEndCheck | None:
+    if dead_ends is None:
+        return None
+    if instruments is not None:
+        return instruments.timed("dead_end", dead_ends.check)
+    return dead_ends.check
+
+
+class _Monitor:
+    """
+    The time limit and progress reports of a search. The clock is only read
+    every 256 nodes, and not at all without a time limit or a progress
+    callback.
+    """
+
+    __slots__ = (
+        "active",
+        "deadline",
+        "interval",
+        "next_check",
+        "next_report",
+        "progress",
+        "start_time",
+    )
+
+    def __init__(
+        self,
+        start_time: float,
+        time_limit: float | None,
+        progress: ProgressCallback | None,
+        interval: float,
+    ) -> None:
+        self.active = time_limit is not None or progress is not None
+        self.start_time = start_time
+        self.deadline = None if time_limit is None else start_time + time_limit
+        self.progress = progress
+        self.interval = interval
+        # Searches call out_of_time once nodes_expanded reaches next_check
+        self.next_check = 0
+        self.next_report = start_time + interval
+
+    def out_of_time(
+        self,
+        nodes_expanded: int,
+        states_seen: int,
+        frontier: int,
+        tt_lookups: int,
+        tt_hits: int,
+    ) -> bool:
+        self.next_check = nodes_expanded + 256
+        now = time.perf_counter()
+        if self.progress is not None and now >= self.next_report:
+            self.next_report = now + self.interval
+            self.report(nodes_expanded, states_seen, frontier, tt_lookups, tt_hits)
+        return self.deadline is not None and now >= self.deadline
+
+    def report(
+        self,
+        nodes_expanded: int,
+        states_seen: int,
+        frontier: int,
+        tt_lookups: int,
+        tt_hits: int,
+    ) -> None:
+        if self.progress is not None:
+            elapsed = time.perf_counter() - self.start_time
+            self.progress(
+                Progress(
+                    nodes_expanded, states_seen, frontier, tt_lookups, tt_hits, elapsed
+                )
+            )
+
+
+@dataclass(slots=True)
+class SolveResult:
+    status: SolveStatus
+    # The winning line when status is "solved", otherwise empty. The search
+    # stops at the first position that is won (see is_auto_solvable), and the
+    # line ends with the auto_finish_moves that play out the rest (or at one
+    # of the goals given to solve).
+    moves: list[GameAction]
+    nodes_expanded: int
+    states_seen: int
+    elapsed: float
+    # Most nodes waiting to be searched at once: the frontier of best-first
+    # search, the current line of a depth-first search, or a beam layer
+    peak_frontier: int = 0
+    # Positions pruned by a DeadEndDetector, by the rule that found them lost
+    dead_ends: dict[DeadEndRule, int] = field(default_factory=dict)
+
+    @property
+    def solved(self) -> bool:
+        return self.status == "solved"
+
+
+def solve(
+    game: SolitaireGame,
+    heuristic: Heuristic = default_heuristic,
+    *,
+    max_nodes: int = 1_000_000,
+    time_limit: float | None = None,
+    g_weight: float = 0.0,
+    dedup: DedupKey = "bytes",
+    verify_hashes: bool = False,
+    canonical: bool = False,
+    policy: MovePolicy | None = None,
+    batch_heuristic: BatchHeuristic | None = None,
+    batch_size: int = 64,
+    macros: bool = False,
+    dead_ends: DeadEndDetector | None = None,
+    goals: Container[int | bytes] | None = None,
+    instruments: Instruments | None = None,
+    progress: ProgressCallback | None = None,
+    progress_interval: float = 1.0,
+) -> SolveResult:
+    """
+    Best-first search for a winning line from the current position of `game`.
+
+    Nodes are ordered by `heuristic(state) + g_weight * depth`: the default
+    g_weight of 0 gives greedy best-first search, while g_weight=1 with an
+    admissible heuristic such as `cards_remaining` gives A*.
+
+    Every state is stored once, as its get_game_state bytes, in a
+    transposition table that maps it to a node id; the parent links and
+    actions are kept in flat arrays so a node costs little more than its
+    state bytes. If the frontier runs dry the whole reachable state space has
+    been explored without a win, which proves the deal unsolvable.
+
+    With dedup="hash" the transposition table is keyed on the incrementally
+    maintained state_hash instead, and get_game_state is only called for
+    children that have not been seen before. verify_hashes additionally
+    compares the stored bytes on every hit to detect hash collisions.
+
+    With canonical=True states are stored in their canonical encoding, so
+    positions that only differ by the order of the tableau piles share one
+    entry. The search then runs on boards with the piles in canonical order,
+    and the winning line is mapped back onto the real board at the end.
+    Canonical states are always keyed on bytes.
+
+    If a MovePolicy is given, its moves are expanded instead of every valid
+    move. With policy.drop_unproductive an exhausted frontier no longer
+    proves that the deal is unsolvable, and the status is "exhausted".
+
+    With a batch_heuristic, up to batch_size nodes are taken off the frontier
+    at a time and all their children are scored in one batch_heuristic call
+    instead of calling `heuristic` on each. The nodes of a batch are expanded
+    before any of their children are scored, so the search order is only
+    approximately best-first.
+
+    With macros=True, drawing from the stock is replaced by the macro moves
+    of macro_moves: each child is a position after some draws and a play from
+    the waste, so the positions in between are never stored and draw-3
+    searches are much shallower. The draws are put back into the winning
+    line, so it is still made of plain moves.
+
+    With a DeadEndDetector, children that it finds lost are not searched
+    (they are counted by rule in SolveResult.dead_ends). It only prunes
+    positions that cannot be won, so running out of nodes still proves the
+    deal unsolvable, usually much sooner.
+
+    goals are states already known to be winnable, keyed like the
+    transposition table (state_hash with dedup="hash", otherwise the state
+    bytes). Reaching one counts as a win, and the winning line ends there
+    (see hints.HintEngine, which searches towards the lines it has found).
+
+    Children are generated in place with make_move/unmake_move, so the board
+    is only rebuilt from bytes once per expanded node. The game is left in
+    its starting position when the search returns.
+    """
+    start_time = time.perf_counter()
+    monitor = _Monitor(start_time, time_limit, progress, progress_interval)
+    if instruments is not None:
+        game = instruments.game(game)
+        heuristic = instruments.timed("heuristic", heuristic)
+        if batch_heuristic is not None:
+            batch_heuristic = instruments.timed("batch_heuristic", batch_heuristic)
+    check_dead_end = _dead_end_check(dead_ends, instruments)
+    pruned: Counter[DeadEndRule] = Counter()
+
+    if canonical and dedup == "hash":
+        raise ValueError("Canonical search is keyed on state bytes, not hashes")
+    use_hash = dedup == "hash"
+    was_tracking_hash = game.track_hash
+    if use_hash and not was_tracking_hash:
+        game.track_hash = True
+
+    real_root = game.get_game_state()
+    root = game.get_game_state(canonical) if canonical else real_root
+    states: list[bytes] = [root]
+    parents = array("i", [-1])
+    actions = bytearray([0])
+    # draws made before the action, with macros
+    draw_counts = bytearray([0])
+    depths = array("H", [0])
+    root_key = game.state_hash if use_hash else root
+    seen: dict[bytes | int, int] = {root_key: 0}
+    seen_get = seen.get
+    if instruments is not None:
+        seen_get = instruments.timed("tt_lookup", seen_get)
+    # children that were already in the table
+    tt_hits = 0
+
+    root_score = heuristic(root) if batch_heuristic is None else 0.0
+    frontier: list[tuple[float, int]] = [(root_score, 0)]
+    batch = 1 if batch_heuristic is None else batch_size
+    nodes_expanded = 0
+    peak_frontier = 1
+    status: SolveStatus = "unsolvable"
+    winner = -1
+    can_prove = policy is None or not policy.drop_unproductive
+
+    if game.is_auto_solvable() or (goals is not None and root_key in goals):
+        status, winner = "solved", 0
+        frontier.clear()
+    elif check_dead_end is not None:
+        rule = check_dead_end(root, game.n_draw)
+        if rule is not None:
+            pruned[rule] += 1
+            frontier.clear()
+            can_prove = True
+
+    while frontier:
+        if nodes_expanded >= max_nodes:
+            status = "node_limit"
+            break
+        if (
+            monitor.active
+            and nodes_expanded >= monitor.next_check
+            and monitor.out_of_time(
+                nodes_expanded,
+                len(states),
+                len(frontier),
+                len(states) - 1 + tt_hits,
+                tt_hits,
+            )
+        ):
+            status = "time_limit"
+            break
+
+        expanded: list[int] = []
+        while frontier and len(expanded) < batch and nodes_expanded < max_nodes:
+            expanded.append(heapq.heappop(frontier)[1])
+            nodes_expanded += 1
+
+        new_nodes: list[int] = []
+        for node in expanded:
+            game.set_game_state(states[node])
+            child_depth = depths[node] + 1
+
+            moves = game.get_valid_moves() if policy is None else policy.moves(game)
+            steps = macro_moves(game, moves) if macros else [(0, a) for a in moves]
+            for step in steps:
+                draws, action = step
+                records = make_macro(game, step)
+                key = game.state_hash if use_hash else game.get_game_state(canonical)
+                known = seen_get(key)
+                if known is not None and not (
+                    verify_hashes
+                    and use_hash
+                    and states[known] != game.get_game_state()
+                ):
+                    tt_hits += 1
+                    unmake_macro(game, records)
+                    continue
+                child = game.get_game_state() if use_hash else key
+                won = (goals is not None and key in goals) or game.is_auto_solvable()
+                unmake_macro(game, records)
+
+                child_node = len(states)
+                if known is None:
+                    # on a (verified) hash collision the first state keeps the entry
+                    seen[key] = child_node
+                states.append(child)
+                parents.append(node)
+                actions.append(action_code(action))
+                draw_counts.append(draws)
+                depths.append(child_depth)
+
+                if won:
+                    winner = child_node
+                    break
+                if check_dead_end is not None:
+                    rule = check_dead_end(child, game.n_draw)
+                    if rule is not None:
+                        pruned[rule] += 1
+                        continue
+                new_nodes.append(child_node)
+
+            if winner >= 0:
+                break
+
+        if winner >= 0:
+            status = "solved"
+            break
+
+        peak_frontier = max(peak_frontier, len(frontier) + len(new_nodes))
+        children = [states[child_node] for child_node in new_nodes]
+        if batch_heuristic is None:
+            scores: Iterable[float] = map(heuristic, children)
+        else:
+            scores = batch_heuristic(children) if children else ()
+        for child_node, score in zip(new_nodes, scores):
+            heapq.heappush(
+                frontier, (score + g_weight * depths[child_node], child_node)
+            )
+
+    if status == "unsolvable" and not can_prove:
+        status = "exhausted"
+    moves: list[GameAction] = []
+    node = winner
+    while node > 0:
+        moves.append(ALL_ACTIONS[actions[node]])
+        moves.extend([DRAW] * draw_counts[node])
+        node = parents[node]
+    moves.reverse()
+
+    game.set_game_state(real_root)
+    if canonical:
+        # each action is relative to the canonical pile order at that point
+        for i, action in enumerate(moves):
+            moves[i] = map_action_piles(action, game.canonical_pile_order())
+            game.make_move(moves[i])
+        game.set_game_state(real_root)
+    if winner >= 0:
+        for action in moves:
+            game.make_move(action)
+        moves += _finishing_moves(game)
+        game.set_game_state(real_root)
+    if use_hash and not was_tracking_hash:
+        game.track_hash = False
+    monitor.report(
+        nodes_expanded, len(states), len(frontier), len(states) - 1 + tt_hits, tt_hits
+    )
+    return SolveResult(
+        status=status,
+        moves=moves,
+        nodes_expanded=nodes_expanded,
+        states_seen=len(states),
+        elapsed=time.perf_counter() - start_time,
+        peak_frontier=peak_frontier,
+        dead_ends=dict(pruned),
+    )
+
+
+# solve_dfs stores one 64-bit value per state in its transposition table: a
+# flag (bits 38-39) and, for states on the search stack, the run id (bits
+# 40+) and their Tarjan index. For _FINISHED states the rest is the
+# state_hash of the position the search started from, with bit 0 set if no
+# moves were cut off below the state. _DEAD entries are used by every later
+# run, _FINISHED ones by later runs from the same starting position.
+_FINISHED, _ON_STACK, _DEAD_FLAG = 0, 1, 3
+_DEAD = _DEAD_FLAG << 38
+_FLAG_MASK = 0x3 << 38
+_INDEX_MASK = (1 << 38) - 1
+# Whether a finished state in an unfinished component is closed
+_OPEN, _CLOSED = 1, 2
+
+
+def _entry(run: int, flag: int, index: int = 0) -> int:
+    return run << 40 | flag << 38 | index
+
+
+def solve_dfs(
+    game: SolitaireGame,
+    table: TranspositionTable | DiskTable,
+    *,
+    max_nodes: int = 1_000_000,
+    time_limit: float | None = None,
+    max_depth: int = 1000,
+    policy: MovePolicy | None = None,
+    dead_ends: DeadEndDetector | None = None,
+    instruments: Instruments | None = None,
+    progress: ProgressCallback | None = None,
+    progress_interval: float = 1.0,
+) -> SolveResult:
+    """
+    Depth-first search for a winning line from the current position of
+    `game`, keyed on state_hash in a transposition table that can live on
+    disk (see transposition.TranspositionTable).
+
+    Unlike solve, nothing here grows with the number of states searched
+    except the table itself: the search keeps only the current line of play
+    and the states of the strongly connected components it is inside (moves
+    like drawing and moving cards back and forth lead back to earlier
+    states). With a TranspositionTable the memory used is fixed by its
+    memory_entries; the rest of the table is in its file.
+
+    When a component has been searched completely without a win, all of its
+    states are recorded as dead. Dead states are never searched again, by
+    this or any later run on the same table, so deals share what they know
+    about positions they have in common. Moves tend to lead back to the
+    starting position, though, so most states are in one component with it,
+    which is only finished at the end of the search. Every state that a run
+    has finished searching is therefore recorded as well, and later runs from
+    the same position skip it: calling solve_dfs again with the same table
+    after a limit stopped it resumes the search, only going over the states
+    on the line it was stopped in again. To resume in another process, flush
+    or close the table first (if the process is killed, only what already
+    reached the file is kept).
+
+    Lines are cut off at max_depth, and a policy with drop_unproductive
+    drops moves. A search that finishes without a win after cutting off
+    moves, in this run or the ones it resumed, is "exhausted" instead of
+    "unsolvable", and the states above the cut are never recorded as dead.
+    Resume with the same max_depth and policy. Positions that a
+    DeadEndDetector finds lost are recorded as dead without being searched.
+
+    The table is keyed on 64-bit hashes, so a hash collision could make a
+    state be treated as dead; this is vanishingly unlikely. The game is left
+    in its starting position when the search returns.
+    """
+    start_time = time.perf_counter()
+    monitor = _Monitor(start_time, time_limit, progress, progress_interval)
+    if instruments is not None:
+        game = instruments.game(game)
+    was_tracking_hash = game.track_hash
+    game.track_hash = True
+    run = table.new_run()
+    can_prove = policy is None or not policy.drop_unproductive
+    table_get = table.get
+    if instruments is not None:
+        table_get = instruments.timed("tt_lookup", table_get)
+    check_dead_end = _dead_end_check(dead_ends, instruments)
+    pruned: Counter[DeadEndRule] = Counter()
+    # children that were already in the table
+    tt_hits = 0
+
+    nodes_expanded = 0
+    peak_frontier = 0
+    index = 0
+    status: SolveStatus = "unsolvable"
+    line: list[GameAction] = []
+
+    # One frame per state on the current line: [key, moves, next move,
+    # record to undo the move into it, Tarjan index, lowlink, complete,
+    # closed, position in component]. A state is closed if no moves below it
+    # were cut off, and complete if it is closed and everything below it was
+    # searched by this run or is dead, so that its component is dead.
+    frames: list[list] = []
+    # States whose component is still being searched, in Tarjan order, and
+    # for each one 0 while it is on the current line, then _CLOSED or _OPEN
+    component: list[int] = []
+    finished = bytearray()
+
+    def enter(key: int, record: MoveRecord | None) -> None:
+        nonlocal index, nodes_expanded, peak_frontier
+        nodes_expanded += 1
+        table[key] = _entry(run, _ON_STACK, index)
+        if len(frames) < max_depth:
+            moves = game.get_valid_moves() if policy is None else policy.moves(game)
+            complete = can_prove
+        else:
+            moves, complete = [], False
+        frames.append(
+            [key, moves, 0, record, index, index, complete, complete, len(component)]
+        )
+        component.append(key)
+        finished.append(0)
+        index += 1
+        peak_frontier = max(peak_frontier, len(frames))
+
+    root = game.state_hash
+    # The _FINISHED entries of states searched from this starting position
+    finished_open = root & ~_FLAG_MASK & ~1
+    finished_closed = finished_open | 1
+    root_entry = table_get(root)
+    if game.is_auto_solvable():
+        status = "solved"
+        line = _finishing_moves(game)
+    elif root_entry != _DEAD and root_entry != finished_closed:
+        rule = None
+        if check_dead_end is not None:
+            rule = check_dead_end(game.get_game_state(), game.n_draw)
+        if rule is None:
+            enter(root, None)
+        else:
+            pruned[rule] += 1
+            table[root] = _DEAD
+
+    while frames:
+        if nodes_expanded >= max_nodes:
+            status = "node_limit"
+            break
+        if (
+            monitor.active
+            and nodes_expanded >= monitor.next_check
+            and monitor.out_of_time(
+                nodes_expanded,
+                index,
+                len(frames),
+                nodes_expanded - 1 + tt_hits,
+                tt_hits,
+            )
+        ):
+            status = "time_limit"
+            break
+
+        frame = frames[-1]
+        moves, next_move = frame[1], frame[2]
+        if next_move < len(moves):
+            frame[2] = next_move + 1
+            action = moves[next_move]
+            record = game.make_move(action)
+            if game.is_auto_solvable():
+                line.append(action)
+                line += _finishing_moves(game)
+                status = "solved"
+                break
+            key = game.state_hash
+            entry = table_get(key)
+            if entry is None or not (
+                entry == _DEAD
+                or entry == finished_closed
+                or entry == finished_open
+                or (entry >> 40 == run and entry & _FLAG_MASK)
+            ):
+                if check_dead_end is not None:
+                    rule = check_dead_end(game.get_game_state(), game.n_draw)
+                    if rule is not None:
+                        pruned[rule] += 1
+                        table[key] = _DEAD
+                        game.unmake_move(record)
+                        continue
+                line.append(action)
+                enter(key, record)
+                continue
+            tt_hits += 1
+            game.unmake_move(record)
+            flag = entry >> 38 & 0x3
+            if flag == _ON_STACK:
+                frame[5] = min(frame[5], entry & _INDEX_MASK)
+            elif flag == _FINISHED:
+                frame[6] = False
+                if entry == finished_open:
+                    frame[7] = False
+            continue
+
+        # Every move from this state has been tried
+        frames.pop()
+        key, _, _, record, node_index, lowlink, complete, closed, position = frame
+        finished[position] = _CLOSED if closed else _OPEN
+        if lowlink == node_index:
+            # The state is the root of its component, which is now finished
+            while True:
+                member = component.pop()
+                if complete:
+                    table[member] = _DEAD
+                elif finished[-1] == _CLOSED:
+                    table[member] = finished_closed
+                else:
+                    table[member] = finished_open
+                finished.pop()
+                if member == key:
+                    break
+        if frames:
+            parent = frames[-1]
+            parent[5] = min(parent[5], lowlink)
+            parent[6] = parent[6] and complete
+            parent[7] = parent[7] and closed
+            game.unmake_move(record)
+            line.pop()
+        elif not closed:
+            status = "exhausted"
+
+    if status in ("node_limit", "time_limit"):
+        # Finished states in unfinished components are skipped when resuming
+        for member, state in zip(component, finished):
+            if state == _CLOSED:
+                table[member] = finished_closed
+            elif state == _OPEN:
+                table[member] = finished_open
+
+    # Undo the current line to get back to the starting position
+    if status == "solved" and frames:
+        game.unmake_move(record)
+    for frame in reversed(frames[1:]):
+        game.unmake_move(frame[3])
+    if status != "solved":
+        line = []
+    game.track_hash = was_tracking_hash
+    monitor.report(
+        nodes_expanded, index, len(frames), nodes_expanded - 1 + tt_hits, tt_hits
+    )
+    return SolveResult(
+        status=status,
+        moves=line,
+        nodes_expanded=nodes_expanded,
+        states_seen=index,
+        elapsed=time.perf_counter() - start_time,
+        peak_frontier=peak_frontier,
+        dead_ends=dict(pruned),
+    )
+
+
+def solve_ida(
+    game: SolitaireGame,
+    heuristic: Heuristic = cards_remaining,
+    *,
+    max_nodes: int = 1_000_000,
+    time_limit: float | None = None,
+    max_states: int = 100_000,
+    max_depth: int = 1000,
+    policy: MovePolicy | None = None,
+    dead_ends: DeadEndDetector | None = None,
+    instruments: Instruments | None = None,
+    progress: ProgressCallback | None = None,
+    progress_interval: float = 1.0,
+) -> SolveResult:
+    """
+    Iterative-deepening A*: repeated depth-first passes that only follow
+    lines whose length plus `heuristic` stays within a bound, raising the
+    bound after each pass to the lowest value that went over it. With an
+    admissible heuristic such as the default cards_remaining, the first line
+    found is a shortest one.
+
+    Memory is capped by max_states: apart from the current line, a pass only
+    keeps a cache of up to max_states state hashes (with the fewest moves
+    each was reached in) to skip positions it has already searched. Once the
+    cache is full, new positions are searched again when they come up.
+
+    If a pass finds nothing over the bound the whole reachable space has
+    been searched, and the status is "unsolvable"; if max_depth or a policy
+    with drop_unproductive cut lines short it is "exhausted" instead.
+    Positions that a DeadEndDetector finds lost are skipped, which keeps
+    that proof. The game is left in its starting position.
+    """
+    start_time = time.perf_counter()
+    monitor = _Monitor(start_time, time_limit, progress, progress_interval)
+    if instruments is not None:
+        game = instruments.game(game)
+        heuristic = instruments.timed("heuristic", heuristic)
+    check_dead_end = _dead_end_check(dead_ends, instruments)
+    pruned: Counter[DeadEndRule] = Counter()
+    was_tracking_hash = game.track_hash
+    game.track_hash = True
+
+    nodes_expanded = 0
+    peak_frontier = 0
+    states_seen = 0
+    tt_lookups = tt_hits = 0
+    status: SolveStatus = "unsolvable"
+    line: list[GameAction] = []
+    can_prove = policy is None or not policy.drop_unproductive
+
+    def valid_moves() -> list[GameAction]:
+        return game.get_valid_moves() if policy is None else policy.moves(game)
+
+    root = game.get_game_state()
+    bound = heuristic(root)
+    if game.is_auto_solvable():
+        status, bound = "solved", math.inf
+        line = _finishing_moves(game)
+    elif check_dead_end is not None:
+        rule = check_dead_end(root, game.n_draw)
+        if rule is not None:
+            pruned[rule] += 1
+            bound = math.inf
+            can_prove = True
+
+    while bound < math.inf:
+        next_bound = math.inf
+        cache: dict[int, int] = {game.state_hash: 0}
+        cache_get = cache.get
+        if instruments is not None:
+            cache_get = instruments.timed("tt_lookup", cache_get)
+        # One frame per position on the current line: [moves, next move,
+        # record to undo the move into it]
+        frames: list[list] = [[valid_moves(), 0, None]]
+        nodes_expanded += 1
+
+        while frames:
+            if nodes_expanded >= max_nodes:
+                status = "node_limit"
+                break
+            if (
+                monitor.active
+                and nodes_expanded >= monitor.next_check
+                and monitor.out_of_time(
+                    nodes_expanded, states_seen, len(frames), tt_lookups, tt_hits
+                )
+            ):
+                status = "time_limit"
+                break
+
+            frame = frames[-1]
+            moves, next_move = frame[0], frame[1]
+            if next_move == len(moves):
+                frames.pop()
+                if frames:
+                    game.unmake_move(frame[2])
+                    line.pop()
+                continue
+            frame[1] = next_move + 1
+
+            action = moves[next_move]
+            record = game.make_move(action)
+            depth = len(frames)
+            if game.is_auto_solvable():
+                line.append(action)
+                line += _finishing_moves(game)
+                status = "solved"
+                break
+            key = game.state_hash
+            known = cache_get(key)
+            tt_lookups += 1
+            if known is not None and known <= depth:
+                tt_hits += 1
+                game.unmake_move(record)
+                continue
+            if depth >= max_depth:
+                can_prove = False
+                game.unmake_move(record)
+                continue
+            states_seen += 1
+            state = game.get_game_state()
+            if check_dead_end is not None:
+                rule = check_dead_end(state, game.n_draw)
+                if rule is not None:
+                    pruned[rule] += 1
+                    game.unmake_move(record)
+                    continue
+            cost = depth + heuristic(state)
+            if cost > bound:
+                next_bound = min(next_bound, cost)
+                game.unmake_move(record)
+                continue
+            if known is not None or len(cache) < max_states:
+                cache[key] = depth
+
+            line.append(action)
+            frames.append([valid_moves(), 0, record])
+            nodes_expanded += 1
+            peak_frontier = max(peak_frontier, len(frames))
+
+        if status != "unsolvable":
+            # Undo the current line to get back to the starting position
+            if status == "solved":
+                game.unmake_move(record)
+            for frame in reversed(frames[1:]):
+                game.unmake_move(frame[2])
+            break
+        bound = next_bound
+
+    if status == "unsolvable" and not can_prove:
+        status = "exhausted"
+    if status != "solved":
+        line = []
+    game.track_hash = was_tracking_hash
+    monitor.report(nodes_expanded, states_seen, 0, tt_lookups, tt_hits)
+    return SolveResult(
+        status=status,
+        moves=line,
+        nodes_expanded=nodes_expanded,
+        states_seen=states_seen,
+        elapsed=time.perf_counter() - start_time,
+        peak_frontier=peak_frontier,
+        dead_ends=dict(pruned),
+    )
+
+
+def solve_beam(
+    game: SolitaireGame,
+    heuristic: Heuristic = default_heuristic,
+    *,
+    width: int = 1000,
+    max_nodes: int = 1_000_000,
+    time_limit: float | None = None,
+    max_states: int = 100_000,
+    max_depth: int = 1000,
+    policy: MovePolicy | None = None,
+    dead_ends: DeadEndDetector | None = None,
+    instruments: Instruments | None = None,
+    progress: ProgressCallback | None = None,
+    progress_interval: float = 1.0,
+) -> SolveResult:
+    """
+    Beam search: searches one move at a time, keeping only the `width`
+    positions with the best `heuristic` scores from each layer.
+
+    Memory is capped by width and max_states: the states of one layer and
+    its children are held at a time, plus a parent link and an action
+    (5 bytes) per kept position to rebuild the winning line, and a cache of
+    the hashes of the last max_states positions kept, so that positions are
+    not kept again in later layers.
+
+    Beam search can drop the only positions that lead to a win, so when the
+    beam dies out or reaches max_depth the status is "exhausted". It is only
+    "unsolvable" if nothing was ever dropped (no layer was wider than width,
+    the cache never forgot a position and no line was cut short), or if a
+    DeadEndDetector finds the starting position lost. Children it finds
+    lost are never kept. The game is left in its starting position.
+    """
+    start_time = time.perf_counter()
+    monitor = _Monitor(start_time, time_limit, progress, progress_interval)
+    if instruments is not None:
+        game = instruments.game(game)
+        heuristic = instruments.timed("heuristic", heuristic)
+    check_dead_end = _dead_end_check(dead_ends, instruments)
+    pruned: Counter[DeadEndRule] = Counter()
+    was_tracking_hash = game.track_hash
+    game.track_hash = True
+
+    root = game.get_game_state()
+    layer: list[tuple[bytes, int]] = [(root, 0)]
+    parents = array("i", [-1])
+    actions = bytearray([0])
+    seen: dict[int, None] = {game.state_hash: None}
+    in_seen = seen.__contains__
+    if instruments is not None:
+        in_seen = instruments.timed("tt_lookup", in_seen)
+    # children that were already in the cache
+    tt_hits = 0
+
+    nodes_expanded = 0
+    peak_frontier = 1
+    states_seen = 1
+    status: SolveStatus = "unsolvable"
+    winner = -1
+    # Whether the search is still exhaustive: nothing dropped or cut short
+    can_prove = policy is None or not policy.drop_unproductive
+    if game.is_auto_solvable():
+        status, winner = "solved", 0
+        layer = []
+    elif check_dead_end is not None:
+        rule = check_dead_end(root, game.n_draw)
+        if rule is not None:
+            pruned[rule] += 1
+            layer = []
+            can_prove = True
+
+    for _ in range(max_depth):
+        if not layer:
+            break
+        # (score, parent node, action code, state) for each new child
+        children: list[tuple[float, int, int, bytes]] = []
+        for state, node in layer:
+            if nodes_expanded >= max_nodes:
+                status = "node_limit"
+                break
+            if (
+                monitor.active
+                and nodes_expanded >= monitor.next_check
+                and monitor.out_of_time(
+                    nodes_expanded,
+                    states_seen,
+                    len(layer),
+                    states_seen - 1 + tt_hits,
+                    tt_hits,
+                )
+            ):
+                status = "time_limit"
+                break
+            game.set_game_state(state)
+            nodes_expanded += 1
+
+            moves = game.get_valid_moves() if policy is None else policy.moves(game)
+            for action in moves:
+                record = game.make_move(action)
+                key = game.state_hash
+                if in_seen(key):
+                    tt_hits += 1
+                    game.unmake_move(record)
+                    continue
+                seen[key] = None
+                if len(seen) > max_states:
+                    del seen[next(iter(seen))]
+                    can_prove = False
+                states_seen += 1
+                if game.is_auto_solvable():
+                    winner = len(parents)
+                    parents.append(node)
+                    actions.append(action_code(action))
+                    break
+                child = game.get_game_state()
+                game.unmake_move(record)
+                if check_dead_end is not None:
+                    rule = check_dead_end(child, game.n_draw)
+                    if rule is not None:
+                        pruned[rule] += 1
+                        continue
+                children.append((heuristic(child), node, action_code(action), child))
+
+            if winner >= 0:
+                status = "solved"
+                break
+
+        if status != "unsolvable":
+            break
+        peak_frontier = max(peak_frontier, len(children))
+        if len(children) > width:
+            can_prove = False
+        layer = []
+        for _, parent, code, child in heapq.nsmallest(width, children):
+            layer.append((child, len(parents)))
+            parents.append(parent)
+            actions.append(code)
+
+    if status == "unsolvable" and (layer or not can_prove):
+        # Dropped positions, or stopped at max_depth with the beam alive
+        status = "exhausted"
+    moves: list[GameAction] = []
+    node = winner
+    while node > 0:
+        moves.append(ALL_ACTIONS[actions[node]])
+        node = parents[node]
+    moves.reverse()
+
+    game.set_game_state(root)
+    if winner >= 0:
+        for action in moves:
+            game.make_move(action)
+        moves += _finishing_moves(game)
+        game.set_game_state(root)
+    game.track_hash = was_tracking_hash
+    monitor.report(
+        nodes_expanded, states_seen, len(layer), states_seen - 1 + tt_hits, tt_hits
+    )
+    return SolveResult(
+        status=status,
+        moves=moves,
+        nodes_expanded=nodes_expanded,
+        states_seen=states_seen,
+        elapsed=time.perf_counter() - start_time,
+        peak_frontier=peak_frontier,
+        dead_ends=dict(pruned),
+    )
@@ -0,0 +1,163 @@
+"""
+Batches of game states as NumPy arrays, for scoring many states at once.
+
+Each state is packed into one fixed-width row of ROW_WIDTH bytes: the
+get_game_state layout with every pile padded to its largest possible size,
+so that every field sits in the same column of every row. Padding bytes are
+EMPTY, which is neither a card code nor face down.
+
+    column  0       stock length
+            1-24    stock codes
+            25      waste length
+            26-49   waste codes
+            50-53   foundation counts
+            54-193  7 tableau piles of 20 bytes: length, then 19 codes
+                    (bit 6 set if face up)
+
+Needs NumPy, which is an optional dependency: pip install solitaire[numpy].
+"""
+
+from collections.abc import Sequence
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError(
+        "state_array needs NumPy, install it with: pip install solitaire[numpy]"
+    ) from e
+
+EMPTY = 0xFF
+
+STOCK_LEN = 0
+STOCK = slice(1, 25)
+WASTE_LEN = 25
+WASTE = slice(26, 50)
+FOUNDATION = slice(50, 54)
+TABLEAU = 54
+# A tableau pile holds at most 6 face-down cards plus a King-to-Ace run
+PILE_WIDTH = 20
+ROW_WIDTH = TABLEAU + 7 * PILE_WIDTH
+
+_FACE_UP = 0x40
+
+
+# Where each run of the get_game_state layout goes in a row: stock, waste,
+# foundations and the 7 tableau piles
+_RUN_COLUMNS = np.array(
+    [STOCK_LEN, WASTE_LEN, FOUNDATION.start]
+    + [TABLEAU + t_idx * PILE_WIDTH for t_idx in range(7)]
+)
+
+
+def pack_states(states: Sequence[bytes]) -> np.ndarray:
+    """
+    Packs get_game_state bytes into a (len(states), ROW_WIDTH) uint8 array.
+
+    All the states are joined into one buffer and every byte is scattered to
+    its column in a single step. Each state is made of 10 runs (stock and
+    waste with their length bytes, foundations and the piles) that stay
+    contiguous in the row, so only the run lengths have to be read, one run
+    at a time for the whole batch.
+    """
+    count = len(states)
+    buf = np.frombuffer(b"".join(states), dtype=np.uint8)
+    run_lens = np.empty((count, 10), dtype=np.intp)
+    pos = np.zeros(count, dtype=np.intp)
+    np.cumsum(np.fromiter(map(len, states), np.intp, count)[:-1], out=pos[1:])
+    starts = pos.copy()
+    for run in range(10):
+        run_lens[:, run] = 4 if run == 2 else buf[pos] + 1
+        pos += run_lens[:, run]
+
+    run_starts = starts[:, np.newaxis] + np.cumsum(run_lens, axis=1) - run_lens
+    rows = np.arange(0, count * ROW_WIDTH, ROW_WIDTH)[:, np.newaxis]
+    shifts = (rows + _RUN_COLUMNS - run_starts).ravel()
+    packed = np.full(count * ROW_WIDTH, EMPTY, dtype=np.uint8)
+    packed[np.arange(len(buf)) + np.repeat(shifts, run_lens.ravel())] = buf
+    return packed.reshape(count, ROW_WIDTH)
+
+
+def _tableau(batch: np.ndarray) -> np.ndarray:
+    # The tableau codes as a (batch, 7, 19) view, padded with EMPTY
+    return batch[:, TABLEAU:].reshape(-1, 7, PILE_WIDTH)[:, :, 1:]
+
+
+def foundation_cards(batch: np.ndarray) -> np.ndarray:
+    return batch[:, FOUNDATION].sum(axis=1, dtype=np.int32)
+
+
+def face_down_cards(batch: np.ndarray) -> np.ndarray:
+    return (_tableau(batch) < _FACE_UP).sum(axis=(1, 2), dtype=np.int32)
+
+
+def stock_waste_cards(batch: np.ndarray) -> np.ndarray:
+    return batch[:, STOCK_LEN].astype(np.int32) + batch[:, WASTE_LEN]
+
+
+def buried_low_cards(batch: np.ndarray, max_rank: int = 1) -> np.ndarray:
+    """
+    Number of tableau cards of rank max_rank or lower (only Aces by default)
+    that have another card on top of them.
+    """
+    tableau = _tableau(batch)
+    codes = tableau & 0x3F
+    pile_lens = batch[:, TABLEAU::PILE_WIDTH][:, :7]
+    covered = np.arange(tableau.shape[2]) < pile_lens[:, :, np.newaxis] - 1
+    is_low = (tableau != EMPTY) & ((codes & 0xF) < max_rank)
+    return (is_low & covered).sum(axis=(1, 2), dtype=np.int32)
+
+
+# Tableau codes without the face-up bit, with EMPTY moved to a suit of its own
+_SUIT_CODES = np.array([code & 0x3F for code in range(EMPTY)] + [0x40], np.uint8)
+
+
+def blocked_cards(batch: np.ndarray) -> np.ndarray:
+    """
+    Number of tableau cards that lie on top of a lower card of the same suit,
+    and so cannot reach the foundations until they are moved off.
+    """
+    width = int(batch[:, TABLEAU::PILE_WIDTH].max(initial=0))
+    # One row per position in the piles (bottom card first) across the batch.
+    # Within a suit a lower code is a lower rank.
+    positions = np.ascontiguousarray(
+        _SUIT_CODES[_tableau(batch)[:, :, :width]].reshape(len(batch) * 7, width).T
+    )
+    piles = positions.shape[1]
+    # Lowest code seen so far in each pile, per suit and for the padding
+    lowest = np.full(piles * 5, 0xFF, dtype=np.uint8)
+    pile_slots = np.arange(0, piles * 5, 5)
+    blocked = np.zeros(piles, dtype=np.int32)
+    for codes in positions:
+        slots = pile_slots + (codes >> 4)
+        below = lowest[slots]
+        blocked += codes > below
+        lowest[slots] = np.minimum(below, codes)
+    return blocked.reshape(-1, 7).sum(axis=1)
+
+
+def cards_remaining(batch: np.ndarray) -> np.ndarray:
+    # solver.cards_remaining for every row
+    return (52 - foundation_cards(batch)).astype(np.float64)
+
+
+def default_heuristic(batch: np.ndarray) -> np.ndarray:
+    # solver.default_heuristic for every row
+    return (
+        52
+        - foundation_cards(batch)
+        + 2 * face_down_cards(batch)
+        + blocked_cards(batch)
+        + stock_waste_cards(batch) * 0.5
+    )
+
+
+def batch_cards_remaining(states: Sequence[bytes]) -> np.ndarray:
+    return cards_remaining(pack_states(states))
+
+
+def batch_default_heuristic(states: Sequence[bytes]) -> np.ndarray:
+    """
+    solver.default_heuristic for a list of states in one call; can be passed
+    to solve as its batch_heuristic.
+    """
+    return default_heuristic(pack_states(states))
@@ -0,0 +1,103 @@
+from typing import Self
+
+from deck import CARD_FROM_CODE, TABLEAU_ENTRY_FROM_CODE, Card
+
+_FACE_UP = 0x40
+
+
+class StateView:
+    """
+    Read-only view of a game state (as returned by get_game_state) for
+    scoring states without decoding them.
+
+    Only the offsets of the piles are worked out when a state is loaded.
+    Everything else is read from the bytes when asked for: piles come back as
+    memoryview slices of card codes, and single cards as the interned Cards
+    from deck, so no per-card objects are ever created. A view can be
+    pointed at another state with load(), so one view can score a whole
+    frontier.
+    """
+
+    __slots__ = ("_foundation", "_pile_starts", "data", "stock_len", "waste_len")
+
+    def __init__(self, state: bytes | memoryview | None = None) -> None:
+        self.data = memoryview(b"")
+        self.stock_len = 0
+        self.waste_len = 0
+        self._foundation = 0
+        self._pile_starts = [0] * 7
+        if state is not None:
+            self.load(state)
+
+    def load(self, state: bytes | memoryview) -> Self:
+        data = self.data = memoryview(state)
+        self.stock_len = data[0]
+        idx = self.stock_len + 1
+        self.waste_len = data[idx]
+        idx += self.waste_len + 1
+        self._foundation = idx
+        idx += 4
+        pile_starts = self._pile_starts
+        for t_idx in range(7):
+            pile_starts[t_idx] = idx + 1
+            idx += data[idx] + 1
+        return self
+
+    # Stock and waste
+
+    def stock(self) -> memoryview:
+        start = 1
+        return self.data[start : start + self.stock_len]
+
+    def waste(self) -> memoryview:
+        start = self.stock_len + 2
+        return self.data[start : start + self.waste_len]
+
+    def waste_top(self) -> Card | None:
+        if not self.waste_len:
+            return None
+        return CARD_FROM_CODE[self.data[self.stock_len + 1 + self.waste_len]]
+
+    # Foundations, indexed by suit - 1 as in SolitaireGame.foundation
+
+    def foundation_count(self, f_idx: int) -> int:
+        return self.data[self._foundation + f_idx]
+
+    def foundation_counts(self) -> memoryview:
+        return self.data[self._foundation : self._foundation + 4]
+
+    def cards_on_foundations(self) -> int:
+        return sum(self.foundation_counts())
+
+    # Tableau
+
+    def pile_offset(self, t_idx: int) -> int:
+        # Offset in the state bytes of the bottom card of the pile
+        return self._pile_starts[t_idx]
+
+    def pile_len(self, t_idx: int) -> int:
+        return self.data[self._pile_starts[t_idx] - 1]
+
+    def pile(self, t_idx: int) -> memoryview:
+        # The tableau codes of the pile, bottom card first (bit 6 set if face up)
+        start = self._pile_starts[t_idx]
+        return self.data[start : start + self.data[start - 1]]
+
+    def face_down_count(self, t_idx: int) -> int:
+        data = self.data
+        start = self._pile_starts[t_idx]
+        end = start + data[start - 1]
+        for idx in range(start, end):
+            if data[idx] & _FACE_UP:
+                return idx - start
+        return end - start
+
+    def face_down_total(self) -> int:
+        return sum(self.face_down_count(t_idx) for t_idx in range(7))
+
+    def top_card(self, t_idx: int) -> tuple[Card, bool] | None:
+        start = self._pile_starts[t_idx]
+        pile_len = self.data[start - 1]
+        if not pile_len:
+            return None
+        return TABLEAU_ENTRY_FROM_CODE[self.data[start + pile_len - 1]]
@@ -0,0 +1,24 @@
+# Positions shared by the tests, as get_game_state bytes
+
+from solitaire_game import GameAction, SolitaireGame
+
+H, C, D, S = 0x00, 0x10, 0x20, 0x30
+UP = 0x40
+
+# Spades can never be played out, as the ace is under the two, and the rest
+# of the deck is missing: the position is lost, after a hundred or so states
+LOST_STATE = (
+    bytes([6, H | 12, S | 11, H | 10, C | 9, D | 4, D | 8, 0, 0, 0, 0, 0])
+    + bytes([2, S | 0, S | 1 | UP])
+    + bytes(6)
+)
+
+
+def wins(game: SolitaireGame, moves: list[GameAction]) -> bool:
+    """Whether playing `moves` from the position of `game` wins it."""
+    state = game.get_game_state()
+    for action in moves:
+        game.make_move(action)
+    won = game.is_game_won()
+    game.set_game_state(state)
+    return won
@@ -0,0 +1,100 @@
+import random
+import unittest
+
+from solitaire_game import SolitaireGame
+from tests.positions import LOST_STATE, UP, C, D, H, S
+
+# The foundation kinds of move, plus drawing: what auto_finish_moves may use
+_FINISHING = ("tf", "wf", "s")
+
+
+def _hearts_position(rng: random.Random, top: int, waste_len: int) -> bytes:
+    # Every suit but hearts is on the foundations. The hearts from `top` up
+    # are in a tableau pile, King at the bottom and only the top card face
+    # up, and the rest are shuffled into the stock and the waste.
+    loose = [H | rank for rank in range(top)]
+    rng.shuffle(loose)
+    stock, waste = loose[waste_len:], loose[:waste_len]
+    pile = [H | rank for rank in range(12, top - 1, -1)]
+    if pile:
+        pile[-1] |= UP
+    return (
+        bytes([len(stock), *stock, len(waste), *waste, 0, 13, 13, 13])
+        + bytes([len(pile), *pile])
+        + bytes(6)
+    )
+
+
+def _finishable(game: SolitaireGame) -> bool:
+    # Exhaustive search over the moves auto_finish_moves may use
+    seen = set()
+    todo = [game.get_game_state()]
+    while todo:
+        state = todo.pop()
+        if state in seen:
+            continue
+        seen.add(state)
+        game.set_game_state(state)
+        if sum(map(len, game.foundation)) == 52:
+            return True
+        for action in game.get_valid_moves():
+            if action[0] in _FINISHING:
+                record = game.make_move(action)
+                todo.append(game.get_game_state())
+                game.unmake_move(record)
+    return False
+
+
+class AutoFinishTest(unittest.TestCase):
+    def test_finished_game_needs_no_moves(self):
+        game = SolitaireGame.from_state(bytes([0, 0, 13, 13, 13, 13]) + bytes(7))
+        self.assertEqual(game.auto_finish_moves(), [])
+        self.assertTrue(game.is_auto_solvable())
+        self.assertTrue(game.is_game_won())
+
+    def test_cards_out_of_order_cannot_be_finished(self):
+        game = SolitaireGame.from_state(LOST_STATE, n_draw=1)
+        self.assertIsNone(game.auto_finish_moves())
+        self.assertFalse(game.is_auto_solvable())
+        self.assertFalse(game.is_game_won())
+
+    def test_face_down_cards_in_order_can_be_finished(self):
+        # Each suit in its own pile, King at the bottom and Ace on top
+        piles = b"".join(
+            bytes([13, *(suit | rank for rank in range(12, 0, -1)), suit | UP])
+            for suit in (H, C, D, S)
+        )
+        game = SolitaireGame.from_state(bytes(6) + piles + bytes(3))
+        self.assertTrue(game.is_auto_solvable())
+        # is_game_won only takes the cheap check, which needs every card face up
+        self.assertFalse(game.is_game_won())
+        moves = game.auto_finish_moves()
+        self.assertEqual(len(moves), 52)
+        for action in moves:
+            game.make_move(action)
+        self.assertEqual(list(map(len, game.foundation)), [13] * 4)
+
+    def test_matches_an_exhaustive_search(self):
+        rng = random.Random(12)
+        results = set()
+        for n_draw in (1, 3):
+            for _ in range(60):
+                top = rng.randrange(4, 14)
+                state = _hearts_position(rng, top, rng.randrange(top + 1))
+                game = SolitaireGame.from_state(state, n_draw)
+                moves = game.auto_finish_moves()
+                results.add(moves is not None)
+                self.assertEqual(moves is not None, _finishable(game), state)
+                if moves is None:
+                    continue
+                game.set_game_state(state)
+                for action in moves:
+                    self.assertIn(action, game.get_valid_moves())
+                    game.make_move(action)
+                self.assertEqual(list(map(len, game.foundation)), [13] * 4)
+        # Both outcomes came up
+        self.assertEqual(results, {False, True})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import json
+import tempfile
+import unittest
+from dataclasses import replace
+from pathlib import Path
+
+from batch import BatchConfig, _init_worker, finished_deals, run_batch, solve_deal
+from solitaire_game import SolitaireGame
+from tests.positions import LOST_STATE
+
+CONFIG = BatchConfig(n_draw=1, max_nodes=200, time_limit=None)
+
+
+class FinishedDealsTest(unittest.TestCase):
+    def test_json_lines_with_a_partial_last_line(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "results.jsonl"
+            lines = [
+                json.dumps({"seed": 1, "n_draw": 3, "status": "solved"}),
+                json.dumps({"seed": 1, "n_draw": 1, "status": "node_limit"}),
+                '{"seed": 2, "n_dr',
+            ]
+            path.write_text("\n".join(lines))
+            self.assertEqual(finished_deals(path), {(1, 3), (1, 1)})
+            self.assertEqual(path.read_text(), "\n".join(lines[:2]) + "\n")
+
+    def test_csv(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "results.csv"
+            path.write_text("seed,n_draw,status\n4,3,solved\n5,1,exhausted\n")
+            self.assertEqual(finished_deals(path), {(4, 3), (5, 1)})
+
+    def test_missing_file(self):
+        self.assertEqual(finished_deals("/nonexistent/results.jsonl"), set())
+
+
+class RunBatchTest(unittest.TestCase):
+    def test_resume_by_seed_and_n_draw(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("results.jsonl", "results.csv"):
+                path = Path(tmp) / name
+                first = list(run_batch(range(3), path, CONFIG, workers=1))
+                self.assertEqual(sorted(r["seed"] for r in first), [0, 1, 2])
+                again = list(run_batch(range(4), path, CONFIG, workers=1))
+                self.assertEqual([r["seed"] for r in again], [3])
+                # The same seeds with another n_draw are new deals
+                draw_3 = BatchConfig(n_draw=3, max_nodes=200, time_limit=None)
+                other = list(run_batch(range(2), path, draw_3, workers=1))
+                self.assertEqual(sorted(r["seed"] for r in other), [0, 1])
+                self.assertEqual(
+                    finished_deals(path),
+                    {(0, 1), (1, 1), (2, 1), (3, 1), (0, 3), (1, 3)},
+                )
+
+    def test_records(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "results.jsonl"
+            config = BatchConfig(n_draw=1, max_nodes=50_000, time_limit=None)
+            (record,) = run_batch([2], path, config, workers=1)
+            self.assertEqual(record["status"], "solved")
+            self.assertEqual(path.read_text(), json.dumps(record) + "\n")
+            game = SolitaireGame(n_draw=1, seed=2)
+            for action in record["moves"]:
+                game.make_move(action)
+            self.assertTrue(game.is_game_won())
+
+
+class SolveDealTest(unittest.TestCase):
+    def test_default_search_proves_losses(self):
+        # solve_deal takes a deal as its initial state, so a lost position
+        # can stand in for one
+        self.addCleanup(_init_worker, BatchConfig())
+        _init_worker(CONFIG)
+        self.assertEqual(solve_deal((0, LOST_STATE))[1], "unsolvable")
+        _init_worker(replace(CONFIG, drop_unproductive=True))
+        self.assertEqual(solve_deal((0, LOST_STATE))[1], "exhausted")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import contextlib
+import io
+import json
+import unittest
+
+import bench
+from compact_game import CompactSolitaireGame
+
+
+def _result(name: str, ops_per_sec: float) -> bench.BenchResult:
+    return bench.BenchResult(name, 1, ops_per_sec, 0.0, 0.0, 0.0, 0, 0)
+
+
+class BenchTest(unittest.TestCase):
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(bench._percentile(values, 50), 50)
+        self.assertEqual(bench._percentile(values, 90), 90)
+        self.assertEqual(bench._percentile(values, 99), 99)
+        self.assertEqual(bench._percentile([3.0], 99), 3.0)
+
+    def test_measure(self):
+        calls = []
+        result = bench.measure("append", lambda: calls.append(0), ops=4, rounds=5)
+        # A warm-up round, the timed rounds and a round under tracemalloc
+        self.assertEqual(len(calls), 7)
+        self.assertEqual(result.ops, 4)
+        self.assertLessEqual(result.p50, result.p90)
+        self.assertLessEqual(result.p90, result.p99)
+        self.assertAlmostEqual(result.ops_per_sec, 1 / result.p50)
+
+    def test_game_benchmarks_run(self):
+        positions = bench.sample_positions(10)
+        self.assertEqual(positions, bench.sample_positions(10))
+        results = bench.bench_game(positions, CompactSolitaireGame, rounds=2)
+        for result in results:
+            self.assertTrue(result.name.startswith("CompactSolitaireGame."))
+            self.assertGreater(result.ops_per_sec, 0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            bench.print_results(results)
+
+    def test_compare_flags_regressions(self):
+        baseline = json.loads(
+            json.dumps(bench.to_json([_result("a", 100), _result("b", 100)]))
+        )
+        results = [_result("a", 95), _result("b", 80), _result("c", 1)]
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(bench.compare(results, baseline), ["b"])
+        self.assertIn("b: -20.0%  REGRESSION", out.getvalue())
+        baseline["format"] = bench.FORMAT_VERSION + 1
+        with self.assertRaises(ValueError):
+            bench.compare(results, baseline)
+
+
+if __name__ == "__main__":
+    unittest.main()
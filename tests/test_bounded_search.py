@@ -0,0 +1,58 @@
+import unittest
+
+from move_policy import MovePolicy
+from solitaire_game import SolitaireGame
+from solver import solve, solve_beam, solve_ida
+from tests.positions import LOST_STATE, wins
+
+
+def _near_the_win(moves_left: int = 20) -> SolitaireGame:
+    # IDA* with cards_remaining needs far too many passes for a whole deal, so
+    # the bounded searches start where a best-first line has a few moves left
+    game = SolitaireGame(n_draw=1, seed=2)
+    for action in solve(game, max_nodes=5000).moves[:-moves_left]:
+        game.make_move(action)
+    return game
+
+
+class IdaTest(unittest.TestCase):
+    def test_winning_line_replays(self):
+        game = _near_the_win()
+        start = game.get_game_state()
+        result = solve_ida(game, max_nodes=5000, policy=MovePolicy())
+        self.assertEqual(result.status, "solved")
+        self.assertEqual(game.get_game_state(), start)
+        self.assertTrue(wins(game, result.moves))
+
+    def test_full_search_proves_a_loss(self):
+        game = SolitaireGame.from_state(LOST_STATE, n_draw=1)
+        self.assertEqual(solve_ida(game).status, "unsolvable")
+
+    def test_cut_search_is_not_a_proof(self):
+        game = SolitaireGame.from_state(LOST_STATE, n_draw=1)
+        self.assertEqual(solve_ida(game, max_depth=3).status, "exhausted")
+        policy = MovePolicy(drop_unproductive=True)
+        self.assertEqual(solve_ida(game, policy=policy).status, "exhausted")
+
+
+class BeamTest(unittest.TestCase):
+    def test_winning_line_replays(self):
+        game = _near_the_win()
+        start = game.get_game_state()
+        result = solve_beam(game, width=200, max_nodes=5000)
+        self.assertEqual(result.status, "solved")
+        self.assertEqual(game.get_game_state(), start)
+        self.assertTrue(wins(game, result.moves))
+
+    def test_full_beam_proves_a_loss(self):
+        game = SolitaireGame.from_state(LOST_STATE, n_draw=1)
+        self.assertEqual(solve_beam(game).status, "unsolvable")
+
+    def test_dropped_positions_are_not_a_proof(self):
+        game = SolitaireGame.from_state(LOST_STATE, n_draw=1)
+        self.assertEqual(solve_beam(game, width=1).status, "exhausted")
+        self.assertEqual(solve_beam(game, max_depth=3).status, "exhausted")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import random
+import unittest
+
+from compact_game import CompactSolitaireGame
+from solitaire_game import SolitaireGame
+from solver import solve
+
+
+class CompactGameTest(unittest.TestCase):
+    def assertSameGame(self, compact: CompactSolitaireGame, game: SolitaireGame):
+        self.assertEqual(compact.get_game_state(), game.get_game_state())
+        self.assertEqual(
+            compact.get_game_state(canonical=True), game.get_game_state(canonical=True)
+        )
+        self.assertEqual(compact.canonical_pile_order(), game.canonical_pile_order())
+        self.assertEqual(compact.state_hash, game.state_hash)
+        self.assertEqual(compact.auto_finish_moves(), game.auto_finish_moves())
+        self.assertEqual(compact.tableau, game.tableau)
+        self.assertEqual(compact.foundation, game.foundation)
+        self.assertEqual(compact.stock, game.stock)
+        self.assertEqual(compact.waste, game.waste)
+
+    def test_random_lines_match_solitaire_game(self):
+        rng = random.Random(7)
+        for n_draw in (1, 3):
+            for seed in range(4):
+                with self.subTest(n_draw=n_draw, seed=seed):
+                    game = SolitaireGame(n_draw=n_draw, track_hash=True, seed=seed)
+                    compact = CompactSolitaireGame(n_draw, track_hash=True, seed=seed)
+                    self.assertEqual(compact.deal, game.deal)
+                    records = []
+                    for _ in range(250):
+                        self.assertSameGame(compact, game)
+                        moves = game.get_valid_moves()
+                        self.assertEqual(compact.get_valid_moves(), moves)
+                        if not moves:
+                            break
+                        action = rng.choice(moves)
+                        records.append(
+                            (compact.make_move(action), game.make_move(action))
+                        )
+                    for compact_record, record in reversed(records):
+                        compact.unmake_move(compact_record)
+                        game.unmake_move(record)
+                        self.assertSameGame(compact, game)
+
+    def test_states_load_into_either_class(self):
+        rng = random.Random(8)
+        game = SolitaireGame(n_draw=3, seed=11)
+        for _ in range(200):
+            state = game.get_game_state()
+            compact = CompactSolitaireGame.from_state(state, n_draw=3)
+            self.assertSameGame(compact, game)
+            compact.set_game_state(state)
+            self.assertEqual(compact.get_game_state(), state)
+            game.make_move(rng.choice(game.get_valid_moves()))
+
+    def test_solve_searches_the_same_tree(self):
+        game = SolitaireGame(n_draw=1, seed=4)
+        compact = CompactSolitaireGame(n_draw=1, seed=4)
+        result = solve(game, max_nodes=5000)
+        compact_result = solve(compact, max_nodes=5000)
+        self.assertEqual(compact_result.status, "solved")
+        self.assertEqual(compact_result.moves, result.moves)
+        self.assertEqual(compact_result.nodes_expanded, result.nodes_expanded)
+
+
+if __name__ == "__main__":
+    unittest.main()
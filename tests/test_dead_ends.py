@@ -0,0 +1,97 @@
+import random
+import unittest
+
+from dead_ends import DeadEndDetector, _stock_masks
+from solitaire_game import SolitaireGame
+from solver import solve
+from tests.positions import LOST_STATE, UP, C, D, H, S
+
+
+def _position(piles: list[list[int]]) -> bytes:
+    # The given tableau piles, with the rest of the deck in the stock and the
+    # waste, so that with n_draw=1 every other card comes up
+    used = {code & 0x3F for pile in piles for code in pile}
+    rest = [suit | rank for suit in (H, C, D, S) for rank in range(13)]
+    rest = [code for code in rest if code not in used]
+    stock, waste = rest[:24], rest[24:]
+    state = bytes([len(stock), *stock, len(waste), *waste, 0, 0, 0, 0])
+    piles = piles + [[]] * (7 - len(piles))
+    return state + b"".join(bytes([len(pile), *pile]) for pile in piles)
+
+
+def _waste_tops(stock: bytes, waste: bytes, n_draw: int) -> set[int]:
+    # The cards that come to the top of the waste when only drawing
+    state = bytes([len(stock), *stock, len(waste), *waste, 0, 0, 0, 0]) + bytes(7)
+    game = SolitaireGame.from_state(state, n_draw)
+    seen = set()
+    tops = set()
+    while game.get_game_state() not in seen:
+        seen.add(game.get_game_state())
+        if game.waste:
+            tops.add((game.waste[-1].suit - 1) << 4 | game.waste[-1].rank - 1)
+        game.make_move(("s", ()))
+    return tops
+
+
+class DeadEndTest(unittest.TestCase):
+    def test_pile_blocking_itself(self):
+        # The four of hearts has to leave before the ace under it can, but
+        # both black fives are under it too
+        state = _position([[H | 0, C | 4, S | 4, H | 3 | UP]])
+        self.assertEqual(DeadEndDetector().check(state, 1), "self_block")
+        state = _position([[H | 0, C | 4, H | 3 | UP]])
+        self.assertIsNone(DeadEndDetector().check(state, 1))
+
+    def test_piles_blocking_each_other(self):
+        # Each two is on the red or black threes it could go on, and on the
+        # ace the other two needs
+        blocked = [[H | 0, H | 2, D | 2, C | 1 | UP], [C | 0, S | 2, C | 2, H | 1 | UP]]
+        self.assertEqual(DeadEndDetector().check(_position(blocked), 1), "cross_block")
+        blocked[1].remove(C | 2)
+        self.assertIsNone(DeadEndDetector().check(_position(blocked), 1))
+
+    def test_stock_cards_that_come_up(self):
+        rng = random.Random(13)
+        codes = [suit | rank for suit in (H, C, D, S) for rank in range(13)]
+        for n_draw in (1, 2, 3):
+            for _ in range(50):
+                cards = bytes(rng.sample(codes, rng.randrange(1, 25)))
+                split = rng.randrange(len(cards) + 1)
+                stock, waste = cards[:split], cards[split:]
+                reached, unreached = _stock_masks(stock, waste, n_draw)
+                tops = _waste_tops(stock, waste, n_draw)
+                self.assertEqual(reached, sum(1 << code for code in tops))
+                self.assertEqual(reached | unreached, sum(1 << code for code in cards))
+
+    def test_winning_lines_are_never_pruned(self):
+        detector = DeadEndDetector()
+        for n_draw, seed in ((1, 2), (1, 4), (1, 5), (3, 4)):
+            game = SolitaireGame(n_draw=n_draw, seed=seed)
+            for action in solve(game, max_nodes=5000).moves:
+                self.assertIsNone(detector.check(game.get_game_state(), n_draw))
+                game.make_move(action)
+
+    def test_memoised_results_match_a_fresh_detector(self):
+        rng = random.Random(14)
+        shared = DeadEndDetector(max_entries=50)
+        for seed in range(40):
+            n_draw = 1 + seed % 2 * 2
+            game = SolitaireGame(n_draw=n_draw, seed=seed)
+            for _ in range(100):
+                state = game.get_game_state()
+                self.assertEqual(
+                    shared.check(state, n_draw), DeadEndDetector().check(state, n_draw)
+                )
+                game.make_move(rng.choice(game.get_valid_moves()))
+
+    def test_pruned_search_keeps_its_result(self):
+        detector = DeadEndDetector()
+        game = SolitaireGame.from_state(LOST_STATE, n_draw=1)
+        self.assertEqual(solve(game, dead_ends=detector).status, "unsolvable")
+        game = SolitaireGame(n_draw=1, seed=2)
+        result = solve(game, max_nodes=5000, dead_ends=detector)
+        self.assertEqual(result.status, "solved")
+
+
+if __name__ == "__main__":
+    unittest.main()
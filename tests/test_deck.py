@@ -0,0 +1,79 @@
+import pickle
+import unittest
+
+from deck import (
+    CARD_CODES,
+    CARD_FROM_CODE,
+    CARDS,
+    TABLEAU_ENTRY_FROM_CODE,
+    Card,
+    Deck,
+    generate_deals,
+    is_valid_deal,
+    shuffled_deal,
+)
+from solitaire_game import SolitaireGame
+
+
+class DealTest(unittest.TestCase):
+    def test_seeded_deals_are_deterministic(self):
+        self.assertEqual(shuffled_deal(5), shuffled_deal(5))
+        self.assertNotEqual(shuffled_deal(5), shuffled_deal(6))
+        self.assertTrue(is_valid_deal(shuffled_deal()))
+        self.assertEqual(Deck.from_seed(5).deal_id(), shuffled_deal(5))
+        self.assertEqual(
+            SolitaireGame(seed=5).get_game_state(),
+            SolitaireGame(deal=shuffled_deal(5)).get_game_state(),
+        )
+
+    def test_generate_deals_matches_shuffled_deal(self):
+        deals = list(generate_deals(20, start_seed=100))
+        self.assertEqual(deals, [shuffled_deal(seed) for seed in range(100, 120)])
+
+    def test_invalid_deals_are_rejected(self):
+        deal = shuffled_deal(1)
+        self.assertFalse(is_valid_deal(deal[:51]))
+        self.assertFalse(is_valid_deal(deal[:51] + deal[:1]))
+        self.assertFalse(is_valid_deal(deal[:51] + bytes([0x0F])))
+        with self.assertRaises(ValueError):
+            SolitaireGame(deal=deal[1:] + deal[1:2])
+        with self.assertRaises(ValueError):
+            Deck.from_permutation(deal[:51])
+        with self.assertRaises(ValueError):
+            SolitaireGame(seed=1, deal=deal)
+
+    def test_deck_attribute_is_deprecated(self):
+        game = SolitaireGame(seed=5)
+        with self.assertWarns(DeprecationWarning):
+            deck = game.deck
+        # As before, every card has been dealt from it
+        self.assertTrue(deck.is_empty())
+        self.assertEqual(Deck.from_permutation(game.deal).deal_id(), shuffled_deal(5))
+
+
+class CardTest(unittest.TestCase):
+    def test_cards_are_interned(self):
+        self.assertEqual(len(CARDS), 52)
+        for card in CARDS:
+            self.assertIs(Card(card.rank, card.suit), card)
+            self.assertIs(CARD_FROM_CODE[CARD_CODES[card]], card)
+            self.assertIs(pickle.loads(pickle.dumps(card)), card)
+            face_up = TABLEAU_ENTRY_FROM_CODE[CARD_CODES[card] | 0x40]
+            self.assertEqual(face_up, (card, True))
+            self.assertIs(face_up[0], card)
+        with self.assertRaises(ValueError):
+            Card(14, 1)
+        with self.assertRaises(ValueError):
+            Card(1, 0)
+
+    def test_decoded_states_reuse_the_interned_cards(self):
+        game = SolitaireGame(n_draw=1, seed=3)
+        stock, waste, _, tableau = game.read_game_state(game.get_game_state())
+        cards = stock + waste + [card for t_pile in tableau for card, _ in t_pile]
+        self.assertEqual(len(cards), 52)
+        for card in cards:
+            self.assertIs(card, CARDS[(card.suit - 1) * 13 + card.rank - 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
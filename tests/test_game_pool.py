@@ -0,0 +1,111 @@
+import random
+import unittest
+
+from compact_game import CompactSolitaireGame
+from game_pool import GamePool
+from solitaire_game import EMPTY_STATE, SolitaireGame
+
+_GAME_CLASSES = (SolitaireGame, CompactSolitaireGame)
+
+
+def _played(game_class, seed: int, moves: int = 40):
+    # A tracked game, some random moves into a deal
+    rng = random.Random(seed)
+    game = game_class(n_draw=3, track_hash=True, seed=seed)
+    for _ in range(moves):
+        game.make_move(rng.choice(game.get_valid_moves()))
+    return game
+
+
+class CloneTest(unittest.TestCase):
+    def assertSamePosition(self, copy, game):
+        self.assertIs(type(copy), type(game))
+        self.assertEqual(copy.get_game_state(), game.get_game_state())
+        self.assertEqual(copy.state_hash, game.state_hash)
+        self.assertEqual(
+            (copy.n_draw, copy.track_hash, copy.deal),
+            (game.n_draw, game.track_hash, game.deal),
+        )
+
+    def test_clone_is_independent(self):
+        for game_class in _GAME_CLASSES:
+            with self.subTest(game_class=game_class.__name__):
+                game = _played(game_class, 15)
+                state = game.get_game_state()
+                copy = game.clone()
+                self.assertSamePosition(copy, game)
+                for action in copy.get_valid_moves():
+                    record = copy.make_move(action)
+                    self.assertEqual(game.get_game_state(), state)
+                    self.assertEqual(copy.state_hash, copy._compute_hash())
+                    copy.unmake_move(record)
+                game.make_move(game.get_valid_moves()[0])
+                self.assertEqual(copy.get_game_state(), state)
+
+    def test_copy_from_reuses_the_piles(self):
+        for game_class in _GAME_CLASSES:
+            with self.subTest(game_class=game_class.__name__):
+                game = _played(game_class, 16)
+                target = game_class(n_draw=1, seed=17)
+                piles = target.tableau if game_class is SolitaireGame else target._piles
+                target.copy_from(game)
+                self.assertSamePosition(target, game)
+                after = target.tableau if game_class is SolitaireGame else target._piles
+                self.assertTrue(all(old is new for old, new in zip(piles, after)))
+                game.make_move(game.get_valid_moves()[0])
+                self.assertNotEqual(target.get_game_state(), game.get_game_state())
+
+
+class GamePoolTest(unittest.TestCase):
+    def test_released_games_are_reused(self):
+        for game_class in _GAME_CLASSES:
+            with self.subTest(game_class=game_class.__name__):
+                pool = GamePool(n_draw=1, size=2, game_class=game_class)
+                self.assertEqual((len(pool), pool.created), (2, 2))
+                state = _played(game_class, 18).get_game_state()
+                first = pool.acquire(state)
+                second = pool.acquire(state)
+                third = pool.acquire(state)
+                self.assertEqual((pool.created, pool.reused), (3, 2))
+                for game in (first, second, third):
+                    self.assertIsInstance(game, game_class)
+                    self.assertEqual(game.get_game_state(), state)
+                    self.assertEqual(game.n_draw, 1)
+                pool.release(first)
+                self.assertIs(pool.acquire(), first)
+                self.assertEqual(first.get_game_state(), EMPTY_STATE)
+
+    def test_reused_games_take_the_pool_settings(self):
+        pool = GamePool(n_draw=3, track_hash=True)
+        game = _played(CompactSolitaireGame, 19)
+        game.n_draw = 1
+        game.track_hash = False
+        pool.release(game)
+        state = _played(CompactSolitaireGame, 20).get_game_state()
+        reused = pool.acquire(state)
+        self.assertIs(reused, game)
+        self.assertEqual((reused.n_draw, reused.track_hash), (3, True))
+        self.assertEqual(reused.state_hash, reused._compute_hash())
+
+    def test_clone_and_borrowed(self):
+        pool = GamePool(n_draw=3, size=1)
+        game = _played(CompactSolitaireGame, 21)
+        copy = pool.clone(game)
+        self.assertEqual(copy.get_game_state(), game.get_game_state())
+        self.assertEqual(copy.state_hash, game.state_hash)
+        self.assertEqual(pool.clone(game).get_game_state(), game.get_game_state())
+        self.assertEqual((pool.created, pool.reused), (2, 1))
+        with pool.borrowed(game.get_game_state()) as borrowed:
+            self.assertEqual(len(pool), 0)
+        self.assertEqual(len(pool), 1)
+        self.assertIs(pool.acquire(), borrowed)
+
+    def test_at_most_max_free_games_are_kept(self):
+        pool = GamePool(max_free=2)
+        for game in [pool.acquire() for _ in range(4)]:
+            pool.release(game)
+        self.assertEqual(len(pool), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from hints import HintEngine
+from move_policy import MovePolicy
+from solitaire_game import SolitaireGame
+from tests.positions import LOST_STATE
+
+
+def _follow_hints(engine: HintEngine, game: SolitaireGame) -> list[bool]:
+    # Plays hints until the game is won, returning whether each was cached
+    cached = []
+    while not game.is_game_won():
+        hint = engine.hint(game)
+        if hint.action is None:
+            raise AssertionError(f"No hint ({hint.status})")
+        cached.append(hint.cached)
+        game.make_move(hint.action)
+    return cached
+
+
+class HintEngineTest(unittest.TestCase):
+    def test_following_hints_wins_from_the_cache(self):
+        engine = HintEngine(1)
+        game = SolitaireGame(n_draw=1, seed=2)
+        start = game.get_game_state()
+        hint = engine.hint(game)
+        self.assertEqual(hint.status, "solved")
+        self.assertFalse(hint.cached)
+        self.assertEqual(game.get_game_state(), start)
+        self.assertEqual(engine.line(game)[0], hint.action)
+        cached = _follow_hints(engine, game)
+        self.assertTrue(all(cached))
+        self.assertEqual(engine.searches, 1)
+
+    def test_small_cache_still_wins(self):
+        # Lines are kept whole when a generation is dropped, so following
+        # them never needs another search
+        engine = HintEngine(1, max_entries=8)
+        for seed in (2, 9, 2):
+            game = SolitaireGame(n_draw=1, seed=seed)
+            self.assertLessEqual(_follow_hints(engine, game).count(False), 1)
+
+    def test_other_n_draw(self):
+        with self.assertRaises(ValueError):
+            HintEngine(3).hint(SolitaireGame(n_draw=1, seed=2))
+
+    def test_proven_loss_is_remembered(self):
+        engine = HintEngine(1)
+        game = SolitaireGame.from_state(LOST_STATE, n_draw=1)
+        self.assertEqual(engine.hint(game).status, "unsolvable")
+        hint = engine.lookup(game)
+        self.assertIsNotNone(hint)
+        self.assertEqual((hint.action, hint.status), (None, "unsolvable"))
+
+    def test_unproven_results_are_not_remembered(self):
+        game = SolitaireGame.from_state(LOST_STATE, n_draw=1)
+        # This policy can miss wins, so running out of moves is no proof
+        lossy = MovePolicy(drop_unproductive=True)
+        engine = HintEngine(1, policy=lossy, dead_ends=False)
+        self.assertEqual(engine.hint(game).status, "exhausted")
+        self.assertIsNone(engine.lookup(game))
+        engine = HintEngine(1, max_nodes=5)
+        game = SolitaireGame(n_draw=1, seed=0)
+        self.assertEqual(engine.hint(game).status, "node_limit")
+        self.assertIsNone(engine.lookup(game))
+        self.assertEqual(len(engine), 0)
+
+    def test_default_policy(self):
+        self.assertEqual(HintEngine().policy, MovePolicy())
+        every_move = MovePolicy(False, False, False, False)
+        self.assertEqual(HintEngine(policy=every_move).policy, every_move)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from instrument import Instruments
+from solitaire_game import SolitaireGame
+from solver import solve, solve_beam, solve_dfs, solve_ida
+from transposition import TranspositionTable
+
+
+def _solve_dfs(game: SolitaireGame, **kwargs):
+    return solve_dfs(game, TranspositionTable(), **kwargs)
+
+
+class InstrumentsTest(unittest.TestCase):
+    def test_timed_counts_every_call(self):
+        instruments = Instruments()
+        fail = instruments.timed("fail", lambda: 1 / 0)
+        double = instruments.timed("double", lambda x: 2 * x)
+        self.assertEqual(double(4), 8)
+        double(5)
+        with self.assertRaises(ZeroDivisionError):
+            fail()
+        self.assertEqual(instruments.calls, {"double": 2, "fail": 1})
+        self.assertIn("double", instruments.report())
+        instruments.reset()
+        self.assertFalse(instruments.calls or instruments.seconds)
+
+    def test_instruments_do_not_change_the_search(self):
+        for search in (solve, solve_ida, solve_beam, _solve_dfs):
+            with self.subTest(search=search.__name__):
+                game = SolitaireGame(n_draw=1, seed=2)
+                start = game.get_game_state()
+                plain = search(game, max_nodes=3000)
+                instruments = Instruments()
+                result = search(game, max_nodes=3000, instruments=instruments)
+                self.assertEqual(result.status, "solved")
+                self.assertEqual(result.moves, plain.moves)
+                self.assertEqual(result.nodes_expanded, plain.nodes_expanded)
+                self.assertEqual(game.get_game_state(), start)
+                self.assertFalse(game.track_hash)
+                calls = instruments.calls
+                self.assertEqual(calls["get_valid_moves"], result.nodes_expanded)
+                self.assertEqual(
+                    calls["make_move"], sum(instruments.move_kinds.values())
+                )
+
+    def test_progress_reports(self):
+        for search in (solve, solve_ida, solve_beam, _solve_dfs):
+            with self.subTest(search=search.__name__):
+                reports = []
+                game = SolitaireGame(n_draw=1, seed=2)
+                result = search(
+                    game, max_nodes=3000, progress=reports.append, progress_interval=0
+                )
+                self.assertTrue(reports)
+                nodes = [report.nodes_expanded for report in reports]
+                self.assertEqual(nodes, sorted(nodes))
+                self.assertLessEqual(nodes[-1], result.nodes_expanded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import random
+import unittest
+
+from macro_moves import DRAW, expand_macros, macro_moves, make_macro, unmake_macro
+from solitaire_game import SolitaireGame
+
+
+def _random_positions(n_draw: int, count: int, seed: int) -> list[bytes]:
+    # Positions met while playing random moves from several deals
+    rng = random.Random(seed)
+    positions = []
+    for deal_seed in range(count):
+        game = SolitaireGame(n_draw=n_draw, seed=deal_seed)
+        for _ in range(rng.randrange(60)):
+            game.make_move(rng.choice(game.get_valid_moves()))
+        positions.append(game.get_game_state())
+    return positions
+
+
+def _waste_plays(game: SolitaireGame) -> set[bytes]:
+    # Every position reached by drawing at least once and then playing the
+    # waste card, found by drawing round the whole stock twice
+    start = game.get_game_state()
+    cards = len(game.stock) + len(game.waste)
+    found = set()
+    for _ in range(2 * (cards + 1)):
+        if not (game.stock or game.waste):
+            break
+        game.make_move(DRAW)
+        for action in game.get_valid_moves():
+            if action[0] in ("wf", "wt"):
+                record = game.make_move(action)
+                found.add(game.get_game_state())
+                game.unmake_move(record)
+    game.set_game_state(start)
+    return found
+
+
+class MacroMovesTest(unittest.TestCase):
+    def test_macros_reach_every_waste_play(self):
+        for n_draw in (1, 3):
+            for state in _random_positions(n_draw, 20, seed=n_draw):
+                game = SolitaireGame.from_state(state, n_draw)
+                reached = set()
+                for macro in macro_moves(game):
+                    records = make_macro(game, macro)
+                    if macro[0]:
+                        reached.add(game.get_game_state())
+                    unmake_macro(game, records)
+                    self.assertEqual(game.get_game_state(), state)
+                # Playing the current waste card needs no draws, and can
+                # also be reached by drawing round to it again
+                plain = set()
+                for action in game.get_valid_moves():
+                    if action[0] in ("wf", "wt"):
+                        record = game.make_move(action)
+                        plain.add(game.get_game_state())
+                        game.unmake_move(record)
+                self.assertEqual(reached, _waste_plays(game) - plain)
+
+    def test_tableau_colours(self):
+        # A red six goes on the black seven, not on the red one
+        game = SolitaireGame.from_state(
+            bytes([1, 0x05, 0, 0, 0, 0, 0])
+            + bytes([1, 0x06 | 0x40, 1, 0x16 | 0x40])
+            + bytes(5),
+            n_draw=1,
+        )
+        self.assertEqual(macro_moves(game), [(1, ("wt", (1,)))])
+
+    def test_expand_macros(self):
+        macros = [(2, ("wt", (3,))), (0, ("tf", (1,)))]
+        self.assertEqual(
+            expand_macros(macros), [DRAW, DRAW, ("wt", (3,)), ("tf", (1,))]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from bench import reference_valid_moves, sample_positions
+from solitaire_game import SolitaireGame
+
+
+class GetValidMovesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.positions = sample_positions(60)
+
+    def test_same_moves_as_the_reference(self):
+        for state in self.positions:
+            game = SolitaireGame.from_state(state)
+            moves = game.get_valid_moves()
+            self.assertEqual(len(moves), len(set(moves)), "duplicate moves")
+            self.assertEqual(
+                {(kind, args[:2]) for kind, args in moves},
+                set(reference_valid_moves(game)),
+            )
+
+    def test_tableau_moves_take_a_face_up_run_that_fits(self):
+        for state in self.positions:
+            game = SolitaireGame.from_state(state)
+            for kind, args in game.get_valid_moves():
+                if kind != "tt":
+                    continue
+                from_idx, to_idx, num_cards = args
+                pile = game.tableau[from_idx]
+                self.assertTrue(all(up for _, up in pile[-num_cards:]))
+                card = pile[-num_cards][0]
+                self.assertTrue(game.is_valid_tableau_move(card, to_idx))
+                record = game.make_move((kind, args))
+                self.assertEqual(game.tableau[to_idx][-num_cards][0], card)
+                game.unmake_move(record)
+                self.assertEqual(game.get_game_state(), state)
+
+    def test_short_tableau_move_takes_the_deepest_run(self):
+        for state in self.positions:
+            game = SolitaireGame.from_state(state)
+            for kind, args in game.get_valid_moves():
+                if kind == "tt":
+                    long = game.make_move((kind, args[:2]))
+                    after = game.get_game_state()
+                    game.unmake_move(long)
+                    deepest = max(
+                        a[2]
+                        for k, a in game.get_valid_moves()
+                        if k == kind and a[:2] == args[:2]
+                    )
+                    record = game.make_move((kind, (*args[:2], deepest)))
+                    self.assertEqual(game.get_game_state(), after)
+                    game.unmake_move(record)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import random
+import unittest
+
+from deck import Card
+from move_policy import MovePolicy, is_safe_to_foundation
+from solitaire_game import SolitaireGame
+from solver import solve
+from tests.positions import LOST_STATE, wins
+
+
+class SafeToFoundationTest(unittest.TestCase):
+    def test_aces_and_twos_are_always_safe(self):
+        for suit in range(1, 5):
+            self.assertTrue(is_safe_to_foundation(Card(1, suit), [0, 0, 0, 0]))
+            self.assertTrue(is_safe_to_foundation(Card(2, suit), [1, 0, 1, 0]))
+
+    def test_card_is_safe_once_nothing_can_need_it(self):
+        # The five of hearts holds a black four, which could hold the three of
+        # diamonds
+        counts = [4, 4, 3, 4]
+        self.assertTrue(is_safe_to_foundation(Card(5, 1), counts))
+        for suit in (2, 3, 4):
+            short = counts.copy()
+            short[suit - 1] -= 1
+            self.assertFalse(is_safe_to_foundation(Card(5, 1), short))
+
+
+class MovePolicyTest(unittest.TestCase):
+    def test_policy_moves_are_valid_moves(self):
+        rng = random.Random(9)
+        plain = MovePolicy(False, False, False, False)
+        order_only = MovePolicy(False, False, False, True)
+        policy = MovePolicy(drop_unproductive=True)
+        game = SolitaireGame(n_draw=1, seed=12)
+        for _ in range(300):
+            moves = game.get_valid_moves()
+            if not moves:
+                break
+            self.assertEqual(plain.moves(game), moves)
+            self.assertCountEqual(order_only.moves(game), moves)
+            self.assertLessEqual(set(policy.moves(game)), set(moves))
+            game.make_move(rng.choice(moves))
+
+    def test_auto_move_is_the_only_move(self):
+        game = SolitaireGame(n_draw=1, seed=2)
+        while not any(action[0] in ("wf", "tf") for action in game.get_valid_moves()):
+            game.make_move(("s", ()))
+        moves = MovePolicy().moves(game)
+        self.assertEqual(len(moves), 1)
+        self.assertIn(moves[0][0], ("wf", "tf"))
+
+    def test_dominance_pruning_keeps_the_proof(self):
+        game = SolitaireGame.from_state(LOST_STATE, n_draw=1)
+        self.assertEqual(solve(game, policy=MovePolicy()).status, "unsolvable")
+        policy = MovePolicy(drop_unproductive=True)
+        self.assertEqual(solve(game, policy=policy).status, "exhausted")
+
+    def test_policy_solves_replay(self):
+        for n_draw, seed in ((1, 2), (3, 4)):
+            with self.subTest(n_draw=n_draw, seed=seed):
+                game = SolitaireGame(n_draw=n_draw, seed=seed)
+                result = solve(game, max_nodes=5000, policy=MovePolicy())
+                self.assertEqual(result.status, "solved")
+                self.assertTrue(wins(game, result.moves))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import tempfile
+import unittest
+
+from deck import shuffled_deal
+from replay import (
+    STATUSES,
+    ReplayReader,
+    ReplayWriter,
+    decode_record,
+    encode_record,
+    verify_file,
+    verify_record,
+)
+from solitaire_game import ACTION_CODES, ALL_ACTIONS, SolitaireGame, action_code
+from solver import solve
+
+
+class ActionCodeTest(unittest.TestCase):
+    def test_every_action_fits_in_a_byte(self):
+        self.assertLessEqual(len(ALL_ACTIONS), 256)
+        self.assertEqual(len(ACTION_CODES), len(ALL_ACTIONS))
+        for code, action in enumerate(ALL_ACTIONS):
+            self.assertEqual(action_code(action), code)
+
+    def test_tableau_moves_drop_the_card_count(self):
+        self.assertEqual(ALL_ACTIONS[action_code(("tt", (2, 5, 3)))], ("tt", (2, 5)))
+
+
+class RecordTest(unittest.TestCase):
+    def setUp(self):
+        game = SolitaireGame(n_draw=1, seed=2)
+        self.moves = solve(game, max_nodes=5000).moves
+
+    def test_records_round_trip(self):
+        for status in STATUSES:
+            with self.subTest(status=status):
+                data = encode_record(self.moves, 1, seed=2, status=status)
+                self.assertEqual(len(data), 12 + len(self.moves))
+                record = decode_record(data, 0)
+                self.assertEqual((record.seed, record.stored_deal), (2, None))
+                self.assertEqual(record.status, status)
+                self.assertEqual(record.codes, bytes(map(action_code, self.moves)))
+                self.assertEqual(record.deal, shuffled_deal(2))
+                self.assertTrue(verify_record(record))
+
+    def test_stored_deal_round_trips(self):
+        data = encode_record(self.moves, 1, deal=shuffled_deal(2))
+        record = decode_record(b"xx" + data, 2)
+        self.assertEqual((record.seed, record.stored_deal), (None, shuffled_deal(2)))
+        self.assertTrue(verify_record(record))
+
+    def test_bad_lines_fail_verification(self):
+        self.assertFalse(
+            verify_record(decode_record(encode_record(self.moves, 3, seed=2), 0))
+        )
+        self.assertFalse(
+            verify_record(decode_record(encode_record(self.moves[:-1], 1, seed=2), 0))
+        )
+        self.assertFalse(
+            verify_record(decode_record(encode_record(bytes([255]), 1, seed=2), 0))
+        )
+
+    def test_invalid_records_are_rejected(self):
+        with self.assertRaises(ValueError):
+            encode_record(self.moves, 1)
+        with self.assertRaises(ValueError):
+            encode_record(self.moves, 1, seed=2, deal=shuffled_deal(2))
+        with self.assertRaises(ValueError):
+            encode_record(self.moves, 1, deal=bytes(52))
+
+    def test_unknown_status_code(self):
+        record = bytearray(encode_record(self.moves, 1, seed=2))
+        for code in range(len(STATUSES), 8):
+            record[0] = record[0] & 0x8F | code << 4
+            with self.assertRaises(ValueError):
+                decode_record(record, 0)
+
+
+class ReplayFileTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "results.rply")
+        self.lines = {}
+        for seed in (2, 4, 5):
+            game = SolitaireGame(n_draw=1, seed=seed)
+            self.lines[seed] = solve(game, max_nodes=5000).moves
+
+    def _write(self, writer: ReplayWriter):
+        for seed, moves in self.lines.items():
+            writer.write(moves, 1, seed=seed)
+        writer.write(b"", 1, seed=0, status="exhausted")
+
+    def assertRecords(self):
+        with ReplayReader(self.path) as reader:
+            self.assertEqual(len(reader), 4)
+            self.assertEqual([record.seed for record in reader], [2, 4, 5, 0])
+            self.assertEqual(reader[1].codes, bytes(map(action_code, self.lines[4])))
+            self.assertEqual(reader[3].status, "exhausted")
+        self.assertEqual(verify_file(self.path), [])
+
+    def test_indexed_file(self):
+        with ReplayWriter(self.path) as writer:
+            self._write(writer)
+        self.assertRecords()
+
+    def test_unindexed_file_is_scanned(self):
+        writer = ReplayWriter(self.path)
+        self._write(writer)
+        writer._file.flush()
+        size = os.path.getsize(self.path)
+        # A record cut short by a killed writer is ignored
+        with open(self.path, "ab") as f:
+            f.write(encode_record(self.lines[2], 1, seed=9)[:20])
+        self.assertRecords()
+        writer._file.truncate(size)
+        writer.close()
+        self.assertRecords()
+
+    def test_append_keeps_the_old_records(self):
+        with ReplayWriter(self.path) as writer:
+            writer.write(self.lines[2], 1, seed=2)
+            writer.write(self.lines[4], 1, seed=4)
+        with ReplayWriter(self.path, append=True) as writer:
+            self.assertEqual(len(writer), 2)
+            writer.write(self.lines[5], 1, seed=5)
+            writer.write(b"", 1, seed=0, status="exhausted")
+        self.assertRecords()
+
+    def test_not_a_replay_file(self):
+        for data in (b"", b"not a replay file"):
+            with open(self.path, "wb") as f:
+                f.write(data)
+            with self.assertRaises(ValueError):
+                ReplayReader(self.path)
+            with self.assertRaises(ValueError):
+                ReplayWriter(self.path, append=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import random
+import unittest
+
+from rollout import greedy_policy, playout, random_policy, rollouts
+from solitaire_game import SolitaireGame
+from tests.positions import LOST_STATE, UP, C, D, H, S
+
+
+class RolloutTest(unittest.TestCase):
+    def test_seeded_rollouts_repeat(self):
+        state = SolitaireGame(n_draw=3, seed=5).get_game_state()
+        for policy in (greedy_policy, random_policy):
+            first = rollouts(state, 20, policy=policy, seed=1)
+            second = rollouts(state, 20, policy=policy, seed=1)
+            self.assertEqual(first.playouts, 20)
+            self.assertEqual(
+                (first.wins, first.total_depth), (second.wins, second.total_depth)
+            )
+            self.assertGreater(first.average_depth, 0)
+
+    def test_playout_ends_in_its_final_position(self):
+        game = SolitaireGame(n_draw=1, seed=2)
+        rng = random.Random(3)
+        wins = 0
+        for _ in range(20):
+            game.reset_game(2)
+            won, depth = playout(game, greedy_policy, rng)
+            self.assertEqual(won, game.is_auto_solvable())
+            self.assertLessEqual(depth, 1000)
+            wins += won
+        self.assertGreater(wins, 0)
+
+    def test_lost_position_stalls(self):
+        game = SolitaireGame.from_state(LOST_STATE, n_draw=1)
+        stats = rollouts(LOST_STATE, 10, n_draw=1, policy=random_policy, seed=0)
+        self.assertEqual(stats.wins, 0)
+        self.assertEqual(stats.win_rate, 0.0)
+        self.assertFalse(playout(game, random_policy, random.Random(0))[0])
+
+    def test_stalled_playout_takes_the_exact_check(self):
+        # Each suit in its own pile, King at the bottom and Ace on top, and a
+        # policy that never moves: the playout stalls at once in a position
+        # that finishes by itself
+        piles = b"".join(
+            bytes([13, *(suit | rank for rank in range(12, 0, -1)), suit | UP])
+            for suit in (H, C, D, S)
+        )
+        game = SolitaireGame.from_state(bytes(6) + piles + bytes(3))
+        self.assertEqual(playout(game, lambda game, rng: None), (True, 0))
+
+    def test_game_must_match_n_draw(self):
+        state = SolitaireGame(n_draw=3, seed=5).get_game_state()
+        game = SolitaireGame.from_state(state, n_draw=3)
+        self.assertEqual(rollouts(state, 2, n_draw=3, seed=1, game=game).playouts, 2)
+        with self.assertRaises(ValueError):
+            rollouts(state, 2, n_draw=1, game=game)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from server import (
+    GameServer,
+    ServerConfig,
+    format_action,
+    parse_command,
+    percentile,
+)
+from solitaire_game import SolitaireGame
+
+
+class HelpersTest(unittest.TestCase):
+    def test_commands_round_trip(self):
+        game = SolitaireGame(seed=3)
+        for action in game.get_valid_moves():
+            kind, args = parse_command(format_action(action))
+            self.assertEqual(kind, action[0])
+            self.assertEqual(args, action[1][:2])
+
+    def test_bad_commands(self):
+        for command in ("", "xx", "wt", "tt 1", "ft 1 2 3", 5, None):
+            with self.assertRaises(ValueError):
+                parse_command(command)
+
+    def test_percentile(self):
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([7.0], 90), 7.0)
+
+
+class ProtocolTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = GameServer(ServerConfig(max_live_games=2, solver_workers=1))
+        self.tmp = tempfile.TemporaryDirectory()
+        path = str(Path(self.tmp.name) / "server.sock")
+        self.listener = await asyncio.start_unix_server(self.server.handle, path)
+        self.reader, self.writer = await asyncio.open_unix_connection(path)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.listener.close()
+        await self.listener.wait_closed()
+        self.server.shutdown()
+        self.tmp.cleanup()
+
+    async def request(self, line: bytes | dict) -> dict:
+        if isinstance(line, dict):
+            line = json.dumps(line).encode()
+        self.writer.write(line + b"\n")
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def test_game(self):
+        response = await self.request({"op": "new", "n_draw": 1, "seed": 4, "id": 9})
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["id"], 9)
+        session = response["session"]
+        moves = (await self.request({"op": "moves", "session": session}))["moves"]
+        response = await self.request(
+            {"op": "move", "session": session, "command": moves[0]}
+        )
+        self.assertEqual(response, {"ok": True, "won": False})
+        response = await self.request(
+            {"op": "move", "session": session, "command": "tt 1 1"}
+        )
+        self.assertEqual(response, {"ok": False, "error": "Not a valid move"})
+        self.assertTrue((await self.request({"op": "close", "session": session}))["ok"])
+        response = await self.request({"op": "show", "session": session})
+        self.assertFalse(response["ok"])
+
+    async def test_saved_sessions_keep_their_state(self):
+        sessions = []
+        for seed in range(4):
+            response = await self.request({"op": "new", "seed": seed})
+            sessions.append(response["session"])
+        for seed, session in enumerate(sessions):
+            response = await self.request({"op": "show", "session": session})
+            expected = SolitaireGame(seed=seed).get_game_state().hex()
+            self.assertEqual(response["state"], expected)
+
+    async def test_bad_n_draw(self):
+        for n_draw in (0, 4, 10**9):
+            response = await self.request({"op": "new", "n_draw": n_draw})
+            self.assertFalse(response["ok"])
+            self.assertIn("n_draw", response["error"])
+        self.assertEqual(self.server.sessions.n_draws, {})
+
+    async def test_bad_requests(self):
+        for line in (b"not json", b"[1]", b'{"id": 1}', b'{"op": "fly"}'):
+            self.assertFalse((await self.request(line))["ok"])
+
+    async def test_requests_of_the_wrong_type(self):
+        session = (await self.request({"op": "new", "seed": 1}))["session"]
+        for request in (
+            {"op": ["x"], "id": 3},
+            {"op": {"a": 1}, "id": 3},
+            {"op": "move", "session": session, "command": 5, "id": 3},
+            {"op": "move", "session": session, "command": ["s"], "id": 3},
+        ):
+            response = await self.request(request)
+            self.assertFalse(response["ok"])
+            self.assertEqual(response["id"], 3)
+            self.assertIn("error", response)
+        # The connection still answers
+        self.assertTrue((await self.request({"op": "stats"}))["ok"])
+
+    async def test_oversized_line(self):
+        response = await self.request(
+            b'{"op": "stats", "x": "' + b"a" * 200_000 + b'"}'
+        )
+        self.assertEqual(response, {"ok": False, "error": "Request too long"})
+        # The connection is still usable, and answers in step
+        response = await self.request({"op": "stats", "id": 2})
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["id"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
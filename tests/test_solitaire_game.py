@@ -0,0 +1,111 @@
+import random
+import unittest
+
+from solitaire_game import SolitaireGame, map_action_piles
+from solver import solve
+from tests.positions import wins
+
+
+def _random_line(game: SolitaireGame, rng: random.Random, length: int):
+    # Plays up to `length` random moves, yielding the state before each move
+    # and the record make_move gave for it
+    for _ in range(length):
+        moves = game.get_valid_moves()
+        if not moves:
+            return
+        state = game.get_game_state()
+        yield state, game.make_move(rng.choice(moves))
+
+
+class MakeUnmakeTest(unittest.TestCase):
+    def test_unmake_restores_every_position_of_a_line(self):
+        rng = random.Random(2)
+        for n_draw in (1, 3):
+            for seed in range(5):
+                with self.subTest(n_draw=n_draw, seed=seed):
+                    game = SolitaireGame(n_draw=n_draw, seed=seed)
+                    line = list(_random_line(game, rng, 300))
+                    for state, record in reversed(line):
+                        game.unmake_move(record)
+                        self.assertEqual(game.get_game_state(), state)
+
+    def test_unmake_takes_back_each_move(self):
+        rng = random.Random(3)
+        game = SolitaireGame(n_draw=3, seed=1)
+        for _ in _random_line(game, rng, 100):
+            state = game.get_game_state()
+            for action in game.get_valid_moves():
+                record = game.make_move(action)
+                game.unmake_move(record)
+                self.assertEqual(game.get_game_state(), state)
+
+
+class ZobristTest(unittest.TestCase):
+    def test_tracked_hash_matches_a_fresh_hash(self):
+        rng = random.Random(4)
+        for n_draw in (1, 3):
+            game = SolitaireGame(n_draw=n_draw, track_hash=True, seed=n_draw)
+            line = []
+            for _, record in _random_line(game, rng, 300):
+                line.append(record)
+                fresh = SolitaireGame.from_state(game.get_game_state(), n_draw)
+                self.assertEqual(game.state_hash, fresh.state_hash)
+            for record in reversed(line):
+                game.unmake_move(record)
+                self.assertEqual(game.state_hash, game._compute_hash())
+
+    def test_track_hash_can_be_switched_on(self):
+        game = SolitaireGame(n_draw=1, seed=5)
+        untracked = game.state_hash
+        game.track_hash = True
+        self.assertEqual(game.state_hash, untracked)
+        game.make_move(game.get_valid_moves()[0])
+        self.assertNotEqual(game.state_hash, untracked)
+        self.assertEqual(game.state_hash, game._compute_hash())
+
+    def test_set_game_state_recomputes_the_hash(self):
+        game = SolitaireGame(n_draw=1, track_hash=True, seed=6)
+        other = SolitaireGame(n_draw=1, track_hash=True, seed=7)
+        game.set_game_state(other.get_game_state())
+        self.assertEqual(game.state_hash, other.state_hash)
+
+
+class CanonicalTest(unittest.TestCase):
+    def test_pile_order_does_not_change_the_encoding(self):
+        rng = random.Random(5)
+        game = SolitaireGame(n_draw=3, seed=8)
+        for _ in _random_line(game, rng, 150):
+            shuffled = game.clone()
+            rng.shuffle(shuffled.tableau)
+            self.assertEqual(
+                shuffled.get_game_state(canonical=True),
+                game.get_game_state(canonical=True),
+            )
+
+    def test_mapped_actions_match_the_canonical_board(self):
+        rng = random.Random(6)
+        game = SolitaireGame(n_draw=1, seed=9)
+        for _ in _random_line(game, rng, 150):
+            order = game.canonical_pile_order()
+            board = SolitaireGame.from_state(game.get_game_state(canonical=True), 1)
+            for c_idx, t_idx in enumerate(order):
+                self.assertEqual(board.tableau[c_idx], game.tableau[t_idx])
+            for action in board.get_valid_moves():
+                record = board.make_move(action)
+                real = game.make_move(map_action_piles(action, order))
+                self.assertEqual(
+                    game.get_game_state(canonical=True),
+                    board.get_game_state(canonical=True),
+                )
+                game.unmake_move(real)
+                board.unmake_move(record)
+
+    def test_canonical_solve_replays_on_the_real_board(self):
+        game = SolitaireGame(n_draw=1, seed=4)
+        result = solve(game, max_nodes=5000, canonical=True)
+        self.assertEqual(result.status, "solved")
+        self.assertTrue(wins(game, result.moves))
+
+
+if __name__ == "__main__":
+    unittest.main()
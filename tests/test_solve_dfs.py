@@ -0,0 +1,81 @@
+import unittest
+
+from move_policy import MovePolicy
+from solitaire_game import GameAction, SolitaireGame
+from solver import solve_dfs
+from tests.positions import LOST_STATE, wins
+from transposition import TranspositionTable
+
+
+class RecordingGame(SolitaireGame):
+    # Records the state_hash of every position whose moves are generated,
+    # i.e. every state that solve_dfs expands
+    def get_valid_moves(self) -> list[GameAction]:
+        self.expanded.append(self.state_hash)
+        return super().get_valid_moves()
+
+
+def _recording_game(seed: int, n_draw: int) -> RecordingGame:
+    game = RecordingGame(n_draw=n_draw, seed=seed)
+    game.expanded = []
+    return game
+
+
+class ResumeTest(unittest.TestCase):
+    def test_second_run_skips_states_of_the_first(self):
+        game = _recording_game(seed=0, n_draw=1)
+        table = TranspositionTable()
+        first = solve_dfs(game, table, max_nodes=3000)
+        self.assertEqual(first.status, "node_limit")
+        explored = set(game.expanded)
+        size = len(table)
+        game.expanded = []
+        second = solve_dfs(game, table, max_nodes=3000)
+        self.assertEqual(second.status, "node_limit")
+        # Only the line the first run was stopped in is searched again
+        self.assertLessEqual(
+            len(explored.intersection(game.expanded)), first.peak_frontier
+        )
+        self.assertGreaterEqual(len(table) - size, 3000 - first.peak_frontier)
+
+    def test_resumed_runs_find_the_win(self):
+        # One run needs about 24k nodes for this deal
+        game = SolitaireGame(n_draw=1, seed=11)
+        start = game.get_game_state()
+        table = TranspositionTable()
+        for _ in range(15):
+            result = solve_dfs(game, table, max_nodes=3000, policy=MovePolicy())
+            if result.status != "node_limit":
+                break
+        self.assertEqual(result.status, "solved")
+        self.assertEqual(game.get_game_state(), start)
+        self.assertTrue(wins(game, result.moves))
+
+    def test_resumed_runs_prove_a_loss(self):
+        game = SolitaireGame.from_state(LOST_STATE, n_draw=1)
+        self.assertEqual(solve_dfs(game, TranspositionTable()).status, "unsolvable")
+        table = TranspositionTable()
+        runs = 0
+        while (result := solve_dfs(game, table, max_nodes=50)).status == "node_limit":
+            runs += 1
+            self.assertLess(runs, 20)
+        self.assertGreater(runs, 0)
+        self.assertEqual(result.status, "unsolvable")
+        self.assertEqual(game.get_game_state(), LOST_STATE)
+        # A finished search is not repeated
+        self.assertEqual(solve_dfs(game, table).nodes_expanded, 0)
+
+    def test_depth_cut_is_not_a_proof(self):
+        game = SolitaireGame.from_state(LOST_STATE, n_draw=1)
+        result = solve_dfs(game, TranspositionTable(), max_depth=3)
+        self.assertEqual(result.status, "exhausted")
+        table = TranspositionTable()
+        while (result := solve_dfs(game, table, max_nodes=10, max_depth=3)).status == (
+            "node_limit"
+        ):
+            pass
+        self.assertEqual(result.status, "exhausted")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from solitaire_game import SolitaireGame
+from solver import cards_remaining, solve
+from tests.positions import LOST_STATE, wins
+
+
+class SolveTest(unittest.TestCase):
+    def test_winning_lines_replay(self):
+        for n_draw, seed in ((1, 2), (1, 4), (1, 5), (3, 4)):
+            with self.subTest(n_draw=n_draw, seed=seed):
+                game = SolitaireGame(n_draw=n_draw, seed=seed)
+                start = game.get_game_state()
+                result = solve(game, max_nodes=5000)
+                self.assertEqual(result.status, "solved")
+                self.assertEqual(game.get_game_state(), start)
+                self.assertTrue(wins(game, result.moves))
+
+    def test_exhausted_frontier_proves_a_loss(self):
+        game = SolitaireGame.from_state(LOST_STATE, n_draw=1)
+        result = solve(game)
+        self.assertEqual(result.status, "unsolvable")
+        self.assertEqual(result.moves, [])
+        self.assertEqual(result.states_seen, result.nodes_expanded)
+        astar = solve(game, cards_remaining, g_weight=1.0)
+        self.assertEqual(astar.status, "unsolvable")
+        self.assertEqual(astar.states_seen, result.states_seen)
+
+    def test_node_limit(self):
+        game = SolitaireGame(n_draw=1, seed=0)
+        result = solve(game, max_nodes=100)
+        self.assertEqual(result.status, "node_limit")
+        self.assertFalse(result.solved)
+        self.assertEqual(result.nodes_expanded, 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
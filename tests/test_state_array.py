@@ -0,0 +1,83 @@
+import random
+import unittest
+
+from solitaire_game import SolitaireGame
+from solver import cards_remaining, default_heuristic, solve
+from tests.positions import wins
+
+try:
+    import state_array
+except ImportError:
+    state_array = None
+
+
+def _random_states(seed: int, n_draw: int, count: int) -> list[bytes]:
+    rng = random.Random(seed)
+    game = SolitaireGame(n_draw=n_draw, seed=seed)
+    states = []
+    for _ in range(count):
+        states.append(game.get_game_state())
+        game.make_move(rng.choice(game.get_valid_moves()))
+    return states
+
+
+def _padded(state: bytes) -> bytes:
+    # The packed row of a state, one field at a time
+    view = memoryview(state)
+    stock_len = view[0]
+    row = bytearray(view[: stock_len + 1]).ljust(25, b"\xff")
+    waste_len = view[stock_len + 1]
+    idx = stock_len + 1
+    row += bytes(view[idx : idx + waste_len + 1]).ljust(25, b"\xff")
+    idx += waste_len + 1
+    row += view[idx : idx + 4]
+    idx += 4
+    for _ in range(7):
+        row += bytes(view[idx : idx + view[idx] + 1]).ljust(20, b"\xff")
+        idx += view[idx] + 1
+    return bytes(row)
+
+
+@unittest.skipIf(state_array is None, "needs NumPy")
+class StateArrayTest(unittest.TestCase):
+    def test_rows_hold_the_padded_fields(self):
+        states = _random_states(15, 3, 200)
+        batch = state_array.pack_states(states)
+        self.assertEqual(batch.shape, (200, state_array.ROW_WIDTH))
+        for row, state in zip(batch, states):
+            self.assertEqual(row.tobytes(), _padded(state))
+
+    def test_batch_scores_match_the_scalar_heuristics(self):
+        for n_draw in (1, 3):
+            states = _random_states(16 + n_draw, n_draw, 300)
+            self.assertEqual(
+                state_array.batch_default_heuristic(states).tolist(),
+                [default_heuristic(state) for state in states],
+            )
+            self.assertEqual(
+                state_array.batch_cards_remaining(states).tolist(),
+                [cards_remaining(state) for state in states],
+            )
+
+    def test_buried_low_cards(self):
+        for state in _random_states(18, 1, 100):
+            game = SolitaireGame.from_state(state, n_draw=1)
+            buried = sum(
+                card.rank <= 2 for t_pile in game.tableau for card, _ in t_pile[:-1]
+            )
+            packed = state_array.pack_states([state])
+            self.assertEqual(state_array.buried_low_cards(packed, 2)[0], buried)
+
+    def test_batch_heuristic_solve_replays(self):
+        game = SolitaireGame(n_draw=1, seed=2)
+        result = solve(
+            game,
+            max_nodes=20_000,
+            batch_heuristic=state_array.batch_default_heuristic,
+        )
+        self.assertEqual(result.status, "solved")
+        self.assertTrue(wins(game, result.moves))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import random
+import unittest
+
+from deck import CARD_CODES
+from solitaire_game import SolitaireGame
+from solver import cards_remaining, default_heuristic
+from state_view import StateView
+
+
+def _reference_heuristic(game: SolitaireGame) -> float:
+    # default_heuristic worked out from the piles of the game
+    score = 52 - sum(map(len, game.foundation))
+    for t_pile in game.tableau:
+        lowest_rank = {}
+        for card, is_face_up in t_pile:
+            if not is_face_up:
+                score += 2
+            if card.rank > lowest_rank.get(card.suit, 14):
+                score += 1
+            else:
+                lowest_rank[card.suit] = card.rank
+    return score + (len(game.stock) + len(game.waste)) * 0.5
+
+
+class StateViewTest(unittest.TestCase):
+    def test_view_agrees_with_the_decoded_piles(self):
+        rng = random.Random(10)
+        view = StateView()
+        game = SolitaireGame(n_draw=3, seed=13)
+        for _ in range(300):
+            view.load(game.get_game_state())
+            self.assertEqual(
+                bytes(view.stock()), bytes(map(CARD_CODES.get, game.stock))
+            )
+            self.assertEqual(
+                bytes(view.waste()), bytes(map(CARD_CODES.get, game.waste))
+            )
+            self.assertEqual(view.waste_top(), game.waste[-1] if game.waste else None)
+            self.assertEqual(
+                list(view.foundation_counts()), list(map(len, game.foundation))
+            )
+            self.assertEqual(
+                view.cards_on_foundations(), sum(map(len, game.foundation))
+            )
+            face_down = 0
+            for t_idx, t_pile in enumerate(game.tableau):
+                self.assertEqual(view.pile_len(t_idx), len(t_pile))
+                self.assertEqual(
+                    list(view.pile(t_idx)),
+                    [CARD_CODES[card] | up << 6 for card, up in t_pile],
+                )
+                self.assertEqual(view.top_card(t_idx), t_pile[-1] if t_pile else None)
+                pile_down = sum(1 for _, up in t_pile if not up)
+                self.assertEqual(view.face_down_count(t_idx), pile_down)
+                face_down += pile_down
+            self.assertEqual(view.face_down_total(), face_down)
+            game.make_move(rng.choice(game.get_valid_moves()))
+
+    def test_heuristics_agree_with_the_piles(self):
+        rng = random.Random(11)
+        game = SolitaireGame(n_draw=1, seed=14)
+        for _ in range(300):
+            state = game.get_game_state()
+            self.assertEqual(default_heuristic(state), _reference_heuristic(game))
+            self.assertEqual(
+                cards_remaining(state), 52 - sum(map(len, game.foundation))
+            )
+            game.make_move(rng.choice(game.get_valid_moves()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from transposition import DiskTable, TranspositionTable
+
+
+def _random_entries(count: int, seed: int = 0) -> dict[int, int]:
+    rng = random.Random(seed)
+    return {rng.getrandbits(64) | 1: rng.getrandbits(64) for _ in range(count)}
+
+
+class DiskTableTest(unittest.TestCase):
+    def test_grows_keeping_every_entry(self):
+        entries = _random_entries(5000)
+        table = DiskTable(capacity=16)
+        for key, value in entries.items():
+            table[key] = value
+        self.assertGreaterEqual(table.capacity, 8192)
+        self.assertEqual(len(table), len(entries))
+        self.assertEqual(dict(table.items()), entries)
+        for key, value in entries.items():
+            self.assertEqual(table.get(key), value)
+        table.close()
+
+    def test_file_survives_growth_and_reopening(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "table.tt"
+            entries = _random_entries(3000, seed=1)
+            with DiskTable(path, capacity=64) as table:
+                run = table.new_run()
+                for key, value in entries.items():
+                    table[key] = value
+                capacity = table.capacity
+            self.assertEqual([p.name for p in Path(tmp).iterdir()], ["table.tt"])
+            with DiskTable(path) as table:
+                self.assertEqual(table.capacity, capacity)
+                self.assertEqual(dict(table.items()), entries)
+                self.assertEqual(table.new_run(), run + 1)
+
+    def test_keys_zero_and_one(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "table.tt"
+            with DiskTable(path, capacity=4) as table:
+                table[0] = 5
+                table[1] = 6
+                self.assertEqual((table.get(0), table.get(1)), (5, 6))
+                self.assertIsNone(table.get(2))
+                # Key 0 is kept through growth
+                for key in range(2, 10):
+                    table[key] = key
+                self.assertEqual(len(table), 10)
+            with DiskTable(path) as table:
+                self.assertEqual(
+                    dict(table.items()),
+                    {0: 5, 1: 6} | {key: key for key in range(2, 10)},
+                )
+
+    def test_bad_capacity(self):
+        for capacity in (0, -4, 12):
+            with self.assertRaises(ValueError):
+                DiskTable(capacity=capacity)
+
+    def test_not_a_table_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "table.tt"
+            for data in (b"", b"SOLTT", bytes(128)):
+                path.write_bytes(data)
+                with self.assertRaises(ValueError):
+                    DiskTable(path)
+
+
+class TranspositionTableTest(unittest.TestCase):
+    def test_spills_to_disk(self):
+        entries = _random_entries(2000, seed=2)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "table.tt"
+            with TranspositionTable(path, memory_entries=100, capacity=64) as table:
+                for key, value in entries.items():
+                    table[key] = value
+                self.assertEqual(len(table), len(entries))
+                # Rewriting entries already on disk or in memory adds nothing
+                for key in list(entries)[::50]:
+                    table[key] = entries[key] = 1
+                self.assertEqual(len(table), len(entries))
+            with TranspositionTable(path) as table:
+                self.assertEqual(len(table), len(entries))
+                for key, value in entries.items():
+                    self.assertEqual(table.get(key), value)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,261 @@
+import mmap
+import os
+from collections import OrderedDict
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Self
+
+_MAGIC = b"SOLTT\x00\x00\x02"
+# Header: magic, capacity, count, last run id, whether key 0 is stored and its
+# value, padded to one record multiple
+_HEADER_WORDS = 8
+_HEADER_SIZE = _HEADER_WORDS * 8
+_CAPACITY, _COUNT, _RUN, _HAS_ZERO, _ZERO_VALUE = 1, 2, 3, 4, 5
+_RECORD_WORDS = 2  # key, value
+_MAX_LOAD = 0.75
+
+
+class DiskTable:
+    """
+    Open-addressed hash table of 64-bit keys to 64-bit values, stored as
+    fixed-size records in a memory-mapped file so that it survives the
+    process and its size is not limited by RAM.
+
+    Keys are state hashes (see SolitaireGame.state_hash); they are assumed to
+    be well mixed, so a slot is simply the low bits of the key, with linear
+    probing. Key 0 marks an empty slot, so that key is kept in the header
+    instead of in a slot. The file is doubled (and rehashed) when it is 3/4
+    full. Without a path the table
+    lives in anonymous memory.
+    """
+
+    def __init__(self, path: str | os.PathLike | None = None, capacity: int = 1 << 20):
+        if capacity < 1 or capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.path = None if path is None else Path(path)
+        if self.path is not None and self.path.exists():
+            self._open(self.path)
+        else:
+            self._create(self.path, capacity)
+
+    def _create(self, path: Path | None, capacity: int) -> None:
+        size = _HEADER_SIZE + capacity * _RECORD_WORDS * 8
+        if path is None:
+            self._file = None
+            self._map = mmap.mmap(-1, size)
+        else:
+            with ExitStack() as stack:
+                # The file is closed again if it cannot be sized or mapped
+                file = stack.enter_context(open(path, "w+b"))
+                file.truncate(size)
+                self._map = mmap.mmap(file.fileno(), size)
+                stack.pop_all()
+            self._file = file
+        self._map[: len(_MAGIC)] = _MAGIC
+        self._words = memoryview(self._map).cast("Q")
+        self._words[_CAPACITY] = capacity
+        self._set_capacity(capacity)
+
+    def _open(self, path: Path) -> None:
+        with ExitStack() as stack:
+            # The file (and map) are closed again if it is not a table file
+            file = stack.enter_context(open(path, "r+b"))
+            if os.fstat(file.fileno()).st_size < _HEADER_SIZE:
+                raise ValueError(f"{path} is not a transposition table file")
+            self._map = stack.enter_context(mmap.mmap(file.fileno(), 0))
+            if self._map[: len(_MAGIC)] != _MAGIC:
+                raise ValueError(f"{path} is not a transposition table file")
+            stack.pop_all()
+        self._file = file
+        self._words = memoryview(self._map).cast("Q")
+        self._set_capacity(self._words[_CAPACITY])
+
+    def _set_capacity(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._max_count = int(capacity * _MAX_LOAD)
+        # records[2 * slot] is the key, records[2 * slot + 1] the value
+        self._records = self._words[_HEADER_WORDS:]
+
+    def __len__(self) -> int:
+        return self._words[_COUNT]
+
+    def _slot(self, key: int) -> int:
+        # Index in _records of the key's record, or of the empty slot for it
+        records = self._records
+        mask = self._mask
+        slot = key & mask
+        while True:
+            found = records[2 * slot]
+            if found == key or not found:
+                return 2 * slot
+            slot = (slot + 1) & mask
+
+    def get(self, key: int, default: int | None = None) -> int | None:
+        if not key:
+            return self._words[_ZERO_VALUE] if self._words[_HAS_ZERO] else default
+        idx = self._slot(key)
+        if self._records[idx] != key:
+            return default
+        return self._records[idx + 1]
+
+    def __contains__(self, key: int) -> bool:
+        return self.get(key) is not None
+
+    def __setitem__(self, key: int, value: int) -> None:
+        if not key:
+            if not self._words[_HAS_ZERO]:
+                self._words[_HAS_ZERO] = 1
+                self._words[_COUNT] += 1
+            self._words[_ZERO_VALUE] = value
+            return
+        idx = self._slot(key)
+        if not self._records[idx]:
+            if self._words[_COUNT] >= self._max_count:
+                self._grow()
+                idx = self._slot(key)
+            self._records[idx] = key
+            self._words[_COUNT] += 1
+        self._records[idx + 1] = value
+
+    def items(self):
+        if self._words[_HAS_ZERO]:
+            yield 0, self._words[_ZERO_VALUE]
+        records = self._records
+        for idx in range(0, len(records), _RECORD_WORDS):
+            if records[idx]:
+                yield records[idx], records[idx + 1]
+
+    def new_run(self) -> int:
+        # Returns a run id that no earlier run on this table has used
+        self._words[_RUN] += 1
+        return self._words[_RUN]
+
+    def _grow(self) -> None:
+        # The records are copied straight from the old map into a new one of
+        # twice the capacity, which replaces the old file once it is complete
+        old_map, old_file = self._map, self._file
+        old_words, old_records = self._words, self._records
+        tmp_path = (
+            None if self.path is None else self.path.with_name(self.path.name + ".tmp")
+        )
+        self._create(tmp_path, self.capacity * 2)
+        for word in (_COUNT, _RUN, _HAS_ZERO, _ZERO_VALUE):
+            self._words[word] = old_words[word]
+        records = self._records
+        mask = self._mask
+        for idx in range(0, len(old_records), _RECORD_WORDS):
+            key = old_records[idx]
+            if key:
+                slot = key & mask
+                while records[2 * slot]:
+                    slot = (slot + 1) & mask
+                records[2 * slot] = key
+                records[2 * slot + 1] = old_records[idx + 1]
+        old_records.release()
+        old_words.release()
+        old_map.close()
+        if old_file is not None:
+            old_file.close()
+        if tmp_path is not None:
+            self._map.flush()
+            os.replace(tmp_path, self.path)
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._map.flush()
+
+    def _close_map(self) -> None:
+        self._records.release()
+        self._words.release()
+        self._map.close()
+        if self._file is not None:
+            self._file.close()
+
+    def close(self) -> None:
+        if not self._map.closed:
+            self.flush()
+            self._close_map()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class TranspositionTable:
+    """
+    A DiskTable with the most recently used entries kept in memory.
+
+    Reads and writes go to an LRU dict of at most memory_entries entries;
+    entries that fall out of it are written to the disk table, and are read
+    back in when they are used again. The memory used is therefore fixed by
+    memory_entries, however many states are stored. Call flush (or use the
+    table as a context manager) to write the in-memory entries to disk.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike | None = None,
+        memory_entries: int = 1 << 18,
+        capacity: int = 1 << 20,
+    ):
+        self.disk = DiskTable(path, capacity)
+        self.memory_entries = memory_entries
+        self._recent: OrderedDict[int, int] = OrderedDict()
+        # Entries in the disk tier plus entries not yet written to it
+        self._count = len(self.disk)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get(self, key: int, default: int | None = None) -> int | None:
+        recent = self._recent
+        value = recent.get(key)
+        if value is not None:
+            recent.move_to_end(key)
+            return value
+        value = self.disk.get(key)
+        if value is None:
+            return default
+        self._remember(key, value)
+        return value
+
+    def __contains__(self, key: int) -> bool:
+        return self.get(key) is not None
+
+    def __setitem__(self, key: int, value: int) -> None:
+        if key in self._recent:
+            self._recent.move_to_end(key)
+            self._recent[key] = value
+        else:
+            if key not in self.disk:
+                self._count += 1
+            self._remember(key, value)
+
+    def _remember(self, key: int, value: int) -> None:
+        recent = self._recent
+        recent[key] = value
+        if len(recent) > self.memory_entries:
+            old_key, old_value = recent.popitem(last=False)
+            self.disk[old_key] = old_value
+
+    def new_run(self) -> int:
+        return self.disk.new_run()
+
+    def flush(self) -> None:
+        for key, value in self._recent.items():
+            self.disk[key] = value
+        self.disk.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._recent.clear()
+        self.disk.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()